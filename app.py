@@ -1,13 +1,35 @@
 #app.py
-from flask import Flask, render_template, request, session, send_file, redirect, url_for
+from flask import (Flask, render_template, request, session, send_file, redirect, url_for, jsonify,
+                   Response, stream_with_context, g)
 import pandas as pd
 import os
 import io
-from openpyxl.styles import PatternFill, Alignment, Font
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from flask_mysqldb import MySQL
-
-from utils.procesamiento import procesar_registros, HORARIOS_SEDES
+import hashlib
+import logging
+import re
+import threading
+from datetime import datetime
+
+from utils.procesamiento import (procesar_registros, procesar_por_bloques, procesar_incremental,
+                                  resumir_por_bloques, HORARIOS_SEDES, VERSION_REPORTE)
+from utils.horarios import DIAS_SEMANA, DOMINGO, ALMUERZO_MIN, ventanas_de
+from utils.horarios_bd import sincronizar, guardar_sede, crear_tablas
+from utils.bd import crear_pool
+from utils.usuarios import preparar_usuarios, verificar_usuario
+from utils.lectura import leer_archivo, leer_csv_por_bloques, leer_excel_por_bloques, extension_de, EXTENSIONES
+from utils.almacen import AlmacenDisco, AlmacenMemoria, crear_almacen, nuevo_id
+from utils.cache import CacheReportes, clave_reporte
+from utils.consulta import IndiceReporte, POR_PAGINA
+from utils.resultado import Resultado
+from utils.trabajos import ColaTrabajos, LISTO, ERROR
+from utils.lotes import procesar_lote
+from utils.perfiles import AlmacenPerfiles, ORDENES, perfilado, supera_tamano
+from utils.subidas import ArchivoSubidas, PeticionSubidas, recibir
+from utils.metricas import (METRICAS, fase, fase_iterable, contar, etiquetar, medir, medir_stream,
+                            medicion_actual, iniciar_medicion, terminar_medicion)
+from utils.exportar import (escribir_excel, csv_en_bloques, arrow_en_bloques, bloques_extras,
+                            bloques_llegadas, COLUMNAS_EXTRAS, COLUMNAS_LLEGADAS, FORMATOS_EXPORTAR,
+                            HAY_ARROW, TIPOS_MIME)
 
 
 
@@ -18,18 +40,206 @@ app.config['MYSQL_HOST'] = 'localhost'
 app.config['MYSQL_USER'] = 'root'
 app.config['MYSQL_PASSWORD'] = ''
 app.config['MYSQL_DB'] = 'Overtrack'
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
-mysql = MySQL(app)
-# Memoria global (sin parquet)
-MEMORY = {}
-
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Pool de conexiones: "mysql" o "sqlite" (archivo local, para pruebas sin MySQL)
+app.config['BD_MOTOR'] = 'mysql'
+app.config['BD_SQLITE_RUTA'] = os.path.join('cache', 'overtrack.db')
+app.config['BD_POOL_MAX'] = 8
+app.config['BD_POOL_ESPERA_SEG'] = 5
+# Conexiones ociosas más de esto se revisan (ping) antes de prestarlas
+app.config['BD_PING_SEG'] = 30
+# Hash de contraseñas (werkzeug); subir el costo hace más lento cada login
+app.config['PASSWORD_METODO'] = 'scrypt:32768:8:1'
+# Motor de procesamiento: "vectorizado" (por columnas) o "clasico" (fila por fila)
+app.config['MOTOR_PROCESAMIENTO'] = 'vectorizado'
+# CSV desde este tamaño se procesan por bloques (memoria acotada por días-empleado)
+app.config['BLOQUES_DESDE_MB'] = 50
+app.config['TAM_BLOQUE_CSV'] = 200_000
+# Los xlsx se leen fila a fila (solo B y D) y se resumen de a este número de filas
+app.config['TAM_BLOQUE_EXCEL'] = 50_000
+# Almacén de resultados por sesión: "memoria" (un worker) o "disco" (varios workers)
+app.config['ALMACEN_RESULTADOS'] = 'memoria'
+app.config['ALMACEN_MAX_MB'] = 512
+app.config['ALMACEN_TTL_HORAS'] = 12
+app.config['ALMACEN_CARPETA'] = os.path.join('cache', 'resultados')
+# Caché de reportes por contenido del archivo + sede + horario
+app.config['CACHE_REPORTES'] = True
+app.config['CACHE_REPORTES_CARPETA'] = os.path.join('cache', 'reportes')
+app.config['CACHE_REPORTES_MAX_MB'] = 1024
+app.config['INCREMENTAL_CARPETA'] = os.path.join('cache', 'incremental')
+# Archivos subidos: hasta este tamaño (el del request) se reciben en memoria; los
+# más grandes, en un temporal que se procesa y se borra. Se conserva una copia
+# gzip por contenido, con tope y expiración.
+app.config['SUBIDAS_EN_MEMORIA_MB'] = 32
+app.config['SUBIDAS_CARPETA'] = os.path.join('cache', 'subidas')
+app.config['SUBIDAS_MAX_MB'] = 2048
+app.config['SUBIDAS_TTL_DIAS'] = 90
+# Índices de la vista previa paginada (en memoria de cada worker, se rearman si faltan)
+app.config['INDICES_MAX_MB'] = 256
+# Cola de cargas en segundo plano (hilos de este proceso)
+app.config['TRABAJOS_WORKERS'] = 2
+app.config['TRABAJOS_CARPETA'] = os.path.join('cache', 'trabajos')
+# Procesos para /subir_lote (None: uno por núcleo)
+app.config['LOTE_WORKERS'] = None
+# Archivos de descarga ya generados, por (resultado, tipo, nombre, formato)
+app.config['EXPORTES_CACHE_MAX_MB'] = 128
+# Horarios editables (tablas sedes / horarios_sede): cada cuánto cada worker
+# revisa si otro los cambió
+app.config['HORARIOS_REVISAR_SEG'] = 30
+# Una línea de log por request y por trabajo con el tiempo de cada fase
+# (utils/metricas.py); las métricas acumuladas se leen en /metrics
+app.config['METRICAS_LOG'] = True
+# Endpoints que no se miden (estáticos, sondeo de progreso, el propio /metrics)
+app.config['METRICAS_SIN_MEDIR'] = ("static", "estado_trabajo", "metricas")
+# Quién puede leer /metrics (sin login: lo consulta Prometheus). Detrás de un
+# proxy, agregar su dirección o servir /metrics solo en la red interna.
+app.config['METRICAS_PERMITIDAS'] = ("127.0.0.1", "::1")
+# Perfil (cProfile) de una carga de /subir, para ver en qué se va el tiempo:
+# se pide con la cabecera PERFILAR_HEADER: 1 o el campo perfilar=1, o se hace
+# solo con archivos desde PERFILAR_DESDE_MB (None: nunca) o con todas las
+# cargas (PERFILAR_TODAS). Se descarga en /perfiles/<id de la carga>.
+app.config['PERFILAR_HEADER'] = 'X-Perfilar'
+app.config['PERFILAR_DESDE_MB'] = None
+app.config['PERFILAR_TODAS'] = False
+app.config['PERFILES_CARPETA'] = os.path.join('cache', 'perfiles')
+# Los perfiles solo los baja la sesión que subió el archivo (guarda los últimos N ids)
+app.config['PERFILES_POR_SESION'] = 10
+
+if app.config['METRICAS_LOG']:
+    log_metricas = logging.getLogger("overtrack.metricas")
+    log_metricas.setLevel(logging.INFO)
+    if not log_metricas.handlers:
+        log_metricas.addHandler(logging.StreamHandler())
+
+if app.config['BD_MOTOR'] == 'sqlite':
+    os.makedirs(os.path.dirname(app.config['BD_SQLITE_RUTA']), exist_ok=True)
+    datos_bd = {"ruta": app.config['BD_SQLITE_RUTA']}
+else:
+    datos_bd = {"host": app.config['MYSQL_HOST'], "user": app.config['MYSQL_USER'],
+                "password": app.config['MYSQL_PASSWORD'], "db": app.config['MYSQL_DB']}
+pool_bd = crear_pool(app.config['BD_MOTOR'], maximo=app.config['BD_POOL_MAX'],
+                     espera=app.config['BD_POOL_ESPERA_SEG'], ping_seg=app.config['BD_PING_SEG'],
+                     **datos_bd)
+# La BD local (sqlite) se prepara sola al arrancar; en MySQL, `flask --app app preparar-bd`
+if app.config['BD_MOTOR'] == 'sqlite':
+    with pool_bd.conexion() as conexion:
+        preparar_usuarios(conexion, pool_bd.motor)
+        crear_tablas(conexion)
+
+almacen = crear_almacen(
+    app.config['ALMACEN_RESULTADOS'],
+    max_mb=app.config['ALMACEN_MAX_MB'],
+    ttl_horas=app.config['ALMACEN_TTL_HORAS'],
+    carpeta=app.config['ALMACEN_CARPETA'],
+)
+# Estado por sede para las cargas incrementales (resumen por día-empleado + detalle)
+estados_incrementales = AlmacenDisco(app.config['INCREMENTAL_CARPETA'], ttl_segundos=90 * 24 * 3600)
+indices_consulta = AlmacenMemoria(app.config['INDICES_MAX_MB'] * 1024 * 1024,
+                                  app.config['ALMACEN_TTL_HORAS'] * 3600)
+# Estado de cada trabajo, en el mismo tipo de almacén que los resultados
+# (en disco, cualquier worker puede contestar el sondeo de progreso)
+cola = ColaTrabajos(
+    crear_almacen(app.config['ALMACEN_RESULTADOS'], max_mb=16,
+                  ttl_horas=app.config['ALMACEN_TTL_HORAS'], carpeta=app.config['TRABAJOS_CARPETA']),
+    workers=app.config['TRABAJOS_WORKERS'],
+)
+lock_incremental = threading.Lock()
+exportes_cache = AlmacenMemoria(app.config['EXPORTES_CACHE_MAX_MB'] * 1024 * 1024,
+                                app.config['ALMACEN_TTL_HORAS'] * 3600)
+cache_reportes = None
+if app.config['CACHE_REPORTES']:
+    cache_reportes = CacheReportes(app.config['CACHE_REPORTES_CARPETA'],
+                                   max_mb=app.config['CACHE_REPORTES_MAX_MB'])
+
+perfiles = AlmacenPerfiles(app.config['PERFILES_CARPETA'])
+app.request_class = PeticionSubidas
+PeticionSubidas.en_memoria_hasta = int(app.config['SUBIDAS_EN_MEMORIA_MB'] * 1024 * 1024)
+subidas = ArchivoSubidas(app.config['SUBIDAS_CARPETA'], max_mb=app.config['SUBIDAS_MAX_MB'],
+                         ttl_dias=app.config['SUBIDAS_TTL_DIAS'])
+
+
+
+# -------------------------
+# MÉTRICAS
+# Cada request se mide de punta a punta (fases, bytes de entrada y salida) y
+# deja una línea de log al terminar; los trabajos de la cola tienen la suya.
+# -------------------------
+@app.before_request
+def iniciar_metricas():
+    if request.endpoint in app.config['METRICAS_SIN_MEDIR']:
+        return
+    iniciar_medicion(request.endpoint or "sin_ruta")
+    if request.content_length:
+        contar("bytes_entrada", request.content_length)
+
+
+@app.after_request
+def registrar_respuesta(respuesta):
+    g.estado_http = respuesta.status_code
+    # Las respuestas en streaming (CSV / Parquet) cuentan sus bytes al generarse
+    if respuesta.content_length and medicion_actual() is not None:
+        contar("bytes_salida", respuesta.content_length)
+    return respuesta
+
+
+@app.teardown_request
+def terminar_metricas(error=None):
+    # Una descarga en streaming cierra la medición al terminar (medir_stream)
+    terminar_medicion(str(g.get("estado_http", 500)))
+
+
+@app.route("/metrics")
+def metricas():
+    """Métricas del proceso en el formato de texto de Prometheus."""
+    if request.remote_addr not in app.config['METRICAS_PERMITIDAS']:
+        return "No autorizado", 403
+    return Response(METRICAS.texto(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def clave_estado(sede):
+    """
+    Clave del estado incremental de la sede. Los nombres creados en /ajustes
+    pueden tener espacios o tildes ("santa marta", "bogotá"), que el almacén
+    en disco no acepta: esos van por su hash. Los demás quedan como estaban.
+    """
+    if re.fullmatch(r"[A-Za-z0-9_\-]+", sede):
+        return sede
+    return "sede_" + hashlib.sha1(sede.encode("utf-8")).hexdigest()
+
+
+def agregar_incremental(bloques, sede, avance=None):
+    """Suma las marcaciones nuevas al estado guardado de la sede; devuelve (detalle, totales) completos."""
+    resumen = resumir_por_bloques(bloques, avance)
+    clave = clave_estado(sede)
+    # Dos cargas de la misma sede a la vez no deben pisarse el estado
+    with lock_incremental:
+        estado = estados_incrementales.obtener(clave)
+        detalle, totales, estado, _ = procesar_incremental(resumen, sede, estado, avance=avance)
+        estados_incrementales.guardar(clave, estado)
+    return detalle, totales
+
+
+def resultado_actual():
+    """Resultado (reporte + índice por empleado) de la sesión actual; None si no hay o ya expiró."""
+    return almacen.obtener(session.get("resultado_id"))
+
+
+def indice_actual():
+    """Índices de consulta del reporte de la sesión; se arman la primera vez que se piden."""
+    resultado_id = session.get("resultado_id")
+    indice = indices_consulta.obtener(resultado_id)
+    if indice is None:
+        resultado = almacen.obtener(resultado_id)
+        if resultado is None:
+            return None
+        indice = IndiceReporte(resultado)
+        indices_consulta.guardar(resultado_id, indice)
+    return indice
 
 
 @app.route("/")
 def index():
-    return render_template("index.html", sedes=list(HORARIOS_SEDES.keys()))
+    return render_template("index.html", sedes=list(HORARIOS_SEDES.keys()),
+                           trabajo_id=request.args.get("trabajo"))
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -38,11 +248,9 @@ def login():
         # Obtener datos del formulario
         email=request.form["email"]
         password=request.form["password"]
-        # Verificar en la base de datos
-        cursor=mysql.connection.cursor()    
-        cursor.execute("SELECT * FROM usuarios WHERE email=%s AND password=%s",(email,password))
-        # Obtener un solo registro
-        user=cursor.fetchone()
+        # Verificar en la base de datos (búsqueda por email + hash de la contraseña)
+        with pool_bd.conexion() as conexion:
+            user=verificar_usuario(conexion, email, password, app.config['PASSWORD_METODO'])
         # Si el usuario existe
         if user:
             session["loggedin"]=True
@@ -57,13 +265,223 @@ def login():
 def registro():
     return render_template("singup.html", sedes=list(HORARIOS_SEDES.keys()))
 
-@app.route("/horarios")
-def horaios():
-    return render_template("horarios.html", sedes=list(HORARIOS_SEDES.keys()))
 
-@app.route("/ajustes")
+@app.cli.command("preparar-bd")
+def preparar_bd():
+    """Crea o ajusta las tablas (usuarios, horarios). Se corre al desplegar: flask --app app preparar-bd"""
+    with pool_bd.conexion() as conexion:
+        preparar_usuarios(conexion, pool_bd.motor)
+        crear_tablas(conexion)
+    print("Base de datos lista")
+
+# -------------------------
+# HORARIOS EDITABLES
+# Se guardan en la BD y se sirven desde memoria (ver utils/horarios_bd.py).
+# -------------------------
+@app.before_request
+def sincronizar_horarios():
+    """Trae los horarios de la BD si otro worker los cambió (revisa cada HORARIOS_REVISAR_SEG)."""
+    try:
+        with fase("horarios_bd"):
+            sincronizar(pool_bd.conexion, cada=app.config['HORARIOS_REVISAR_SEG'])
+    except Exception as e:
+        # Sin BD se sigue con los últimos horarios cargados (o los de fábrica)
+        app.logger.warning("No se pudieron sincronizar los horarios: %s", e)
+
+
+def _hora(texto):
+    """'HH:MM' válida o ValueError."""
+    return datetime.strptime(texto.strip(), "%H:%M").strftime("%H:%M")
+
+
+def horario_de_formulario(form):
+    """Campos entrada_<día>, salida_<día>, almuerzo_<día> -> horario por día; ValueError si algo no cuadra."""
+    horario_por_dia = {}
+    for dia, nombre in enumerate(DIAS_SEMANA):
+        if dia == DOMINGO:
+            continue
+        entrada = form.get(f"entrada_{dia}", "").strip()
+        salida = form.get(f"salida_{dia}", "").strip()
+        if not entrada and not salida:
+            continue
+        if not entrada or not salida:
+            raise ValueError(f"{nombre}: indique entrada y salida, o deje ambas vacías")
+        entrada, salida = _hora(entrada), _hora(salida)
+        if entrada >= salida:
+            raise ValueError(f"{nombre}: la entrada debe ser antes de la salida")
+        almuerzo = int(form.get(f"almuerzo_{dia}") or ALMUERZO_MIN)
+        if not 0 <= almuerzo <= 240:
+            raise ValueError(f"{nombre}: el almuerzo va de 0 a 240 minutos")
+        horario_por_dia[nombre] = {"entrada": entrada, "salida": salida}
+        if almuerzo != ALMUERZO_MIN:
+            horario_por_dia[nombre]["almuerzo"] = almuerzo
+    return horario_por_dia
+
+
+def ventanas_de_formulario(form):
+    ventanas = {
+        "entrada": (_hora(form.get("entrada_desde", "")), _hora(form.get("entrada_hasta", ""))),
+        "salida": (_hora(form.get("salida_desde", "")), _hora(form.get("salida_hasta", ""))),
+    }
+    if not ventanas["entrada"][0] <= ventanas["entrada"][1] < ventanas["salida"][0] <= ventanas["salida"][1]:
+        raise ValueError("Las ventanas deben ir en orden: entrada desde ≤ hasta < salida desde ≤ hasta")
+    return ventanas
+
+
+def _guardar_y_recargar(sede, **cambios):
+    with pool_bd.conexion() as conexion:
+        guardar_sede(conexion, sede, **cambios)
+    sincronizar(pool_bd.conexion, forzar=True)
+
+
+@app.route("/horarios", methods=["GET", "POST"])
+def horaios():
+    mensaje_error = mensaje = None
+    if request.method == "POST":
+        sede = request.form.get("sede")
+        try:
+            if sede not in HORARIOS_SEDES:
+                raise ValueError("Seleccione una sede válida")
+            _guardar_y_recargar(sede, horario_por_dia=horario_de_formulario(request.form))
+            mensaje = f"Horario de {sede} guardado"
+        except ValueError as e:
+            mensaje_error = str(e)
+        except Exception as e:
+            mensaje_error = f"No se pudo guardar en la base de datos: {e}"
+    return render_template("horarios.html", sedes=list(HORARIOS_SEDES.keys()), horarios=HORARIOS_SEDES,
+                           dias=[(i, d) for i, d in enumerate(DIAS_SEMANA) if i != DOMINGO],
+                           almuerzo_defecto=ALMUERZO_MIN, mensaje=mensaje, mensaje_error=mensaje_error)
+
+
+@app.route("/ajustes", methods=["GET", "POST"])
 def ajustes():
-    return render_template("ajustes.html", sedes=list(HORARIOS_SEDES.keys()))
+    mensaje_error = mensaje = None
+    if request.method == "POST":
+        try:
+            if request.form.get("accion") == "nueva_sede":
+                sede = request.form.get("nombre", "").strip().lower()
+                if not sede or len(sede) > 50 or not all(c.isalnum() or c in " _-" for c in sede):
+                    raise ValueError("Nombre de sede inválido (letras, números, espacios, - y _)")
+                if sede in HORARIOS_SEDES:
+                    raise ValueError(f"La sede {sede} ya existe")
+                _guardar_y_recargar(sede, horario_por_dia={})
+                mensaje = f"Sede {sede} creada: configure su horario en Horarios"
+            else:
+                sede = request.form.get("sede")
+                if sede not in HORARIOS_SEDES:
+                    raise ValueError("Seleccione una sede válida")
+                _guardar_y_recargar(sede, ventanas=ventanas_de_formulario(request.form))
+                mensaje = f"Ventanas de {sede} guardadas"
+        except ValueError as e:
+            mensaje_error = str(e)
+        except Exception as e:
+            mensaje_error = f"No se pudo guardar en la base de datos: {e}"
+    return render_template("ajustes.html", sedes=list(HORARIOS_SEDES.keys()),
+                           ventanas={s: ventanas_de(s) for s in HORARIOS_SEDES},
+                           mensaje=mensaje, mensaje_error=mensaje_error)
+
+def procesar_carga(subida, sede, incremental, resultado_id, avance):
+    """
+    Lee y procesa un archivo recibido (Subida) y deja su Resultado bajo
+    resultado_id; al final archiva su copia comprimida y suelta el temporal.
+    Corre en la cola de trabajos (fuera del request: sin session).
+    """
+    with medir("incremental" if incremental else "procesar", sede=sede):
+        try:
+            return _procesar_subida(subida, sede, incremental, resultado_id, avance)
+        finally:
+            soltar_subida(subida)
+
+
+def soltar_subida(subida):
+    """Archiva la copia comprimida de la subida y borra su temporal."""
+    try:
+        with fase("archivar"):
+            subidas.archivar(subida)
+    except Exception:
+        # Guardar la copia nunca debe romper la carga
+        pass
+    subida.descartar()
+
+
+def _procesar_subida(subida, sede, incremental, resultado_id, avance):
+    extension = subida.extension
+    detalle = totales = None
+
+    # ¿Ya se procesó este mismo archivo para esta sede con este horario?
+    clave_cache = None
+    if cache_reportes is not None and not incremental:
+        with fase("cache"):
+            clave_cache = clave_reporte(subida.huella, sede)
+            detalle = cache_reportes.obtener(clave_cache)
+
+    if detalle is None:
+        avance("leer")
+        bloques = None
+        if extension == "csv" and subida.tamano >= app.config['BLOQUES_DESDE_MB'] * 1024 * 1024:
+            # Archivo grande: se lee y resume por bloques sin cargarlo completo
+            bloques = fase_iterable("leer", leer_csv_por_bloques(subida.origen(),
+                                                                 app.config['TAM_BLOQUE_CSV']))
+        elif extension == "xlsx":
+            # Excel: las filas se resumen a medida que se leen (nunca está la hoja completa)
+            bloques = fase_iterable("leer", leer_excel_por_bloques(subida.origen(),
+                                                                   app.config['TAM_BLOQUE_EXCEL']))
+        else:
+            # CSV: detecta codificación y separador y lee solo nombre y fecha/hora; xls: read_excel
+            with fase("leer"):
+                df = leer_archivo(subida.origen(), extension)
+
+        if incremental:
+            detalle, totales = agregar_incremental(bloques if bloques is not None else [df], sede, avance)
+        elif bloques is not None:
+            detalle, totales = procesar_por_bloques(bloques, sede, avance=avance)
+        else:
+            detalle, totales = procesar_registros(df, sede, motor=app.config['MOTOR_PROCESAMIENTO'],
+                                                  avance=avance)
+
+        if clave_cache:
+            try:
+                # Solo el detalle: los totales se vuelven a sumar al leerlo
+                with fase("cache"):
+                    cache_reportes.guardar(clave_cache, detalle)
+            except Exception:
+                # La caché nunca debe romper la carga
+                pass
+
+    with fase("almacenar"):
+        almacen.guardar(resultado_id, Resultado(detalle, totales))
+    return resultado_id
+
+
+def reemplazar_resultado(resultado_id):
+    """Asocia un resultado nuevo a la sesión y borra el anterior (y lo derivado de él)."""
+    anterior = session.get("resultado_id")
+    if anterior and anterior != resultado_id:
+        almacen.borrar(anterior)
+        indices_consulta.borrar(anterior)
+        exportes_cache.borrar_si(lambda clave: clave[0] == anterior)
+    session["resultado_id"] = resultado_id
+
+
+@app.before_request
+def adoptar_trabajo():
+    """Si el trabajo pendiente de esta sesión ya terminó, su resultado pasa a ser el de la sesión."""
+    trabajo_id = session.get("trabajo_id")
+    if not trabajo_id:
+        return
+    estado = cola.estado(trabajo_id)
+    if estado is not None and estado["estado"] == LISTO:
+        reemplazar_resultado(estado["resultado"])
+    # Terminado (bien o con error) o ya olvidado por la cola: no se vuelve a consultar
+    if estado is None or estado["estado"] in (LISTO, ERROR):
+        session.pop("trabajo_id")
+
+
+def error_subida(mensaje):
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(error=mensaje), 400
+    return render_template("index.html", mensaje_error=mensaje, sedes=list(HORARIOS_SEDES.keys()))
+
 
 @app.route("/subir", methods=["POST"])
 def subir():
@@ -71,336 +489,315 @@ def subir():
     sede = request.form.get("sede")
 
     if not archivo or not archivo.filename:
-        return render_template("index.html", mensaje_error="No se seleccionó archivo",
-                               sedes=list(HORARIOS_SEDES.keys()))
+        return error_subida("No se seleccionó archivo")
 
     if sede not in HORARIOS_SEDES:
-        return render_template("index.html", mensaje_error="Seleccione una sede válida",
-                               sedes=list(HORARIOS_SEDES.keys()))
-
-    ruta = os.path.join(UPLOAD_FOLDER, archivo.filename)
-    archivo.save(ruta)
-   
-
-    extension = archivo.filename.lower().split(".")[-1]
-
+        return error_subida("Seleccione una sede válida")
+
+    extension = extension_de(archivo.filename)
+    if extension not in EXTENSIONES:
+        return error_subida("Formato no soportado. Use CSV o Excel.")
+
+    etiquetar(sede=sede)
+    with fase("guardar"):
+        subida = recibir(archivo, extension)
+    if not subida.tamano:
+        return error_subida("El archivo está vacío")
+
+    # Incremental: se suma a lo ya cargado de esta sede en vez de reemplazarlo
+    incremental = bool(request.form.get("incremental"))
+
+    # El procesamiento va a la cola; se responde enseguida con el id del trabajo
+    resultado_id = nuevo_id()
+    trabajo = procesar_carga
+    perfilar = pide_perfil(subida.tamano)
+    if perfilar:
+        trabajo = perfilado(procesar_carga, perfiles, resultado_id)
+        # Solo la sesión que subió el archivo puede bajar su perfil
+        session["perfiles"] = (session.get("perfiles", []) + [resultado_id])[-app.config['PERFILES_POR_SESION']:]
+    trabajo_id = cola.enviar(trabajo, subida, sede, incremental, resultado_id)
+    session["trabajo_id"] = trabajo_id
+
+    if request.accept_mimetypes.best == "application/json":
+        respuesta = dict(trabajo_id=trabajo_id, estado=url_for("estado_trabajo", trabajo_id=trabajo_id))
+        if perfilar:
+            respuesta["perfil"] = url_for("descargar_perfil", perfil_id=resultado_id)
+        return jsonify(respuesta), 202
+    return redirect(url_for("index", trabajo=trabajo_id))
+
+
+def pide_perfil(tamano):
+    """¿Perfilar esta carga? (cabecera o campo del formulario, tamaño del archivo o todas)."""
+    return (app.config['PERFILAR_TODAS']
+            or request.headers.get(app.config['PERFILAR_HEADER']) == "1"
+            or request.form.get("perfilar") == "1"
+            or supera_tamano(tamano, app.config['PERFILAR_DESDE_MB']))
+
+
+@app.route("/perfiles/<perfil_id>")
+def descargar_perfil(perfil_id):
+    """Perfil de una carga: el .prof (snakeviz, pstats) o, con ?formato=txt, las funciones más caras."""
+    if perfil_id not in session.get("perfiles", ()):
+        # Mismo mensaje que si no existe: no se revela qué ids hay
+        return "Perfil no encontrado (o la carga corrió sin perfil)", 404
+    orden = request.args.get("orden", "cumulative")
+    if orden not in ORDENES:
+        return f"Orden no soportado: {orden}. Use uno de {', '.join(ORDENES)}", 400
     try:
-        if extension in ["xlsx", "xls"]:
-            df = pd.read_excel(ruta)
-        elif extension == "csv":
-            try:
-                # Intentar primero UTF-8 y detectar separador automáticamente
-                df = pd.read_csv(
-                    ruta,
-                    encoding="utf-8",
-                    sep=None,        # autodetecta: , ; | tab
-                    engine="python",
-                    on_bad_lines="skip"
-                )
-            except:
-                # Si falla, intentar Latin-1 (muy común en Windows)
-                df = pd.read_csv(
-                    ruta,
-                    encoding="latin-1",
-                    sep=None,        # autodetecta
-                    engine="python",
-                    on_bad_lines="skip"
-                )
-
+        if request.args.get("formato") == "txt":
+            texto = perfiles.texto(perfil_id, orden)
+            if texto is not None:
+                return Response(texto, content_type="text/plain; charset=utf-8")
         else:
-            return render_template(
-                "index.html",
-                mensaje_error="Formato no soportado. Use CSV o Excel.",
-                sedes=list(HORARIOS_SEDES.keys()),
-            )
-    except Exception as e:
-        return render_template(
-            "index.html",
-            mensaje_error=f"Error leyendo el archivo: {str(e)}",
-            sedes=list(HORARIOS_SEDES.keys()),
-        )
-
-    procesado = procesar_registros(df, sede)
-
-    # Guardamos el DF directamente en memoria
-    MEMORY["df"] = procesado
+            ruta = perfiles.ruta_archivo(perfil_id)
+            if ruta is not None:
+                return send_file(os.path.abspath(ruta), download_name=f"perfil_{perfil_id}.prof",
+                                 as_attachment=True)
+    except ValueError:
+        pass
+    return "Perfil no encontrado (o la carga corrió sin perfil)", 404
+
+
+def procesar_lote_carga(pares, resultado_id, avance):
+    """Varios (Subida, sede) en el pool de procesos; deja el Resultado unido bajo resultado_id."""
+    with medir("lote"):
+        try:
+            return _procesar_lote_subidas(pares, resultado_id, avance)
+        finally:
+            for subida, _ in pares:
+                soltar_subida(subida)
+
+
+def _procesar_lote_subidas(pares, resultado_id, avance):
+    avance("leer")
+    # Cada archivo se lee y procesa en otro proceso: aquí se mide el lote completo
+    with fase("lote"):
+        detalle, totales = procesar_lote([(subida.ruta, sede) for subida, sede in pares],
+                                         workers=app.config['LOTE_WORKERS'],
+                                         motor=app.config['MOTOR_PROCESAMIENTO'])
+    contar("dias_empleado", len(detalle))
+    avance("totales")
+    with fase("almacenar"):
+        almacen.guardar(resultado_id, Resultado(detalle, totales))
+    return resultado_id
+
+
+@app.route("/subir_lote", methods=["POST"])
+def subir_lote():
+    """
+    Varios archivos a la vez (p. ej. las tres sedes a fin de mes): campos
+    "archivos" y "sedes" repetidos, en el mismo orden. Responde como /subir.
+    """
+    archivos = request.files.getlist("archivos")
+    sedes = request.form.getlist("sedes")
+
+    if not archivos or any(not a.filename for a in archivos):
+        return error_subida("No se seleccionó archivo")
+    if len(sedes) != len(archivos) or any(s not in HORARIOS_SEDES for s in sedes):
+        return error_subida("Indique una sede válida para cada archivo")
+    if any(extension_de(a.filename) not in EXTENSIONES for a in archivos):
+        return error_subida("Formato no soportado. Use CSV o Excel.")
+
+    pares = []
+    for archivo, sede in zip(archivos, sedes):
+        # Los procesos del pool leen cada archivo por su cuenta: siempre a un temporal
+        with fase("guardar"):
+            pares.append((recibir(archivo, extension_de(archivo.filename), en_disco=True), sede))
+    if any(not subida.tamano for subida, _ in pares):
+        for subida, _ in pares:
+            subida.descartar()
+        return error_subida("El archivo está vacío")
+
+    trabajo_id = cola.enviar(procesar_lote_carga, pares, nuevo_id())
+    session["trabajo_id"] = trabajo_id
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(trabajo_id=trabajo_id,
+                       estado=url_for("estado_trabajo", trabajo_id=trabajo_id)), 202
+    return redirect(url_for("index", trabajo=trabajo_id))
+
+
+@app.route("/trabajos/<trabajo_id>")
+def estado_trabajo(trabajo_id):
+    try:
+        estado = cola.estado(trabajo_id)
+    except ValueError:
+        estado = None
+    if estado is None:
+        return jsonify(error="Trabajo no encontrado"), 404
 
-    return redirect(url_for("vista_previa"))
+    respuesta = {k: estado[k] for k in ("estado", "fase", "fases", "completadas", "progreso", "error")}
+    if estado["estado"] == LISTO:
+        respuesta["vista_previa"] = url_for("vista_previa")
+    return jsonify(respuesta)
 
 
 @app.route("/vista_previa", methods=["GET", "POST"])
 def vista_previa():
-    df = MEMORY.get("df")
-    if df is None:
+    indice = indice_actual()
+    if indice is None:
         return "No hay datos cargados"
 
-    # Lista de nombres
-    nombres = sorted([
-    n for n in df["Nombre"].unique()
-    if "TOTAL" not in n.upper()
-    ])
-
-    # Si no filtra, mostrar todo tal cual viene (ya tenía totales insertados)
-    if request.method == "GET":
-        return render_template(
-            "vista_previa.html",
-            tabla=df.to_dict(orient="records"),
-            nombres=nombres,
-            empleado_seleccionado=None
-        )
+    # Las filas las pide la plantilla por páginas a /vista_previa/datos;
+    # aquí solo van las opciones de los filtros.
+    empleado = request.form.get("empleado") if request.method == "POST" else None
+    resultado = resultado_actual()
+    return render_template(
+        "vista_previa.html",
+        nombres=sorted(indice.nombres),
+        dias=list(indice.dias),
+        estados=list(indice.estados),
+        empleado_seleccionado=empleado,
+        por_pagina=POR_PAGINA,
+        descartadas=resultado.descartadas if resultado is not None else 0,
+    )
 
-    # POST: filtrar
-    empleado = request.form.get("empleado")
 
-    # --- Si quiere todos, mostrar todo el DF con totales ---
-    if not empleado or empleado == "":
-        filtrado = df.copy()
+@app.route("/vista_previa/datos")
+def vista_previa_datos():
+    indice = indice_actual()
+    if indice is None:
+        return jsonify(error="No hay datos cargados"), 404
 
+    args = request.args
+    try:
+        desde = pd.Timestamp(args["desde"]) if args.get("desde") else None
+        hasta = pd.Timestamp(args["hasta"]) if args.get("hasta") else None
+        pagina = int(args.get("pagina", 1))
+        por_pagina = int(args.get("por_pagina", POR_PAGINA))
+    except ValueError as e:
+        return jsonify(error=f"Parámetro inválido: {e}"), 400
+
+    return jsonify(indice.consultar(
+        nombre=args.get("nombre"),
+        desde=desde,
+        hasta=hasta,
+        dia=args.get("dia"),
+        estado=args.get("estado"),
+        orden=args.get("orden"),
+        descendente=args.get("dir") == "desc",
+        pagina=pagina,
+        por_pagina=por_pagina,
+    ))
+
+
+
+# -------------------------
+# DESCARGAS
+# Mismos datos en todos los formatos: xlsx con estilo (personas) o CSV /
+# Parquet / Arrow en streaming (?formato=..., para otros sistemas).
+# -------------------------
+def etag_exportacion(tipo, nombre, formato):
+    """
+    El resultado guardado bajo un id no cambia nunca (una carga nueva usa otro id),
+    así que el ETag sale de la clave sin mirar el contenido.
+    """
+    clave = f"{session.get('resultado_id')}|{tipo}|{nombre}|{formato}|{VERSION_REPORTE}"
+    return hashlib.sha1(clave.encode("utf-8")).hexdigest()
+
+
+def no_modificado(etag):
+    respuesta = Response(status=304)
+    respuesta.set_etag(etag)
+    return respuesta
+
+
+def _contar_salida(contenido):
+    for pedazo in contenido:
+        contar("bytes_salida", len(pedazo))
+        yield pedazo
+
+
+def responder_exportacion(bloques, columnas, formato, nombre_archivo, hoja, tabla, resaltar_ultima=False,
+                          clave_cache=None):
+    etiquetar(formato=formato)
+    if formato == "xlsx":
+        # El xlsx es lo más caro de armar: se guardan los bytes ya generados
+        contenido = exportes_cache.obtener(clave_cache) if clave_cache else None
+        if contenido is None:
+            # Excel con estilo (tabla, anchos, fila TOTAL resaltada) escrito en streaming
+            with fase("exportar"):
+                partes = list(bloques)
+                df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=columnas)
+                contenido = escribir_excel(df, hoja, tabla, resaltar_ultima=resaltar_ultima).getvalue()
+            if clave_cache:
+                exportes_cache.guardar(clave_cache, contenido)
+        return send_file(io.BytesIO(contenido), download_name=f"{nombre_archivo}.xlsx", as_attachment=True)
+
+    if formato == "csv":
+        contenido = csv_en_bloques(bloques, columnas)
     else:
-        # Filtrar solo esa persona
-        filtrado = df[df["Nombre"] == empleado].copy()
-
-        # Obtener solo sus filas normales
-        filas_normales = filtrado[~filtrado["Nombre"].str.contains("TOTAL")].copy()
-
-        # Calcular nuevamente su total de extras
-        def to_minutes(x):
-            if isinstance(x, str) and "h" in x:
-                h, m = x.replace("h", "").replace("m", "").split()
-                return int(h)*60 + int(m)
-            return 0
-
-        total_min = filas_normales["Horas extras"].apply(to_minutes).sum()
-        total_str = f"{total_min//60:02d}h {total_min%60:02d}m"
-
-        # Crear fila TOTAL
-        fila_total = {
-            "Nombre": f"TOTAL HORAS EXTRAS ({empleado})",
-            "Fecha": "",
-            "Día": "",
-            "Entrada": "",
-            "Salida": "",
-            "Horas trabajadas": "",
-            "Tardanza": "",
-            "Horas extras": total_str
-        }
-
-        # Volver a unir todo
-        filtrado = filas_normales.to_dict("records")
-        filtrado.append(fila_total)
-
-        return render_template(
-            "vista_previa.html",
-            tabla=filtrado,
-            nombres=nombres,
-            empleado_seleccionado=empleado
-        )
-
-    # Render para “todos”
-    return render_template(
-        "vista_previa.html",
-        tabla=filtrado.to_dict(orient="records"),
-        nombres=nombres,
-        empleado_seleccionado=empleado
-    )
+        contenido = arrow_en_bloques(bloques, columnas, formato)
+
+    contenido = medir_stream(_contar_salida(fase_iterable("exportar", contenido)))
+    respuesta = Response(stream_with_context(contenido), mimetype=TIPOS_MIME[formato])
+    respuesta.headers.set("Content-Disposition", "attachment", filename=f"{nombre_archivo}.{formato}")
+    return respuesta
 
 
+def _formato_pedido():
+    formato = request.args.get("formato", "xlsx").lower()
+    if formato not in FORMATOS_EXPORTAR:
+        return None, (f"Formato no soportado: {formato}. Use uno de {', '.join(FORMATOS_EXPORTAR)}", 400)
+    if formato in ("parquet", "arrow") and not HAY_ARROW:
+        return None, ("Exportar a Parquet / Arrow requiere pyarrow", 400)
+    return formato, None
+
 
 @app.route('/descargar_extras')
 def descargar_extras():
     nombre = request.args.get("nombre", "todos")
+    formato, error = _formato_pedido()
+    if error:
+        return error
 
-    df = MEMORY.get("df")
-    if df is None or df.empty:
+    # Primero que el resultado siga guardado: si expiró no hay nada que validar
+    resultado = resultado_actual()
+    if resultado is None or resultado.empty:
         return "No hay datos cargados para exportar", 400
 
-    df = df.copy()
-
-    if nombre != "todos":
-        df = df[df["Nombre"] == nombre]
-
-    columnas = [
-        "Nombre", "Fecha", "Día", "Entrada", "Salida",
-        "Horas trabajadas", "Tardanza", "Horas extras"
-    ]
-
-    df = df[columnas]
-
-    # ───────────────────────────────────────────────
-    # Convertir "01h 32m" → minutos
-    # ───────────────────────────────────────────────
-    def parse_horas_extras(valor):
-        if isinstance(valor, str) and "h" in valor:
-            h, m = valor.replace("h", "").replace("m", "").split()
-            return int(h) * 60 + int(m)
-        return 0
-
-    df["extra_min"] = df["Horas extras"].apply(parse_horas_extras)
-    total_min = df["extra_min"].sum()
-    total_horas = f"{total_min // 60:02d}h {total_min % 60:02d}m"
-
-    # Fila total
-    fila_total = {
-        "Nombre": "",
-        "Fecha": "",
-        "Día": "",
-        "Entrada": "",
-        "Salida": "",
-        "Horas trabajadas": "",
-        "Tardanza": "TOTAL",
-        "Horas extras": total_horas,
-        "extra_min": total_min
-    }
+    # Mismo resultado y mismo filtro: el navegador ya tiene el archivo
+    etag = etag_exportacion("extras", nombre, formato)
+    if request.if_none_match.contains(etag):
+        return no_modificado(etag)
 
-    df_total = pd.concat([df, pd.DataFrame([fila_total])], ignore_index=True)
-
-    df_total = df_total.drop(columns=["extra_min"])
-
-    # ───────────────────────────────────────────────
-    # Exportar Excel con estilo
-    # ───────────────────────────────────────────────
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_total.to_excel(writer, index=False, sheet_name="Horas Extras")
-
-        libro = writer.book
-        hoja = writer.sheets["Horas Extras"]
-
-        # -------------------------
-        # 1️⃣ Crear tabla con estilo
-        # -------------------------
-        last_row = len(df_total) + 1
-        last_col = len(df_total.columns)
-
-        ref = f"A1:{chr(64+last_col)}{last_row}"
-        tabla = Table(displayName="TablaExtras", ref=ref)
-
-        estilo = TableStyleInfo(
-            name="TableStyleMedium9",
-            showFirstColumn=False,
-            showLastColumn=False,
-            showRowStripes=True,
-            showColumnStripes=False
-        )
-
-        tabla.tableStyleInfo = estilo
-        hoja.add_table(tabla)
-
-        # -------------------------
-        # 2️⃣ Ajustar ancho de columnas automáticamente
-        # -------------------------
-        for col in hoja.columns:
-            max_length = 0
-            col_letter = col[0].column_letter
-            for cell in col:
-                try:
-                    contenido = str(cell.value)
-                    max_length = max(max_length, len(contenido))
-                except:
-                    pass
-            hoja.column_dimensions[col_letter].width = max_length + 3
-
-        # -------------------------
-        # 3️⃣ Fijar altura de fila
-        # -------------------------
-        for i in range(1, last_row + 1):
-            hoja.row_dimensions[i].height = 22
-
-        # -------------------------
-        # 4️⃣ Colorear última fila (TOTAL)
-        # -------------------------
-        fill_total = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-        bold_font = Font(bold=True)
-
-        for cell in hoja[last_row]:
-            cell.fill = fill_total
-            cell.font = bold_font
-            cell.alignment = Alignment(horizontal="center")
-
-    output.seek(0)
-
-    return send_file(
-        output,
-        download_name=f"horas_extras_{nombre}.xlsx",
-        as_attachment=True
+    persona = None if nombre == "todos" else nombre
+    respuesta = responder_exportacion(
+        bloques_extras(resultado, persona), COLUMNAS_EXTRAS, formato,
+        f"horas_extras_{nombre}", "Horas Extras", "TablaExtras", resaltar_ultima=True,
+        clave_cache=(session["resultado_id"], "extras", nombre, formato)
     )
-
+    respuesta.set_etag(etag)
+    respuesta.headers["Cache-Control"] = "private, no-cache"
+    return respuesta
 
 
 @app.route('/descargar_llegadas')
 def descargar_llegadas():
     nombre = request.args.get("nombre", "todos")
+    formato, error = _formato_pedido()
+    if error:
+        return error
 
-    df = MEMORY.get("df")  # tu DataFrame procesado
-    
-    if df is None or df.empty:
+    # Primero que el resultado siga guardado: si expiró no hay nada que validar
+    resultado = resultado_actual()  # reporte procesado de la sesión
+    if resultado is None or resultado.empty:
         return "No hay datos cargados para exportar", 400
-    
-    df = df.copy()
-
-    # Filtrar por persona
-    if nombre != "todos":
-        df = df[df["Nombre"] == nombre]
-
-    # Solo estas columnas
-    columnas = ["Nombre", "Fecha", "Día", "Entrada"]
-    df = df[columnas]
-
-    # Creamos un Excel con estilo
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name="Llegadas")
-
-        libro = writer.book
-        hoja = writer.sheets["Llegadas"]
-
-        # ============================
-        # 1️⃣ Crear tabla con estilo
-        # ============================
-        last_row = len(df) + 1
-        last_col = len(df.columns)
-
-        ref = f"A1:{chr(64 + last_col)}{last_row}"
-        tabla = Table(displayName="TablaLlegadas", ref=ref)
-
-        estilo = TableStyleInfo(
-            name="TableStyleMedium9",
-            showFirstColumn=False,
-            showLastColumn=False,
-            showRowStripes=True,
-            showColumnStripes=False
-        )
-
-        tabla.tableStyleInfo = estilo
-        hoja.add_table(tabla)
-
-        # ============================
-        # 2️⃣ Auto-ajuste de columnas
-        # ============================
-        for col in hoja.columns:
-            max_len = 0
-            col_letter = col[0].column_letter
-            for cell in col:
-                try:
-                    val = str(cell.value)
-                    max_len = max(max_len, len(val))
-                except:
-                    pass
-            hoja.column_dimensions[col_letter].width = max_len + 3
-
-        # ============================
-        # 3️⃣ Altura fija de filas
-        # ============================
-        for i in range(1, last_row + 1):
-            hoja.row_dimensions[i].height = 22
-
-    output.seek(0)
-
-    return send_file(
-        output,
-        download_name=f"llegadas_{nombre}.xlsx",
-        as_attachment=True
+
+    # Mismo resultado y mismo filtro: el navegador ya tiene el archivo
+    etag = etag_exportacion("llegadas", nombre, formato)
+    if request.if_none_match.contains(etag):
+        return no_modificado(etag)
+
+    persona = None if nombre == "todos" else nombre
+    respuesta = responder_exportacion(
+        bloques_llegadas(resultado, persona), COLUMNAS_LLEGADAS, formato,
+        f"llegadas_{nombre}", "Llegadas", "TablaLlegadas",
+        clave_cache=(session["resultado_id"], "llegadas", nombre, formato)
     )
+    respuesta.set_etag(etag)
+    respuesta.headers["Cache-Control"] = "private, no-cache"
+    return respuesta
 
 
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+#benchmark.py
+"""
+Mide el camino subir -> procesar -> exportar con marcaciones sintéticas, para
+detectar regresiones en la lectura, procesar_registros y la exportación.
+
+    python benchmark.py
+    python benchmark.py --empleados 200,2000 --dias 30 --marcas 2,4 --repeticiones 5
+    python benchmark.py --guardar-base bench_base.json
+    python benchmark.py --comparar bench_base.json --tolerancia 0.2
+    python benchmark.py --generar data/sinteticos/      # solo escribe los archivos
+
+Los archivos imitan las exportaciones del huellero: "medellin" (encabezados
+en español, Latin-1, como data/uploads/Cartagena.csv) y "original" (Original
+Records Report, en inglés, UTF-8), con coma o punto y coma, y "xlsx". Cada
+caso se genera con la misma semilla, así que el reporte que sale siempre es
+el mismo: su huella se guarda en la base y se compara junto con los tiempos.
+
+Fases: leer (leer_archivo, como /subir), fechas, agrupar, calcular y totales
+(las que avisa procesar_registros) y exportar (extras + llegadas). La memoria
+pico se mide aparte con tracemalloc (solo lo que pasa por el asignador de
+Python / NumPy) en una corrida que no cuenta para los tiempos.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# MARCACIONES SINTÉTICAS
+# -------------------------
+# Encabezado, codificación y texto de relleno de cada exportación del huellero
+PLANTILLAS = {
+    "medellin": {
+        "columnas": ["ID de persona", "Nombre", "Departamento", "Hora", "Estado de asistencia",
+                     "Punto de verificación de asistencia", "Nombre personalizado", "Fuente de datos",
+                     "Gestión de informe", "Temperatura", "Anormal"],
+        "encoding": "latin-1",
+        "relleno": ["New Organization", "Nada", "DHI_Door1_Entrance Card Reader1", "-",
+                    "Registro de deslizamiento de tarjeta", "-", "-", "-"],
+    },
+    "original": {
+        "columnas": ["Person ID", "Name", "Department", "Time", "Attendance Status",
+                     "Attendance Check Point", "Custom Name", "Data Source", "Handling Type",
+                     "Temperature", "Abnormal"],
+        "encoding": "utf-8",
+        "relleno": ["DHI", "None", "admin_Door1_Entrance Card Reader1", "-",
+                    "Original Records", "-", "-", "-"],
+    },
+}
+SEPARADORES = {"coma": ",", "pyc": ";"}
+
+NOMBRES = ["José", "María", "Ana", "Luis", "Sofía", "Andrés", "Diana", "Martín", "Nicolás", "Camila"]
+APELLIDOS = ["Muñoz", "Gómez", "Peña", "Henríquez", "Carmona", "Ibáñez", "Redondo", "Castaño"]
+
+PRIMER_DIA = "2025-09-01"   # lunes
+ENTRADA_MEDIA = 8 * 60      # minutos desde medianoche
+SALIDA_MEDIA = 17 * 60 + 15
+
+
+def generar_marcaciones(empleados, dias, marcas_por_dia, sin_marcas=0.03, marca_unica=0.05,
+                        formato_fecha="%Y-%m-%d %H:%M:%S", semilla=0):
+    """
+    DataFrame (ID, Nombre, Hora) con marcas_por_dia marcas por empleado y día
+    (domingos incluidos, como en los archivos reales). Una fracción sin_marcas
+    de los días-empleado no tiene marcas y otra marca_unica tiene una sola.
+    """
+    rng = np.random.default_rng(semilla)
+    nombres = np.array([f"{NOMBRES[i % len(NOMBRES)]} {APELLIDOS[i // len(NOMBRES) % len(APELLIDOS)]} {i}"
+                        for i in range(empleados)], dtype=object)
+
+    # Un "turno" por empleado y día, con su cantidad de marcas
+    turnos = empleados * dias
+    cantidad = np.full(turnos, marcas_por_dia, dtype=np.int64)
+    azar = rng.random(turnos)
+    cantidad[azar < sin_marcas + marca_unica] = 1
+    cantidad[azar < sin_marcas] = 0
+
+    entrada = ENTRADA_MEDIA + rng.normal(0, 15, turnos)
+    salida = SALIDA_MEDIA + rng.normal(0, 30, turnos)
+
+    turno = np.repeat(np.arange(turnos), cantidad)
+    # Posición de cada marca dentro de su turno: 0, 1, ..., cantidad - 1
+    inicio = np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+    posicion = np.arange(len(turno)) - inicio
+    c = cantidad[turno]
+
+    # Varias marcas: repartidas entre la entrada y la salida (almuerzo, salidas
+    # cortas). Una sola: la entrada o la salida, al azar.
+    fraccion = np.where(c > 1, posicion / np.maximum(c - 1, 1), rng.integers(0, 2, len(turno)))
+    minutos = entrada[turno] + (salida[turno] - entrada[turno]) * fraccion + rng.normal(0, 3, len(turno))
+    segundos = np.clip(np.rint(minutos * 60), 0, 24 * 3600 - 1).astype("timedelta64[s]")
+
+    empleado, dia = np.divmod(turno, dias)
+    hora = np.datetime64(PRIMER_DIA) + dia.astype("timedelta64[D]") + segundos
+
+    return pd.DataFrame({
+        "ID": np.char.add("'", (empleado + 1).astype(str)),
+        "Nombre": nombres[empleado],
+        "Hora": pd.Series(hora).dt.strftime(formato_fecha),
+    })
+
+
+def escribir_archivo(marcaciones, ruta, plantilla="medellin", separador=","):
+    """Archivo con el encabezado y las columnas de relleno de la plantilla (CSV o, si ruta es .xlsx, Excel)."""
+    p = PLANTILLAS[plantilla]
+    columnas = p["columnas"]
+    df = pd.DataFrame({columnas[0]: marcaciones["ID"], columnas[1]: marcaciones["Nombre"]})
+    df[columnas[2]] = p["relleno"][0]
+    df[columnas[3]] = marcaciones["Hora"]
+    for columna, valor in zip(columnas[4:], p["relleno"][1:]):
+        df[columna] = valor
+
+    if ruta.endswith(".xlsx"):
+        df.to_excel(ruta, index=False)
+    else:
+        df.to_csv(ruta, sep=separador, index=False, encoding=p["encoding"])
+
+
+# -------------------------
+# CASOS
+# -------------------------
+def armar_casos(empleados, dias, marcas, plantillas, separadores):
+    """Producto de los parámetros; cada caso lleva un nombre estable (clave en la base)."""
+    casos = []
+    for plantilla in plantillas:
+        # Excel no tiene separador: un solo caso por tamaño
+        variantes = [("xlsx", "coma", "xlsx")] if plantilla == "xlsx" else \
+            [(f"{plantilla}-{s}", s, "csv") for s in separadores]
+        for prefijo, separador, extension in variantes:
+            for e in empleados:
+                for d in dias:
+                    for m in marcas:
+                        casos.append({"nombre": f"{prefijo}-{e}x{d}x{m}", "plantilla": plantilla,
+                                      "separador": separador, "extension": extension,
+                                      "empleados": e, "dias": d, "marcas": m})
+    return casos
+
+
+def preparar_archivo(caso, carpeta, formato_fecha, semilla):
+    marcaciones = generar_marcaciones(caso["empleados"], caso["dias"], caso["marcas"],
+                                      formato_fecha=formato_fecha, semilla=semilla)
+    ruta = os.path.join(carpeta, f"{caso['nombre']}.{caso['extension']}")
+    plantilla = "medellin" if caso["plantilla"] == "xlsx" else caso["plantilla"]
+    escribir_archivo(marcaciones, ruta, plantilla, SEPARADORES[caso["separador"]])
+    return ruta, len(marcaciones)
+
+
+# -------------------------
+# MEDICIÓN
+# -------------------------
+FASES = ("leer", "fechas", "agrupar", "calcular", "totales", "exportar")
+
+
+def huella_reporte(detalle):
+    """Huella del contenido del reporte: cambia si cambia cualquier celda."""
+    if detalle.empty:
+        return "vacio"
+    hashes = pd.util.hash_pandas_object(detalle.astype(str), index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:12]
+
+
+def correr_pipeline(ruta, sede, motor, formato, carpeta_salida):
+    """Una pasada completa; devuelve (segundos por fase, detalle)."""
+    from utils.exportar import guardar_exportacion
+    from utils.lectura import leer_archivo
+    from utils.procesamiento import procesar_registros
+    from utils.resultado import Resultado
+
+    tiempos = dict.fromkeys(FASES, 0.0)
+    marcas = []
+
+    inicio = time.perf_counter()
+    df = leer_archivo(ruta)
+    tiempos["leer"] = time.perf_counter() - inicio
+
+    # procesar_registros avisa el comienzo de cada fase; lo previo (normalizar
+    # columnas, compilar el horario) se suma a la primera
+    inicio = time.perf_counter()
+    detalle, totales = procesar_registros(df, sede, motor=motor,
+                                          avance=lambda fase: marcas.append((fase, time.perf_counter())))
+    fin = time.perf_counter()
+    limites = [t for _, t in marcas[1:]] + [fin]
+    for i, ((fase, t), hasta) in enumerate(zip(marcas, limites)):
+        tiempos[fase] += hasta - (inicio if i == 0 else t)
+
+    inicio = time.perf_counter()
+    resultado = Resultado(detalle, totales)
+    for tipo in ("extras", "llegadas"):
+        guardar_exportacion(resultado, tipo, formato, os.path.join(carpeta_salida, f"{tipo}.{formato}"))
+    tiempos["exportar"] = time.perf_counter() - inicio
+    return tiempos, detalle
+
+
+def medir_caso(ruta, sede, motor, formato, repeticiones, calentar, memoria, carpeta_salida):
+    """Mediana de cada fase sobre `repeticiones` pasadas (tras `calentar` sin contar) + memoria pico."""
+    for _ in range(calentar):
+        correr_pipeline(ruta, sede, motor, formato, carpeta_salida)
+
+    corridas = []
+    for _ in range(repeticiones):
+        tiempos, detalle = correr_pipeline(ruta, sede, motor, formato, carpeta_salida)
+        corridas.append(tiempos)
+    medianas = {fase: statistics.median(c[fase] for c in corridas) for fase in FASES}
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        correr_pipeline(ruta, sede, motor, formato, carpeta_salida)
+        pico = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+
+    return medianas, pico, detalle
+
+
+def entorno():
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "cpus": os.cpu_count(), "maquina": platform.machine(), "sistema": platform.system()}
+
+
+# -------------------------
+# COMPARACIÓN CON LA BASE
+# -------------------------
+# Diferencias menores a esto son ruido de medición, aunque en porcentaje sean grandes
+RUIDO_SEG = 0.005
+
+
+def comparar(actual, base, tolerancia):
+    """Líneas de diferencias (fases más lentas que la base + tolerancia, o reportes distintos)."""
+    problemas = []
+    for nombre, caso in actual.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        if anterior.get("huella") != caso["huella"]:
+            problemas.append(f"{nombre}: el reporte cambió (huella {anterior.get('huella')} -> {caso['huella']})")
+        for fase in FASES + ("total",):
+            antes = anterior["tiempos"].get(fase, 0.0) if fase != "total" else anterior["total"]
+            ahora = caso["tiempos"][fase] if fase != "total" else caso["total"]
+            if ahora - antes > RUIDO_SEG and ahora > antes * (1 + tolerancia):
+                problemas.append(f"{nombre}: {fase} {antes * 1000:.1f}ms -> {ahora * 1000:.1f}ms "
+                                 f"(+{(ahora / antes - 1) * 100 if antes else float('inf'):.0f}%)")
+    return problemas
+
+
+def _mostrar(nombre, caso, anterior=None):
+    t = caso["tiempos"]
+    fases = "  ".join(f"{fase} {t[fase] * 1000:7.1f}" for fase in FASES)
+    pico = f"  pico {caso['pico_mb']:.0f}MB" if caso["pico_mb"] is not None else ""
+    cambio = ""
+    if anterior:
+        cambio = f"  ({(caso['total'] / anterior['total'] - 1) * 100:+.0f}% vs base)"
+    print(f"{nombre:<32} {caso['marcaciones']:>9} marcas | {fases} | total {caso['total'] * 1000:8.1f}ms  "
+          f"{caso['marcas_seg'] / 1000:7.0f}k marcas/s  {caso['mb_seg']:6.1f}MB/s{pico}{cambio}")
+
+
+def _lista_enteros(texto):
+    return [int(v) for v in texto.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de lectura, procesamiento y exportación.")
+    parser.add_argument("--empleados", default="50,300", help="cantidades de empleados, separadas por coma")
+    parser.add_argument("--dias", default="30", help="cantidades de días")
+    parser.add_argument("--marcas", default="2,4", help="marcas por día-empleado")
+    parser.add_argument("--plantillas", default="medellin,original",
+                        help=f"formatos de archivo: {', '.join(PLANTILLAS)}, xlsx (lento de generar y leer)")
+    parser.add_argument("--separadores", default="coma,pyc", help="coma, pyc (punto y coma)")
+    parser.add_argument("--formato-fecha", default="%Y-%m-%d %H:%M:%S", help="formato de la columna Hora")
+    parser.add_argument("--sede", default="medellin")
+    parser.add_argument("--motor", default="vectorizado", choices=("vectorizado", "clasico"))
+    parser.add_argument("--exportar", default="xlsx", choices=("xlsx", "csv", "parquet", "arrow"),
+                        help="formato de las descargas")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--calentar", type=int, default=1, help="pasadas previas que no se cuentan")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir la memoria pico (más rápido)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--guardar-base", help="escribir los resultados como base (JSON)")
+    parser.add_argument("--comparar", help="base (JSON) contra la que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="fracción más lenta que la base que cuenta como regresión")
+    parser.add_argument("--generar", help="solo escribir los archivos sintéticos en esta carpeta")
+    args = parser.parse_args(argv)
+
+    plantillas = [p.strip() for p in args.plantillas.split(",") if p.strip()]
+    separadores = [s.strip() for s in args.separadores.split(",") if s.strip()]
+    if any(p not in PLANTILLAS and p != "xlsx" for p in plantillas):
+        parser.error(f"--plantillas admite: {', '.join(PLANTILLAS)}, xlsx")
+    if any(s not in SEPARADORES for s in separadores):
+        parser.error(f"--separadores admite: {', '.join(SEPARADORES)}")
+    casos = armar_casos(_lista_enteros(args.empleados), _lista_enteros(args.dias),
+                        _lista_enteros(args.marcas), plantillas, separadores)
+
+    if args.generar:
+        os.makedirs(args.generar, exist_ok=True)
+        for caso in casos:
+            ruta, n = preparar_archivo(caso, args.generar, args.formato_fecha, args.semilla)
+            print(f"{ruta}: {n} marcaciones")
+        return 0
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("entorno") != entorno():
+            print(f"Aviso: la base se midió en otro entorno: {base.get('entorno')}")
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for caso in casos:
+            ruta, n = preparar_archivo(caso, carpeta, args.formato_fecha, args.semilla)
+            tiempos, pico, detalle = medir_caso(ruta, args.sede, args.motor, args.exportar, args.repeticiones,
+                                                args.calentar, not args.sin_memoria, carpeta)
+            total = sum(tiempos.values())
+            resultados[caso["nombre"]] = {
+                "marcaciones": n, "bytes": os.path.getsize(ruta), "tiempos": tiempos, "total": total,
+                "marcas_seg": n / total, "mb_seg": os.path.getsize(ruta) / 1024 ** 2 / total,
+                "pico_mb": pico, "dias_empleado": len(detalle), "huella": huella_reporte(detalle),
+            }
+            _mostrar(caso["nombre"], resultados[caso["nombre"]], (base or {}).get("casos", {}).get(caso["nombre"]))
+
+    if args.guardar_base:
+        with open(args.guardar_base, "w", encoding="utf-8") as f:
+            json.dump({"entorno": entorno(), "motor": args.motor, "exportar": args.exportar,
+                       "casos": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"Base guardada en {args.guardar_base}")
+
+    if base is not None:
+        problemas = comparar(resultados, base.get("casos", {}), args.tolerancia)
+        for p in problemas:
+            print(f"REGRESIÓN {p}")
+        if problemas:
+            return 1
+        print("Sin regresiones respecto de la base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# conftest.py
+# Está en la raíz para que pytest la agregue al path y los tests importen utils.
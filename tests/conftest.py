@@ -0,0 +1,30 @@
+# conftest.py
+import copy
+
+import pytest
+
+from utils import horarios_bd
+from utils.bd import crear_pool
+from utils.horarios import HORARIOS_SEDES, VENTANAS_SEDES, recargar_horarios
+
+# -------------------------
+# FIXTURES COMPARTIDAS
+# -------------------------
+
+
+@pytest.fixture
+def horarios():
+    """Deja los horarios de fábrica y el estado de sincronización como estaban al terminar."""
+    horarios_antes, ventanas_antes = copy.deepcopy(HORARIOS_SEDES), copy.deepcopy(VENTANAS_SEDES)
+    version_antes, revisado_antes = horarios_bd._version_cargada, horarios_bd._revisado
+    yield
+    recargar_horarios(horarios_antes, ventanas_antes)
+    horarios_bd._version_cargada, horarios_bd._revisado = version_antes, revisado_antes
+
+
+@pytest.fixture
+def bd(tmp_path):
+    """Pool sobre una base sqlite nueva (vacía, sin tablas)."""
+    pool = crear_pool("sqlite", ruta=str(tmp_path / "overtrack.db"))
+    yield pool
+    pool.cerrar()
@@ -0,0 +1,66 @@
+# test_almacen.py
+import os
+import time
+
+from utils import almacen as modulo
+from utils.almacen import AlmacenDisco, AlmacenMemoria
+
+# -------------------------
+# LRU Y EXPIRACIÓN DE LOS ALMACENES
+# -------------------------
+
+
+def test_memoria_expulsa_el_menos_usado():
+    almacen = AlmacenMemoria(max_bytes=25)
+    almacen.guardar("a", b"x" * 10)
+    almacen.guardar("b", b"x" * 10)
+    assert almacen.obtener("a") is not None  # "b" queda como el menos usado
+    almacen.guardar("c", b"x" * 10)
+
+    assert almacen.obtener("b") is None
+    assert almacen.obtener("a") is not None and almacen.obtener("c") is not None
+    assert almacen.bytes_usados == 20
+
+
+def test_memoria_conserva_el_ultimo_aunque_pase_el_tope():
+    almacen = AlmacenMemoria(max_bytes=5)
+    almacen.guardar("a", b"x" * 10)
+    assert almacen.obtener("a") == b"x" * 10
+
+
+def test_memoria_expira_por_tiempo_sin_uso(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(modulo.time, "time", lambda: ahora[0])
+    almacen = AlmacenMemoria(ttl_segundos=60)
+    almacen.guardar("a", b"x")
+
+    ahora[0] += 50
+    assert almacen.obtener("a") == b"x"  # el uso renueva el plazo
+    ahora[0] += 50
+    assert almacen.obtener("a") == b"x"
+    ahora[0] += 61
+    assert almacen.obtener("a") is None
+    assert almacen.bytes_usados == 0
+
+
+def test_disco_expira_por_fecha_de_uso(tmp_path):
+    almacen = AlmacenDisco(str(tmp_path), ttl_segundos=60)
+    almacen.guardar("a", {"n": 1})
+    assert almacen.obtener("a") == {"n": 1}
+
+    viejo = time.time() - 120
+    os.utime(almacen._ruta("a"), (viejo, viejo))
+    assert almacen.obtener("a") is None
+    assert not os.path.exists(almacen._ruta("a"))
+
+
+def test_disco_expulsa_el_menos_usado(tmp_path):
+    almacen = AlmacenDisco(str(tmp_path), max_bytes=2500)
+    for i, clave in enumerate(("a", "b")):
+        almacen.guardar(clave, b"x" * 1000)
+        # Fechas de uso distintas sin esperar: "a" es la más vieja
+        os.utime(almacen._ruta(clave), (time.time() - 100 + i, time.time() - 100 + i))
+    almacen.guardar("c", b"x" * 1000)
+
+    assert almacen.obtener("a") is None
+    assert almacen.obtener("b") is not None and almacen.obtener("c") is not None
@@ -0,0 +1,112 @@
+# test_app.py
+import io
+import os
+import time
+
+import pytest
+
+import app as overtrack
+from utils.usuarios import preparar_usuarios
+
+# -------------------------
+# RUTAS DE LA APP (cliente de prueba de Flask, BD sqlite)
+# -------------------------
+CARPETA = os.path.join(os.path.dirname(__file__), "..", "data", "uploads")
+
+
+@pytest.fixture
+def cliente(bd, monkeypatch):
+    monkeypatch.setattr(overtrack, "pool_bd", bd)
+    with bd.conexion() as conexion:
+        preparar_usuarios(conexion, "sqlite")
+    return overtrack.app.test_client()
+
+
+def subir(cliente, archivo, sede, **campos):
+    """Sube un archivo de data/uploads y espera a que termine su trabajo."""
+    with open(os.path.join(CARPETA, archivo), "rb") as f:
+        datos = f.read()
+    r = cliente.post("/subir", data={"archivo_csv": (io.BytesIO(datos), archivo), "sede": sede, **campos},
+                     content_type="multipart/form-data", headers={"Accept": "application/json"})
+    assert r.status_code == 202, r.get_data(as_text=True)
+    respuesta = r.get_json()
+    fin = time.monotonic() + 30
+    while time.monotonic() < fin:
+        estado = cliente.get(respuesta["estado"]).get_json()
+        if estado["estado"] in ("listo", "error"):
+            return respuesta, estado
+        time.sleep(0.01)
+    raise AssertionError("la carga no terminó")
+
+
+def test_etag_no_responde_304_si_el_resultado_expiro(cliente):
+    _, estado = subir(cliente, "medellin.csv", "medellin")
+    assert estado["estado"] == "listo"
+
+    for ruta in ("/descargar_extras?formato=csv", "/descargar_llegadas?formato=csv"):
+        r = cliente.get(ruta)
+        assert r.status_code == 200
+        etag = r.headers["ETag"]
+        r.get_data()
+        assert cliente.get(ruta, headers={"If-None-Match": etag}).status_code == 304
+
+        with cliente.session_transaction() as sesion:
+            resultado_id = sesion["resultado_id"]
+        overtrack.almacen.borrar(resultado_id)
+        assert cliente.get(ruta, headers={"If-None-Match": etag}).status_code == 400
+
+        subir(cliente, "medellin.csv", "medellin")
+
+
+def test_login_rehace_la_contrasena_en_texto_plano(cliente, bd, monkeypatch):
+    monkeypatch.setitem(overtrack.app.config, "PASSWORD_METODO", "pbkdf2:sha256:1000")
+    with bd.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("INSERT INTO usuarios (name, email, password) VALUES (%s, %s, %s)",
+                       ("Ana", "ana@x.co", "secreta"))
+        conexion.commit()
+
+    r = cliente.post("/login", data={"email": "ana@x.co", "password": "mala"})
+    assert r.status_code == 200 and "incorrecta" in r.get_data(as_text=True)
+
+    r = cliente.post("/login", data={"email": "ana@x.co", "password": "secreta"})
+    assert r.status_code == 302
+    with cliente.session_transaction() as sesion:
+        assert sesion["loggedin"] and sesion["name"] == "Ana"
+    with bd.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT password FROM usuarios WHERE email = %s", ("ana@x.co",))
+        assert cursor.fetchone()["password"].startswith("pbkdf2:sha256:1000$")
+
+
+def test_trabajo_con_error_se_olvida(cliente):
+    r = cliente.post("/subir", data={"archivo_csv": (io.BytesIO(b"a,b\n1,2\n"), "malo.csv"), "sede": "medellin"},
+                     content_type="multipart/form-data", headers={"Accept": "application/json"})
+    url = r.get_json()["estado"]
+    while (estado := cliente.get(url).get_json())["estado"] not in ("listo", "error"):
+        time.sleep(0.01)
+    assert estado["estado"] == "error"
+    cliente.get("/")
+    with cliente.session_transaction() as sesion:
+        assert "trabajo_id" not in sesion
+
+
+def test_perfil_solo_para_la_sesion_que_subio(cliente, monkeypatch):
+    monkeypatch.setitem(overtrack.app.config, "PERFILAR_TODAS", True)
+    respuesta, _ = subir(cliente, "medellin.csv", "medellin")
+    assert cliente.get(respuesta["perfil"] + "?formato=txt").status_code == 200
+    assert overtrack.app.test_client().get(respuesta["perfil"] + "?formato=txt").status_code == 404
+
+
+def test_metrics_solo_desde_direcciones_permitidas(cliente):
+    subir(cliente, "medellin.csv", "medellin")
+    texto = cliente.get("/metrics").get_data(as_text=True)
+    # La sede se conoce a mitad del request y aun así etiqueta los bytes recibidos antes
+    assert 'overtrack_bytes_entrada_total{operacion="subir",sede="medellin"}' in texto
+    assert cliente.get("/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"}).status_code == 403
+
+
+def test_clave_estado_de_sedes_con_espacios():
+    assert overtrack.clave_estado("medellin") == "medellin"
+    clave = overtrack.clave_estado("santa marta")
+    assert clave.startswith("sede_") and clave != overtrack.clave_estado("bogotá")
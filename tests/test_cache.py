@@ -0,0 +1,81 @@
+# test_cache.py
+import copy
+
+import pandas as pd
+
+from utils import cache
+from utils.cache import CacheReportes, clave_reporte
+from utils.horarios import HORARIOS_SEDES, VENTANAS_SEDES, VENTANAS_DEFECTO, recargar_horarios
+from utils.procesamiento import procesar_incremental, resumir_por_bloques
+
+# -------------------------
+# INVALIDACIÓN DE LA CACHÉ Y DEL ESTADO INCREMENTAL
+# Editar el horario, el almuerzo o las ventanas de una sede (o cambiar
+# VERSION_REPORTE) debe cambiar la clave: lo viejo deja de encontrarse.
+# -------------------------
+HUELLA = "a" * 64
+MARCAS = pd.DataFrame({"nombre": ["Ana", "Ana", "Luis", "Luis"],
+                       "fecha_hora": ["01/10/2025 07:58", "01/10/2025 18:30",
+                                      "01/10/2025 08:10", "01/10/2025 17:00"]})
+
+
+def editar(sede, **cambios):
+    horarios = copy.deepcopy(HORARIOS_SEDES)
+    horarios[sede]["Miércoles"].update(cambios)
+    recargar_horarios(horarios)
+
+
+def test_clave_por_contenido_y_sede(horarios):
+    clave = clave_reporte(HUELLA, "medellin")
+    assert clave == clave_reporte(HUELLA, "medellin")
+    assert clave != clave_reporte("b" * 64, "medellin")
+    assert clave != clave_reporte(HUELLA, "barranquilla")
+
+
+def test_editar_horario_o_almuerzo_cambia_la_clave(horarios):
+    original = clave_reporte(HUELLA, "medellin")
+    editar("medellin", entrada="09:00")
+    con_entrada = clave_reporte(HUELLA, "medellin")
+    editar("medellin", almuerzo=30)
+    con_almuerzo = clave_reporte(HUELLA, "medellin")
+    assert len({original, con_entrada, con_almuerzo}) == 3
+    # Las otras sedes no se enteran
+    assert clave_reporte(HUELLA, "barranquilla") == clave_reporte(HUELLA, "barranquilla")
+
+
+def test_editar_ventanas_cambia_la_clave(horarios):
+    original = clave_reporte(HUELLA, "medellin")
+    ventanas = copy.deepcopy(VENTANAS_SEDES)
+    ventanas["medellin"] = {"entrada": ("05:00", "10:00"), "salida": ("15:00", "23:00")}
+    assert ventanas["medellin"] != VENTANAS_SEDES.get("medellin", VENTANAS_DEFECTO)
+    recargar_horarios(ventanas=ventanas)
+    assert clave_reporte(HUELLA, "medellin") != original
+
+
+def test_version_del_reporte_cambia_la_clave(monkeypatch):
+    original = clave_reporte(HUELLA, "medellin")
+    monkeypatch.setattr(cache, "VERSION_REPORTE", cache.VERSION_REPORTE + 1)
+    assert clave_reporte(HUELLA, "medellin") != original
+
+
+def test_reporte_viejo_deja_de_encontrarse(tmp_path, horarios):
+    reportes = CacheReportes(str(tmp_path))
+    reportes.guardar(clave_reporte(HUELLA, "medellin"), pd.DataFrame({"Nombre": ["Ana"]}))
+    assert reportes.obtener(clave_reporte(HUELLA, "medellin")) is not None
+    editar("medellin", salida="19:00")
+    assert reportes.obtener(clave_reporte(HUELLA, "medellin")) is None
+
+
+def test_estado_incremental_se_recalcula_si_cambia_el_horario(horarios):
+    resumen = resumir_por_bloques([MARCAS])
+    _, _, estado, recalculados = procesar_incremental(resumen, "medellin")
+    assert recalculados == 2
+
+    antes, _, estado, recalculados = procesar_incremental(resumen, "medellin", estado)
+    assert recalculados == 0
+
+    editar("medellin", salida="16:00")
+    detalle, _, _, recalculados = procesar_incremental(resumen, "medellin", estado)
+    assert recalculados == 2
+    extras = lambda d: d.loc[d["Nombre"] == "Ana", "Horas extras"].iloc[0]
+    assert extras(detalle) > extras(antes)
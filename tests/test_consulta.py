@@ -0,0 +1,83 @@
+# test_consulta.py
+import os
+
+import pytest
+
+from utils.consulta import MAX_POR_PAGINA, IndiceReporte
+from utils.lectura import leer_csv
+from utils.procesamiento import procesar_registros
+from utils.resultado import Resultado
+
+# -------------------------
+# VISTA PREVIA PAGINADA
+# -------------------------
+ARCHIVO = os.path.join(os.path.dirname(__file__), "..", "data", "uploads", "medellin.csv")
+
+
+@pytest.fixture(scope="module")
+def resultado():
+    return Resultado(*procesar_registros(leer_csv(ARCHIVO), "medellin"))
+
+
+@pytest.fixture(scope="module")
+def indice(resultado):
+    return IndiceReporte(resultado)
+
+
+def todas_las_paginas(indice, **parametros):
+    paginas = []
+    pagina = 1
+    while True:
+        j = indice.consultar(pagina=pagina, **parametros)
+        paginas.append(j)
+        if pagina >= j["paginas"]:
+            return paginas
+        pagina += 1
+
+
+def test_paginas_cubren_el_filtro(indice, resultado):
+    paginas = todas_las_paginas(indice, por_pagina=37)
+    filas = [f for j in paginas for f in j["filas"]]
+    assert len(filas) == paginas[0]["total_filas"] == len(resultado.detalle)
+    assert [f["Nombre"] for f in filas] == resultado.detalle["Nombre"].tolist()
+    assert all(len(j["filas"]) == 37 for j in paginas[:-1])
+
+
+def test_pagina_y_tamano_fuera_de_rango(indice):
+    j = indice.consultar(pagina=999, por_pagina=50)
+    assert j["pagina"] == j["paginas"]
+    assert indice.consultar(pagina=-3)["pagina"] == 1
+    assert indice.consultar(por_pagina=10_000)["por_pagina"] == MAX_POR_PAGINA
+    assert indice.consultar(por_pagina=0)["por_pagina"] == 1
+    vacio = indice.consultar(nombre="No existe")
+    assert vacio["filas"] == [] and vacio["paginas"] == 1 and vacio["total_extras"] == 0
+
+
+def test_total_por_empleado_una_vez_y_al_final_de_sus_filas(indice, resultado):
+    vistos = {}
+    for j in todas_las_paginas(indice, por_pagina=37):
+        for total in j["totales_persona"]:
+            assert total["nombre"] not in vistos
+            vistos[total["nombre"]] = total["extras"]
+            fila = j["filas"][total["despues"]]
+            assert fila["Nombre"] == total["nombre"]
+            # La fila siguiente (en esta página) ya es de otro empleado
+            siguiente = total["despues"] + 1
+            assert siguiente == len(j["filas"]) or j["filas"][siguiente]["Nombre"] != total["nombre"]
+    assert vistos == resultado.totales.to_dict()
+
+
+def test_total_por_empleado_respeta_el_filtro(indice, resultado):
+    detalle = resultado.detalle
+    estado = detalle["Estado"].iloc[0]
+    esperado = detalle[detalle["Estado"] == estado].groupby("Nombre")["Horas extras"].sum().to_dict()
+    vistos = {t["nombre"]: t["extras"]
+              for j in todas_las_paginas(indice, por_pagina=25, estado=estado) for t in j["totales_persona"]}
+    assert vistos == esperado
+
+
+def test_sin_total_por_empleado_fuera_del_orden_por_nombre(indice, resultado):
+    assert indice.consultar(orden="Fecha")["totales_persona"] == []
+    nombre = resultado.nombres[0]
+    assert indice.consultar(nombre=nombre)["totales_persona"] == []
+    assert indice.consultar(orden="Nombre")["totales_persona"] != []
@@ -0,0 +1,55 @@
+# test_fechas.py
+import pandas as pd
+
+from utils.fechas import FECHA_MINIMA, convertir_fechas, detectar_formato
+
+# -------------------------
+# DETECCIÓN DE FORMATO Y DESCARTE DE FECHAS
+# -------------------------
+
+
+def test_empate_se_lee_dia_mes():
+    # Todos los días <= 12: cualquiera de los dos formatos sirve, gana día/mes
+    valores = pd.Series(["01/10/2025 08:00", "02/10/2025 17:30", "03/11/2025 08:01"])
+    assert detectar_formato(valores) == "%d/%m/%Y %H:%M"
+    fechas, descartadas = convertir_fechas(valores)
+    assert fechas[0] == pd.Timestamp("2025-10-01 08:00")
+    assert descartadas == 0
+
+
+def test_mes_dia_cuando_el_archivo_lo_muestra():
+    valores = pd.Series(["10/01/2025 08:00", "10/25/2025 17:30", "10/31/2025 08:01"])
+    assert detectar_formato(valores) == "%m/%d/%Y %H:%M"
+    fechas, _ = convertir_fechas(valores)
+    assert fechas[0] == pd.Timestamp("2025-10-01 08:00")
+
+
+def test_la_muestra_cubre_toda_la_columna():
+    # Los primeros mil valores empatan; los días > 12 recién aparecen al final
+    valores = pd.Series(["10/01/2025 08:00"] * 5000 + ["10/25/2025 08:00"] * 5000)
+    assert detectar_formato(valores) == "%m/%d/%Y %H:%M"
+
+
+def test_rezagados_con_otro_formato_se_convierten():
+    valores = pd.Series(["01/10/2025 08:00", "02/10/2025 17:30:15", "2025-10-03 08:00:00"])
+    fechas, descartadas = convertir_fechas(valores)
+    assert list(fechas) == [pd.Timestamp("2025-10-01 08:00"), pd.Timestamp("2025-10-02 17:30:15"),
+                            pd.Timestamp("2025-10-03 08:00")]
+    assert descartadas == 0
+
+
+def test_horas_sueltas_y_basura_se_descartan():
+    # "08.34:2" es una hora sin fecha: dateutil la completaría con el año 1
+    valores = pd.Series(["01/10/2025 08:00", "08.34:2", "no es fecha", None])
+    fechas, descartadas = convertir_fechas(valores)
+    assert fechas[0] == pd.Timestamp("2025-10-01 08:00")
+    assert fechas[1:].isna().all()
+    assert descartadas == 3
+    assert (fechas.dropna() >= FECHA_MINIMA).all()
+
+
+def test_fechas_de_excel_pasan_tal_cual():
+    valores = pd.Series(pd.to_datetime(["2025-10-01 08:00", None]))
+    fechas, descartadas = convertir_fechas(valores)
+    assert fechas is valores
+    assert descartadas == 1
@@ -0,0 +1,55 @@
+# test_horarios_bd.py
+import pytest
+
+from utils import horarios_bd
+from utils.horarios import HORARIOS_SEDES, horario_compilado
+from utils.horarios_bd import crear_tablas, guardar_sede, leer_version, sincronizar
+
+# -------------------------
+# SINCRONIZACIÓN DE HORARIOS CON LA BD
+# -------------------------
+
+
+@pytest.fixture
+def tablas(bd, horarios):
+    with bd.conexion() as conexion:
+        crear_tablas(conexion)
+    horarios_bd._version_cargada = None
+    return bd
+
+
+def test_recarga_solo_si_cambia_la_version(tablas):
+    assert sincronizar(tablas.conexion, forzar=True)
+    assert not sincronizar(tablas.conexion, forzar=True)
+
+    nuevo = {"Lunes": {"entrada": "09:00", "salida": "18:00"}}
+    with tablas.conexion() as conexion:
+        guardar_sede(conexion, "medellin", nuevo)
+        assert leer_version(conexion) == 2
+
+    # Otro worker no lo ve hasta que toca revisar
+    assert not sincronizar(tablas.conexion, cada=3600)
+    assert sincronizar(tablas.conexion, forzar=True)
+    assert HORARIOS_SEDES["medellin"]["Lunes"]["entrada"] == "09:00"
+    assert horario_compilado("medellin").entrada[0] == 9 * 60
+
+
+def test_sede_nueva_aparece_al_sincronizar(tablas):
+    with tablas.conexion() as conexion:
+        guardar_sede(conexion, "santa marta", {"Lunes": {"entrada": "07:00", "salida": "16:00"}})
+    sincronizar(tablas.conexion, forzar=True)
+    assert "santa marta" in HORARIOS_SEDES
+
+
+def test_sin_tablas_no_las_crea_y_quedan_los_de_fabrica(bd, horarios):
+    antes = dict(HORARIOS_SEDES)
+    horarios_bd._version_cargada = None
+    with pytest.raises(Exception):
+        sincronizar(bd.conexion, forzar=True)
+    assert HORARIOS_SEDES == antes
+
+    with bd.conexion() as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        assert cursor.fetchall() == []
+        cursor.close()
@@ -0,0 +1,65 @@
+# test_lectura.py
+import io
+
+import pandas as pd
+import pytest
+
+from utils import lectura
+from utils.lectura import TAM_MUESTRA, detectar_dialecto, leer_csv, leer_csv_por_bloques
+
+# -------------------------
+# LECTURA DE CSV DEL HUELLERO
+# -------------------------
+ENCABEZADO = "Departamento;Nombre;No.;Fecha/Hora;Estado\r\n"
+
+
+def csv_huellero(filas, encabezado=ENCABEZADO, encoding="utf-8"):
+    lineas = [f"Adm;{nombre};1;{fecha};C/In\r\n" for nombre, fecha in filas]
+    return (encabezado + "".join(lineas)).encode(encoding)
+
+
+@pytest.fixture(autouse=True)
+def sin_dialectos_guardados():
+    lectura._DIALECTOS.clear()
+    yield
+    lectura._DIALECTOS.clear()
+
+
+def test_dialecto_se_reutiliza_por_encabezado(monkeypatch):
+    datos = csv_huellero([("Ana", "01/10/2025 08:00")])
+    assert detectar_dialecto(datos) == ("utf-8", ";", '"')
+
+    # Mismo encabezado: no se vuelve a olfatear
+    def no_llamar(*args, **kwargs):
+        raise AssertionError("se volvió a usar el sniffer")
+    monkeypatch.setattr(lectura.csv, "Sniffer", no_llamar)
+    assert detectar_dialecto(datos).separador == ";"
+
+
+def test_dialecto_guardado_revisa_la_codificacion():
+    detectar_dialecto(csv_huellero([("Ana", "01/10/2025 08:00")]))
+    # Mismo encabezado, otra exportación en Latin-1
+    dialecto = detectar_dialecto(csv_huellero([("Peña", "01/10/2025 08:00")], encoding="latin-1"))
+    assert dialecto.encoding == "latin-1"
+    assert dialecto.separador == ";"
+
+
+def test_latin1_despues_de_la_muestra():
+    # La muestra es ASCII (parece UTF-8); la "ñ" en Latin-1 aparece más adelante
+    relleno = [("Ana", "01/10/2025 08:00")] * (TAM_MUESTRA // 30 + 100)
+    datos = csv_huellero(relleno + [("Peña", "02/10/2025 08:00")], encoding="latin-1")
+    assert b"\xf1" not in datos[:TAM_MUESTRA]
+
+    df = leer_csv(io.BytesIO(datos))
+    assert df["nombre"].iloc[-1] == "Peña"
+    assert len(df) == len(relleno) + 1
+
+    bloques = list(leer_csv_por_bloques(io.BytesIO(datos), tam_bloque=500))
+    assert len(bloques) > 1
+    pd.testing.assert_frame_equal(pd.concat(bloques, ignore_index=True), df)
+
+
+def test_solo_columnas_b_y_d():
+    df = leer_csv(io.BytesIO(csv_huellero([("Ana", "01/10/2025 08:00")])))
+    assert list(df.columns) == ["nombre", "fecha_hora"]
+    assert df.iloc[0].tolist() == ["Ana", "01/10/2025 08:00"]
@@ -0,0 +1,64 @@
+# test_procesar.py
+import os
+import shutil
+
+import pytest
+
+from procesar import main, nombres_salida, procesar_archivo
+from utils.cache import CacheReportes, clave_reporte, hash_archivo
+from utils.horarios import horario_compilado
+
+# -------------------------
+# CONSOLA (procesar.py)
+# -------------------------
+CARPETA = os.path.join(os.path.dirname(__file__), "..", "data", "uploads")
+
+
+def test_cache_compartida_con_la_web(tmp_path):
+    # La consola procesa con el horario compilado; la web busca con el nombre de la sede
+    ruta = os.path.join(CARPETA, "medellin.csv")
+    cache_dir = str(tmp_path / "reportes")
+    info = procesar_archivo(ruta, "medellin", "csv", ["extras"], str(tmp_path), cache_dir=cache_dir,
+                            horario=horario_compilado("medellin"))
+
+    assert not info["cache"]
+    assert clave_reporte(hash_archivo(ruta), horario_compilado("medellin"), "medellin") == \
+        clave_reporte(hash_archivo(ruta), "medellin")
+    assert CacheReportes(cache_dir).obtener(clave_reporte(hash_archivo(ruta), "medellin")) is not None
+
+    otra = procesar_archivo(ruta, "medellin", "csv", ["extras"], str(tmp_path), cache_dir=cache_dir)
+    assert otra["cache"]
+
+
+def test_nombres_salida_sin_choques():
+    pares = [("a/medellin.csv", "medellin"), ("a/Medellin.xlsx", "medellin"),
+             ("a/cartagena.csv", "cartagena"), ("b/cartagena.csv", "barranquilla"),
+             ("c/prueba.csv", "medellin"), ("d/prueba.csv", "medellin")]
+    nombres = nombres_salida(pares)
+    assert nombres[:4] == ["medellin_csv", "Medellin_xlsx", "cartagena_csv_cartagena", "cartagena_csv_barranquilla"]
+    assert nombres[4].endswith("c_prueba_csv_medellin") and nombres[5].endswith("d_prueba_csv_medellin")
+    assert nombres_salida([("x/uno.csv", "medellin")]) == ["uno"]
+
+
+def test_nombres_salida_mismo_archivo_dos_veces():
+    with pytest.raises(ValueError):
+        nombres_salida([("a/uno.csv", "medellin"), ("a/uno.csv", "medellin")])
+
+
+def test_un_archivo_con_error_no_detiene_los_demas(tmp_path, capsys):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    shutil.copy(os.path.join(CARPETA, "medellin.csv"), entrada / "medellin.csv")
+    shutil.copy(os.path.join(CARPETA, "Medellin.xlsx"), entrada / "Medellin.xlsx")
+    (entrada / "malo.csv").write_bytes(b"a,b\n1,2\n")
+    salida = tmp_path / "salida"
+
+    codigo = main([str(entrada), "--sede", "medellin", "--formato", "csv", "--workers", "1",
+                   "--salida", str(salida)])
+
+    assert codigo == 1
+    assert "1 de 3 archivos con error" in capsys.readouterr().err
+    # Dos archivos con el mismo nombre (sin distinguir mayúsculas): cada uno con su descarga
+    assert sorted(os.listdir(salida)) == sorted(
+        f"{tipo}_{nombre}.csv" for tipo in ("horas_extras", "llegadas")
+        for nombre in ("medellin_csv", "Medellin_xlsx"))
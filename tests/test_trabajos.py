@@ -0,0 +1,74 @@
+# test_trabajos.py
+import threading
+import time
+
+import pytest
+
+from utils.almacen import AlmacenMemoria
+from utils.trabajos import ERROR, FASES, LISTO, ColaTrabajos
+
+# -------------------------
+# COLA DE TRABAJOS
+# -------------------------
+
+
+@pytest.fixture
+def cola():
+    return ColaTrabajos(AlmacenMemoria(), workers=1)
+
+
+def esperar(cola, trabajo_id, limite=10):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        estado = cola.estado(trabajo_id)
+        if estado["estado"] in (LISTO, ERROR):
+            return estado
+        time.sleep(0.01)
+    raise AssertionError("el trabajo no terminó")
+
+
+def test_trabajo_que_falla_queda_con_su_error(cola):
+    def falla(avance):
+        avance("leer")
+        raise ValueError("El archivo no tiene suficientes columnas")
+
+    estado = esperar(cola, cola.enviar(falla))
+    assert estado["estado"] == ERROR
+    assert estado["error"] == "El archivo no tiene suficientes columnas"
+    assert estado["resultado"] is None
+    assert estado["fase"] == "leer"
+
+
+def test_un_error_no_detiene_los_siguientes(cola):
+    def falla(avance):
+        raise RuntimeError("x")
+
+    primero = cola.enviar(falla)
+    segundo = cola.enviar(lambda n, avance: n * 2, 21)
+    assert esperar(cola, primero)["estado"] == ERROR
+    estado = esperar(cola, segundo)
+    assert estado["estado"] == LISTO
+    assert estado["resultado"] == 42
+    assert estado["progreso"] == 1
+    assert estado["completadas"] == list(FASES)
+
+
+def test_avance_marca_las_fases_anteriores(cola):
+    en_agrupar, seguir = threading.Event(), threading.Event()
+
+    def trabajo(avance):
+        avance("agrupar")
+        en_agrupar.set()
+        seguir.wait(10)
+
+    trabajo_id = cola.enviar(trabajo)
+    assert en_agrupar.wait(10)
+    estado = cola.estado(trabajo_id)
+    seguir.set()
+    assert estado["fase"] == "agrupar"
+    assert estado["completadas"] == ["leer", "fechas"]
+    assert esperar(cola, trabajo_id)["estado"] == LISTO
+
+
+def test_trabajo_desconocido(cola):
+    assert cola.estado("no-existe") is None
@@ -0,0 +1,60 @@
+# test_usuarios.py
+import pytest
+
+from utils.usuarios import preparar_usuarios, verificar_usuario
+
+# -------------------------
+# LOGIN Y REHASH DE CONTRASEÑAS
+# -------------------------
+METODO = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def conexion(bd):
+    with bd.conexion() as conexion:
+        preparar_usuarios(conexion, "sqlite")
+        yield conexion
+
+
+def agregar(conexion, email, password):
+    cursor = conexion.cursor()
+    cursor.execute("INSERT INTO usuarios (name, email, password) VALUES (%s, %s, %s)", ("Ana", email, password))
+    conexion.commit()
+    cursor.close()
+
+
+def password_guardada(conexion, email):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT password FROM usuarios WHERE email = %s", (email,))
+    password = cursor.fetchone()["password"]
+    cursor.close()
+    return password
+
+
+def test_texto_plano_se_rehace_al_entrar(conexion):
+    agregar(conexion, "ana@x.co", "secreta")
+
+    usuario = verificar_usuario(conexion, "ana@x.co", "secreta", METODO)
+    assert usuario["name"] == "Ana"
+    guardada = password_guardada(conexion, "ana@x.co")
+    assert guardada.startswith(METODO + "$")
+
+    # Con el hash nuevo sigue entrando y ya no se vuelve a escribir
+    assert verificar_usuario(conexion, "ana@x.co", "secreta", METODO) is not None
+    assert password_guardada(conexion, "ana@x.co") == guardada
+
+
+def test_otro_metodo_se_rehace_con_el_configurado(conexion):
+    agregar(conexion, "ana@x.co", "secreta")
+    verificar_usuario(conexion, "ana@x.co", "secreta", "pbkdf2:sha256:500")
+    assert password_guardada(conexion, "ana@x.co").startswith("pbkdf2:sha256:500$")
+
+    assert verificar_usuario(conexion, "ana@x.co", "secreta", METODO) is not None
+    assert password_guardada(conexion, "ana@x.co").startswith(METODO + "$")
+
+
+def test_contrasena_incorrecta_no_entra_ni_rehace(conexion):
+    agregar(conexion, "ana@x.co", "secreta")
+    assert verificar_usuario(conexion, "ana@x.co", "otra", METODO) is None
+    assert password_guardada(conexion, "ana@x.co") == "secreta"
+    assert verificar_usuario(conexion, "nadie@x.co", "secreta", METODO) is None
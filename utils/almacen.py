@@ -0,0 +1,212 @@
+# almacen.py
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+# -------------------------
+# ALMACÉN DE RESULTADOS
+# Guarda el reporte procesado de cada carga bajo un id propio (el de la
+# sesión del usuario), con tope de bytes y expiración por tiempo sin uso.
+# Dos backends con la misma interfaz (guardar / obtener / borrar):
+#   - AlmacenMemoria: dentro del proceso (un solo worker).
+#   - AlmacenDisco: archivos en una carpeta local compartida por los workers.
+# -------------------------
+_CLAVE_VALIDA = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def nuevo_id() -> str:
+    return uuid.uuid4().hex
+
+
+def tamano_en_bytes(valor) -> int:
+    """Tamaño aproximado de lo que se guarda (DataFrame, bytes, algo con nbytes u otro objeto)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if hasattr(valor, "nbytes"):
+        return int(valor.nbytes)
+    return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class AlmacenMemoria:
+    """
+    Resultados en memoria del proceso. LRU con tope de bytes y TTL (tiempo sin uso).
+    El último guardado siempre se conserva aunque pase el tope por sí solo.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, ttl_segundos=12 * 3600):
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self.bytes_usados = 0
+        self._datos = OrderedDict()  # clave -> (valor, tamaño, último uso)
+        self._lock = threading.Lock()
+
+    def guardar(self, clave, valor):
+        tam = tamano_en_bytes(valor)
+        with self._lock:
+            self._quitar(clave)
+            self._datos[clave] = (valor, tam, time.time())
+            self.bytes_usados += tam
+            self._expulsar()
+
+    def obtener(self, clave):
+        if clave is None:
+            return None
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                return None
+            valor, tam, ultimo_uso = item
+            if time.time() - ultimo_uso > self.ttl_segundos:
+                self._quitar(clave)
+                return None
+            self._datos[clave] = (valor, tam, time.time())
+            self._datos.move_to_end(clave)
+            return valor
+
+    def borrar(self, clave):
+        with self._lock:
+            self._quitar(clave)
+
+    def borrar_si(self, condicion):
+        """Borra todas las claves para las que condicion(clave) es verdadero."""
+        with self._lock:
+            for clave in [c for c in self._datos if condicion(c)]:
+                self._quitar(clave)
+
+    def _quitar(self, clave):
+        item = self._datos.pop(clave, None)
+        if item is not None:
+            self.bytes_usados -= item[1]
+
+    def _expulsar(self):
+        ahora = time.time()
+        for clave in [c for c, (_, _, uso) in self._datos.items() if ahora - uso > self.ttl_segundos]:
+            self._quitar(clave)
+        while self.bytes_usados > self.max_bytes and len(self._datos) > 1:
+            clave, (_, tam, _) = self._datos.popitem(last=False)
+            self.bytes_usados -= tam
+
+
+class AlmacenDisco:
+    """
+    Resultados como archivos pickle en una carpeta local. Sirve para varios
+    workers de gunicorn en la misma máquina: la fecha de modificación del
+    archivo hace de "último uso" para el LRU y el TTL.
+    """
+
+    EXTENSION = ".pkl"
+
+    def __init__(self, carpeta, max_bytes=2 * 1024 * 1024 * 1024, ttl_segundos=12 * 3600):
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        os.makedirs(carpeta, exist_ok=True)
+
+    def _ruta(self, clave):
+        if not _CLAVE_VALIDA.match(clave):
+            raise ValueError(f"Clave inválida para el almacén: {clave!r}")
+        return os.path.join(self.carpeta, clave + self.EXTENSION)
+
+    def guardar(self, clave, valor):
+        ruta = self._ruta(clave)
+        # Escribir a un temporal y renombrar: otro worker nunca lee un archivo a medias
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self._escribir(valor, tmp)
+            os.replace(tmp, ruta)
+        finally:
+            self._borrar_archivo(tmp)
+        self._expulsar(conservar=ruta)
+
+    def obtener(self, clave):
+        if clave is None:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            if time.time() - os.stat(ruta).st_mtime > self.ttl_segundos:
+                self._borrar_archivo(ruta)
+                return None
+            valor = self._leer(ruta)
+            os.utime(ruta)
+        except FileNotFoundError:
+            # Otro worker lo expulsó entre medio
+            return None
+        return valor
+
+    def borrar(self, clave):
+        self._borrar_archivo(self._ruta(clave))
+
+    # Formato en disco (las subclases pueden cambiarlo)
+    def _escribir(self, valor, ruta):
+        with open(ruta, "wb") as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _leer(self, ruta):
+        with open(ruta, "rb") as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def _borrar_archivo(ruta):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+    def _archivos(self):
+        archivos = []
+        for entrada in os.scandir(self.carpeta):
+            if entrada.name.endswith(self.EXTENSION):
+                try:
+                    st = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                archivos.append((st.st_mtime, st.st_size, entrada.path))
+        return archivos
+
+    @property
+    def bytes_usados(self):
+        return sum(tam for _, tam, _ in self._archivos())
+
+    def _expulsar(self, conservar=None):
+        ahora = time.time()
+        vigentes = []
+        for mtime, tam, ruta in self._archivos():
+            if ahora - mtime > self.ttl_segundos and ruta != conservar:
+                self._borrar_archivo(ruta)
+            else:
+                vigentes.append((mtime, tam, ruta))
+
+        total = sum(tam for _, tam, _ in vigentes)
+        for mtime, tam, ruta in sorted(vigentes):
+            if total <= self.max_bytes:
+                break
+            if ruta == conservar:
+                continue
+            self._borrar_archivo(ruta)
+            total -= tam
+
+
+BACKENDS = ("memoria", "disco")
+
+
+def crear_almacen(tipo="memoria", max_mb=512, ttl_horas=12, carpeta=None):
+    """Crea el almacén configurado ("memoria" o "disco")."""
+    max_bytes = int(max_mb * 1024 * 1024)
+    ttl_segundos = ttl_horas * 3600
+    if tipo == "memoria":
+        return AlmacenMemoria(max_bytes, ttl_segundos)
+    if tipo == "disco":
+        if not carpeta:
+            raise ValueError("El almacén en disco necesita una carpeta")
+        return AlmacenDisco(carpeta, max_bytes, ttl_segundos)
+    raise ValueError(f"Almacén desconocido: {tipo}. Use uno de {BACKENDS}")
@@ -0,0 +1,180 @@
+# bd.py
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------
+# POOL DE CONEXIONES
+# Abrir una conexión a MySQL en cada request (como hacía flask_mysqldb) era
+# lo que más tardaba en el login de la mañana. El pool mantiene hasta
+# `maximo` conexiones abiertas y las presta por request; si todas están en
+# uso se espera hasta `espera` segundos. Una conexión que estuvo ociosa más
+# de `ping_seg` se revisa antes de prestarla y, si no responde, se reemplaza.
+#
+# Motor "sqlite": un archivo local en lugar de MySQL (pruebas y desarrollo).
+# Las consultas llevan los mismos %s y las filas salen como dicts, igual que
+# con DictCursor.
+# -------------------------
+MOTORES_BD = ("mysql", "sqlite")
+
+
+class PoolConexiones:
+    """Conexiones reutilizables, con tope y revisión de las que estuvieron ociosas."""
+
+    def __init__(self, crear, motor="mysql", maximo=8, espera=5, ping_seg=30):
+        self.motor = motor
+        self.espera = espera
+        self.ping_seg = ping_seg
+        self._crear = crear
+        self._libres = queue.LifoQueue()   # (conexión, último uso); la más reciente primero
+        self._cupos = threading.BoundedSemaphore(maximo)
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión; al salir se devuelve al pool (o se descarta si falló)."""
+        if not self._cupos.acquire(timeout=self.espera):
+            raise RuntimeError("Base de datos ocupada: no hay conexiones libres")
+        conexion = None
+        try:
+            conexion = self._tomar()
+            yield conexion
+            # Cierra la transacción de lectura: la próxima consulta ve datos frescos
+            conexion.rollback()
+        except Exception:
+            if conexion is not None and not self._deshacer(conexion):
+                conexion = None
+            raise
+        finally:
+            if conexion is not None:
+                self._libres.put((conexion, time.monotonic()))
+            self._cupos.release()
+
+    def cerrar(self):
+        """Cierra las conexiones ociosas (al apagar, o en pruebas)."""
+        while True:
+            try:
+                conexion, _ = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            _cerrar(conexion)
+
+    def _tomar(self):
+        while True:
+            try:
+                conexion, ultimo_uso = self._libres.get_nowait()
+            except queue.Empty:
+                return self._crear()
+            if time.monotonic() - ultimo_uso < self.ping_seg or _viva(conexion):
+                return conexion
+            _cerrar(conexion)
+
+    def _deshacer(self, conexion):
+        # Tras un error la conexión vuelve al pool solo si sigue sana
+        try:
+            conexion.rollback()
+            return True
+        except Exception:
+            _cerrar(conexion)
+            return False
+
+
+def _viva(conexion):
+    try:
+        if hasattr(conexion, "ping"):
+            conexion.ping()
+        else:
+            cursor = conexion.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def _cerrar(conexion):
+    try:
+        conexion.close()
+    except Exception:
+        pass
+
+
+# -------------------------
+# CONEXIONES
+# -------------------------
+def conectar_mysql(host, user, password, db):
+    """Conexión MySQL (mysqlclient, el mismo driver de flask_mysqldb) con filas como dicts."""
+    import MySQLdb
+    import MySQLdb.cursors
+
+    return MySQLdb.connect(host=host, user=user, passwd=password, db=db,
+                           cursorclass=MySQLdb.cursors.DictCursor, charset="utf8mb4")
+
+
+class _CursorSqlite:
+    """Cursor de sqlite3 que acepta los %s de MySQL y entrega dicts."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parametros=()):
+        self._cursor.execute(sql.replace("%s", "?"), tuple(parametros))
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        return dict(fila) if fila is not None else None
+
+    def fetchall(self):
+        return [dict(fila) for fila in self._cursor.fetchall()]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexionSqlite:
+    """Reemplazo local de la conexión MySQL (misma interfaz que usa la app)."""
+
+    def __init__(self, ruta):
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        self._conexion.execute("PRAGMA foreign_keys = ON")
+
+    def cursor(self):
+        return _CursorSqlite(self._conexion.cursor())
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def close(self):
+        self._conexion.close()
+
+
+def crear_pool(motor, maximo=8, espera=5, ping_seg=30, **datos):
+    """
+    motor="mysql": datos = host, user, password, db.
+    motor="sqlite": datos = ruta (archivo de la base local).
+    """
+    if motor == "mysql":
+        crear = lambda: conectar_mysql(**datos)
+    elif motor == "sqlite":
+        crear = lambda: ConexionSqlite(datos["ruta"])
+    else:
+        raise ValueError(f"Motor de BD desconocido: {motor}. Use uno de {MOTORES_BD}")
+    return PoolConexiones(crear, motor=motor, maximo=maximo, espera=espera, ping_seg=ping_seg)
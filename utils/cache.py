@@ -0,0 +1,67 @@
+# cache.py
+import hashlib
+
+import pandas as pd
+
+from utils.almacen import AlmacenDisco
+from utils.procesamiento import VERSION_REPORTE, version_horario
+
+# -------------------------
+# CACHÉ DE REPORTES POR CONTENIDO
+# Si se vuelve a subir el mismo archivo para la misma sede (y el horario no
+# cambió), se devuelve el reporte ya procesado en vez de recalcularlo.
+# La clave combina: hash de los bytes del archivo + sede + huella del horario
+# + VERSION_REPORTE. Editar un horario cambia la clave, así que los reportes
+# viejos simplemente dejan de encontrarse y el LRU los termina borrando.
+# -------------------------
+try:
+    import pyarrow  # noqa: F401
+    HAY_PARQUET = True
+except ImportError:
+    HAY_PARQUET = False
+
+
+def hash_archivo(origen, tam=1024 * 1024) -> str:
+    """SHA-256 de un archivo (ruta o binario abierto), leído en pedazos de 1 MB."""
+    h = hashlib.sha256()
+    f = origen if hasattr(origen, "read") else open(origen, "rb")
+    try:
+        f.seek(0)
+        for pedazo in iter(lambda: f.read(tam), b""):
+            h.update(pedazo)
+    finally:
+        if f is not origen:
+            f.close()
+        else:
+            f.seek(0)
+    return h.hexdigest()
+
+
+def clave_reporte(hash_contenido, sede_or_horario, nombre_sede=None) -> str:
+    """
+    Clave del reporte en la caché. Con un HorarioCompilado hay que pasar el
+    nombre de la sede: la clave debe ser la misma que arma la web con el nombre.
+    """
+    sede = nombre_sede or (sede_or_horario if isinstance(sede_or_horario, str) else "")
+    partes = [hash_contenido, sede, version_horario(sede_or_horario), str(VERSION_REPORTE)]
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()
+
+
+class CacheReportes(AlmacenDisco):
+    """Reportes procesados en disco: Parquet (columnar, comprimido) si hay pyarrow; si no, pickle."""
+
+    EXTENSION = ".parquet" if HAY_PARQUET else ".pkl"
+
+    def __init__(self, carpeta, max_mb=1024, ttl_dias=30):
+        super().__init__(carpeta, int(max_mb * 1024 * 1024), ttl_dias * 24 * 3600)
+
+    def _escribir(self, valor, ruta):
+        if HAY_PARQUET:
+            valor.to_parquet(ruta, index=False)
+        else:
+            super()._escribir(valor, ruta)
+
+    def _leer(self, ruta):
+        if HAY_PARQUET:
+            return pd.read_parquet(ruta)
+        return super()._leer(ruta)
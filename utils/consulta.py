@@ -0,0 +1,126 @@
+# consulta.py
+import numpy as np
+import pandas as pd
+
+from utils.formato import formatear_reporte
+
+# -------------------------
+# CONSULTA PAGINADA DEL REPORTE (vista previa)
+# Se arma una vez por resultado: códigos enteros para nombre / día / estado,
+# fechas ya convertidas y el orden de cada columna. Cada página después es
+# solo combinar máscaras de numpy y cortar, sin recorrer el DataFrame.
+# -------------------------
+COLUMNAS_ORDEN = (
+    "Nombre", "Fecha", "Día", "Entrada", "Salida",
+    "Horas trabajadas", "Tardanza", "Horas extras",
+)
+POR_PAGINA = 50
+MAX_POR_PAGINA = 500
+
+
+class IndiceReporte:
+    """Índices precalculados sobre el detalle de un Resultado."""
+
+    def __init__(self, resultado):
+        detalle = resultado.detalle
+        self.detalle = detalle
+
+        self.nombre_cod, self.nombres = pd.factorize(detalle["Nombre"])
+        self.dia_cod, self.dias = pd.factorize(detalle["Día"])
+        self.estado_cod, self.estados = pd.factorize(detalle["Estado"])
+        self.fecha = pd.to_datetime(detalle["Fecha"], format="%d/%m/%Y", errors="coerce").to_numpy()
+        self.extras = detalle["Horas extras"].to_numpy(dtype=np.int64)
+
+        # Orden de cada columna ordenable (permutaciones estables)
+        self._ordenes = {col: self._argsort(col) for col in COLUMNAS_ORDEN}
+
+    @property
+    def nbytes(self):
+        """Tamaño aproximado (para el tope de bytes del almacén)."""
+        arrays = (self.nombre_cod, self.dia_cod, self.estado_cod, self.fecha, self.extras)
+        return (int(self.detalle.memory_usage(deep=True).sum())
+                + sum(a.nbytes for a in arrays)
+                + sum(o.nbytes for o in self._ordenes.values()))
+
+    def _argsort(self, columna):
+        if columna == "Fecha":
+            clave = self.fecha
+        elif columna == "Día":
+            # Lunes..Sábado, no alfabético
+            clave = pd.DatetimeIndex(self.fecha).dayofweek.to_numpy()
+        else:
+            clave = self.detalle[columna].to_numpy()
+        return np.argsort(clave, kind="stable")
+
+    @staticmethod
+    def _codigo(categorias, valor):
+        # -1 si el valor no existe: la máscara queda vacía
+        return categorias.get_indexer([valor])[0]
+
+    def mascara(self, nombre=None, desde=None, hasta=None, dia=None, estado=None):
+        """Filas que cumplen todos los filtros dados (los vacíos no filtran)."""
+        mascara = np.ones(len(self.detalle), dtype=bool)
+        if nombre:
+            mascara &= self.nombre_cod == self._codigo(self.nombres, nombre)
+        if dia:
+            mascara &= self.dia_cod == self._codigo(self.dias, dia)
+        if estado:
+            mascara &= self.estado_cod == self._codigo(self.estados, estado)
+        if desde is not None:
+            mascara &= self.fecha >= np.datetime64(desde)
+        if hasta is not None:
+            mascara &= self.fecha <= np.datetime64(hasta)
+        return mascara
+
+    def totales_en_pagina(self, filas, mascara, inicio, fin):
+        """
+        Fila TOTAL de cada empleado que termina en esta página (filas agrupadas
+        por nombre): [{"despues": posición en la página, "nombre", "extras"}].
+        Las horas extras son las del empleado dentro del filtro.
+        """
+        extras = np.bincount(self.nombre_cod[mascara], weights=self.extras[mascara],
+                             minlength=len(self.nombres))
+        codigos = self.nombre_cod[filas[inicio:min(fin + 1, len(filas))]]
+        totales = []
+        for i in range(min(fin, len(filas)) - inicio):
+            if i + 1 == len(codigos) or codigos[i + 1] != codigos[i]:
+                totales.append({"despues": i, "nombre": self.nombres[codigos[i]],
+                                "extras": int(extras[codigos[i]])})
+        return totales
+
+    def consultar(self, orden=None, descendente=False, pagina=1, por_pagina=POR_PAGINA, **filtros):
+        """
+        Una página del reporte filtrado y ordenado, ya con las duraciones en texto.
+        Devuelve también el total de filas y de horas extras del filtro completo
+        y, viendo a todos en el orden por nombre, el TOTAL de cada empleado.
+        """
+        mascara = self.mascara(**filtros)
+
+        if orden in COLUMNAS_ORDEN:
+            filas = self._ordenes[orden]
+            if descendente:
+                filas = filas[::-1]
+            filas = filas[mascara[filas]]
+        else:
+            filas = np.flatnonzero(mascara)
+
+        por_pagina = max(1, min(int(por_pagina), MAX_POR_PAGINA))
+        total = len(filas)
+        paginas = max(1, -(-total // por_pagina))
+        pagina = max(1, min(int(pagina), paginas))
+        inicio = (pagina - 1) * por_pagina
+
+        pedazo = self.detalle.iloc[filas[inicio:inicio + por_pagina]]
+        totales = []
+        if not filtros.get("nombre") and orden in (None, "", "Nombre"):
+            totales = self.totales_en_pagina(filas, mascara, inicio, inicio + por_pagina)
+        return {
+            "filas": formatear_reporte(pedazo).to_dict(orient="records"),
+            "estados": pedazo["Estado"].tolist(),
+            "pagina": pagina,
+            "paginas": paginas,
+            "por_pagina": por_pagina,
+            "total_filas": total,
+            "total_extras": int(self.extras[mascara].sum()),
+            "totales_persona": totales,
+        }
@@ -0,0 +1,236 @@
+# exportar.py
+import io
+import warnings
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Alignment, Font
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+from utils.formato import formatear_reporte, formato_minutos
+
+# -------------------------
+# EXCEL CON ESTILO, EN MODO write-only
+# Las filas se escriben en streaming (openpyxl no arma el libro en memoria) y
+# todo lo que antes se hacía recorriendo celdas se decide antes de escribir:
+# anchos de columna por largo del texto, alto de fila por defecto de la hoja
+# y estilo de la fila TOTAL en las celdas de esa última fila.
+# -------------------------
+ALTO_FILA = 22
+ESTILO_TABLA = "TableStyleMedium9"
+
+
+def anchos_columnas(df):
+    """Ancho de cada columna: el texto más largo (encabezado incluido) + 3."""
+    anchos = []
+    for col in df.columns:
+        largo = df[col].astype(str).str.len().max() if len(df) else 0
+        anchos.append(max(len(str(col)), int(largo)) + 3)
+    return anchos
+
+
+def _celdas_total(hoja, valores):
+    fill_total = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+    bold_font = Font(bold=True)
+    centrado = Alignment(horizontal="center")
+
+    celdas = []
+    for valor in valores:
+        celda = WriteOnlyCell(hoja, value=valor)
+        celda.fill = fill_total
+        celda.font = bold_font
+        celda.alignment = centrado
+        celdas.append(celda)
+    return celdas
+
+
+def escribir_excel(df, nombre_hoja, nombre_tabla, resaltar_ultima=False):
+    """
+    DataFrame -> .xlsx en un BytesIO, como tabla de Excel con estilo.
+    resaltar_ultima=True pinta la última fila como fila TOTAL (gris y negrita).
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(nombre_hoja)
+
+    # Anchos y alto de fila van antes de la primera fila (write-only no vuelve atrás)
+    for i, ancho in enumerate(anchos_columnas(df), start=1):
+        hoja.column_dimensions[get_column_letter(i)].width = ancho
+    hoja.sheet_format.defaultRowHeight = ALTO_FILA
+    hoja.sheet_format.customHeight = True
+
+    encabezado = [str(col) for col in df.columns]
+    hoja.append(encabezado)
+
+    # Vacíos (NaN) como celdas vacías, igual que to_excel
+    filas = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    ultima = len(df) - 1 if resaltar_ultima else -1
+    for i, fila in enumerate(filas):
+        hoja.append(_celdas_total(hoja, fila) if i == ultima else list(fila))
+
+    # Tabla con estilo sobre encabezado + datos
+    ref = f"A1:{get_column_letter(len(encabezado))}{len(df) + 1}"
+    tabla = Table(displayName=nombre_tabla, ref=ref, autoFilter=AutoFilter(ref=ref))
+    tabla.tableStyleInfo = TableStyleInfo(
+        name=ESTILO_TABLA,
+        showFirstColumn=False,
+        showLastColumn=False,
+        showRowStripes=True,
+        showColumnStripes=False
+    )
+    # En write-only openpyxl no puede leer el encabezado de la hoja: las
+    # columnas de la tabla se dan a mano (add_table lo recuerda siempre, aun así)
+    tabla.tableColumns = [TableColumn(id=i, name=nombre) for i, nombre in enumerate(encabezado, start=1)]
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", "In write-only mode you must add table columns manually")
+        hoja.add_table(tabla)
+
+    output = io.BytesIO()
+    libro.save(output)
+    output.seek(0)
+    return output
+
+
+# -------------------------
+# EXPORTACIÓN EN STREAMING (CSV / Parquet / Arrow IPC)
+# Para sistemas que leen los datos, no personas: sin estilos. Se recibe un
+# iterable de bloques (DataFrames con las mismas columnas, todo texto) y se
+# van entregando bytes a medida que se escribe cada bloque, así la descarga
+# empieza enseguida y el servidor no arma el archivo entero en memoria.
+# -------------------------
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+    HAY_ARROW = True
+except ImportError:
+    HAY_ARROW = False
+
+FORMATOS_EXPORTAR = ("xlsx", "csv", "parquet", "arrow")
+TIPOS_MIME = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+TAM_BLOQUE_EXPORTAR = 10_000
+
+
+def csv_en_bloques(bloques, columnas):
+    """Encabezado y luego cada bloque como texto CSV (UTF-8)."""
+    yield (",".join(columnas) + "\n").encode("utf-8")
+    for bloque in bloques:
+        yield bloque[columnas].to_csv(index=False, header=False).encode("utf-8")
+
+
+class _Salida(io.RawIOBase):
+    """Archivo de solo escritura que junta lo escrito hasta que se lo vacía."""
+
+    def __init__(self):
+        self._pedazos = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._pedazos.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b"".join(self._pedazos)
+        self._pedazos = []
+        return datos
+
+
+def arrow_en_bloques(bloques, columnas, formato="parquet"):
+    """
+    Cada bloque como un row group de Parquet o un record batch de Arrow IPC
+    (formato stream). Todas las columnas van como texto.
+    """
+    if not HAY_ARROW:
+        raise RuntimeError("Exportar a Parquet / Arrow requiere pyarrow")
+
+    esquema = pa.schema([(col, pa.string()) for col in columnas])
+    salida = _Salida()
+    if formato == "parquet":
+        escritor = pa.parquet.ParquetWriter(salida, esquema)
+    else:
+        escritor = pa.ipc.new_stream(salida, esquema)
+
+    with escritor:
+        for bloque in bloques:
+            escritor.write_table(pa.Table.from_pandas(bloque[columnas], schema=esquema, preserve_index=False))
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+# -------------------------
+# DATOS DE CADA DESCARGA (mismos en todos los formatos)
+# Se entregan por bloques para que CSV / Parquet / Arrow no armen todo junto.
+# -------------------------
+COLUMNAS_EXTRAS = [
+    "Nombre", "Fecha", "Día", "Entrada", "Salida",
+    "Horas trabajadas", "Tardanza", "Horas extras"
+]
+COLUMNAS_LLEGADAS = ["Nombre", "Fecha", "Día", "Entrada"]
+
+
+def bloques_extras(resultado, persona, tam=TAM_BLOQUE_EXPORTAR):
+    """Filas de horas extras con texto "01h 32m", de a tam filas, y al final la fila TOTAL."""
+    # Filas de la persona (rango ya indexado) o todo, con la fila TOTAL de cada persona
+    df = resultado.con_totales() if persona is None else resultado.filas(persona)
+    df = df[COLUMNAS_EXTRAS + ["Estado"]]
+
+    for inicio in range(0, len(df), tam):
+        yield formatear_reporte(df.iloc[inicio:inicio + tam])
+
+    # Total en minutos, ya calculado por persona al guardar el resultado
+    total_min = resultado.total_extras(persona)
+
+    # Fila total
+    fila_total = {
+        "Nombre": "",
+        "Fecha": "",
+        "Día": "",
+        "Entrada": "",
+        "Salida": "",
+        "Horas trabajadas": "",
+        "Tardanza": "TOTAL",
+        "Horas extras": formato_minutos(total_min)
+    }
+    yield pd.DataFrame([fila_total])
+
+
+def bloques_llegadas(resultado, persona, tam=TAM_BLOQUE_EXPORTAR):
+    # Filas de la persona (rango ya indexado) o todo el detalle, solo estas columnas
+    df = resultado.filas(persona)[COLUMNAS_LLEGADAS]
+    for inicio in range(0, len(df), tam):
+        yield df.iloc[inicio:inicio + tam]
+
+
+# tipo -> (bloques, columnas, hoja, tabla, resaltar última fila, prefijo del archivo)
+EXPORTACIONES = {
+    "extras": (bloques_extras, COLUMNAS_EXTRAS, "Horas Extras", "TablaExtras", True, "horas_extras"),
+    "llegadas": (bloques_llegadas, COLUMNAS_LLEGADAS, "Llegadas", "TablaLlegadas", False, "llegadas"),
+}
+
+
+def guardar_exportacion(resultado, tipo, formato, ruta, persona=None):
+    """Escribe una descarga ("extras" o "llegadas") a un archivo, sin pasar por Flask."""
+    generar, columnas, hoja, tabla, resaltar, _ = EXPORTACIONES[tipo]
+    bloques = generar(resultado, persona)
+
+    if formato == "xlsx":
+        partes = list(bloques)
+        df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=columnas)
+        contenido = [escribir_excel(df, hoja, tabla, resaltar_ultima=resaltar).getvalue()]
+    elif formato == "csv":
+        contenido = csv_en_bloques(bloques, columnas)
+    else:
+        contenido = arrow_en_bloques(bloques, columnas, formato)
+
+    with open(ruta, "wb") as f:
+        for pedazo in contenido:
+            f.write(pedazo)
@@ -0,0 +1,106 @@
+# fechas.py
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# CONVERSIÓN DE FECHAS DEL HUELLERO
+# Sin formato, pandas deduce uno con el primer valor y, si no le sirve para el
+# resto, cae a dateutil valor por valor: lento, y según cuál sea el primer
+# valor lee "01/10/2025" como 1 de octubre o como 10 de enero. Aquí el formato
+# se elige con una muestra, toda la columna se convierte de una vez con ese
+# formato y solo los valores que no calzan (rezagados) se intentan uno por uno.
+# Lo que tampoco se entiende se descarta y se cuenta.
+# -------------------------
+TAM_MUESTRA_FECHAS = 1000
+
+# En orden de preferencia: ante un empate (días <= 12) gana día/mes, que es
+# como exportan los huelleros de las sedes.
+FORMATOS_FECHA = (
+    "ISO8601",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d/%m/%Y %I:%M:%S %p",
+    "%d/%m/%Y %I:%M %p",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %I:%M %p",
+)
+
+# Horas sueltas sin fecha ("08.34:2") que dateutil completa con el año 1
+FECHA_MINIMA = pd.Timestamp("2000-01-01")
+
+
+def _muestra(valores, n=TAM_MUESTRA_FECHAS):
+    """Hasta n textos no vacíos repartidos por toda la columna (no solo el principio)."""
+    if len(valores) > n:
+        valores = valores.iloc[np.unique(np.linspace(0, len(valores) - 1, n).astype(np.int64))]
+    return [v for v in valores if isinstance(v, str) and v.strip()]
+
+
+def detectar_formato(valores):
+    """Formato de FORMATOS_FECHA que más valores de la muestra entiende; None si ninguno."""
+    muestra = pd.Series(_muestra(valores), dtype=object)
+    if muestra.empty:
+        return None
+
+    mejor, aciertos = None, 0
+    for formato in FORMATOS_FECHA:
+        n = int(pd.to_datetime(muestra, format=formato, errors="coerce").notna().sum())
+        if n > aciertos:
+            mejor, aciertos = formato, n
+            if n == len(muestra):
+                break
+    return mejor
+
+
+def _rezagados(valores, formato):
+    """
+    Valores que no calzaron con el formato principal: primero los otros
+    formatos conocidos (sin invertir día/mes), y lo que quede, uno por uno.
+    """
+    dia_primero = formato is None or not formato.startswith("%m")
+    opuesto = "%m" if dia_primero else "%d"
+    fechas = pd.Series(pd.NaT, index=valores.index, dtype="datetime64[us]")
+    for otro in FORMATOS_FECHA:
+        if otro == formato or otro.startswith(opuesto):
+            continue
+        faltan = fechas.isna()
+        if not faltan.any():
+            return fechas
+        fechas[faltan] = pd.to_datetime(valores[faltan], format=otro, errors="coerce")
+
+    faltan = fechas.isna()
+    if faltan.any():
+        sueltas = pd.to_datetime(valores[faltan], format="mixed", dayfirst=dia_primero, errors="coerce")
+        fechas[faltan] = sueltas.where(sueltas >= FECHA_MINIMA)
+    return fechas
+
+
+def convertir_fechas(valores, formato=None):
+    """
+    Columna de fecha/hora -> (Series datetime64, filas descartadas).
+    formato=None lo detecta con una muestra (ver detectar_formato); en archivos
+    por bloques conviene detectarlo una vez y pasarlo a cada bloque.
+    """
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        # Excel ya trae fechas: no hay nada que adivinar
+        return valores, int(valores.isna().sum())
+
+    if formato is None:
+        formato = detectar_formato(valores)
+
+    if formato is None:
+        fechas = _rezagados(valores, formato)
+    else:
+        fechas = pd.to_datetime(valores, format=formato, errors="coerce")
+        rezagados = fechas.isna() & valores.notna()
+        if rezagados.any():
+            fechas = fechas.copy()
+            fechas[rezagados] = _rezagados(valores[rezagados], formato)
+
+    return fechas, int(fechas.isna().sum())
@@ -0,0 +1,49 @@
+# formato.py
+import numpy as np
+
+from utils.procesamiento import ESTADO_OK, ESTADO_SIN_MARCAS, ESTADO_TOTAL
+
+# -------------------------
+# Texto para mostrar / exportar
+# El reporte guarda las duraciones en minutos enteros más una columna Estado;
+# aquí (y solo aquí) se convierten a "01h 32m" o al mensaje de "no marcó".
+# -------------------------
+COLUMNAS_DURACION = ("Horas trabajadas", "Tardanza", "Horas extras")
+
+
+def formato_minutos(minutos) -> str:
+    """Minutos -> "HHh MMm" (00h 00m si es 0 o negativo)."""
+    minutos = int(minutos)
+    if minutos <= 0:
+        return "00h 00m"
+    return f"{minutos // 60:02d}h {minutos % 60:02d}m"
+
+
+def formatear_reporte(df):
+    """
+    Copia del reporte con las duraciones en texto y sin la columna Estado.
+    Se hace por columnas con una tabla de textos, no celda por celda.
+    """
+    salida = df.drop(columns=["Estado"])
+    estado = df["Estado"].to_numpy(dtype=object)
+    es_total = estado == ESTADO_TOTAL
+    sin_marca = (estado != ESTADO_OK) & ~es_total
+
+    for col in COLUMNAS_DURACION:
+        minutos = np.clip(df[col].to_numpy(dtype=np.int64), 0, None)
+        tope = int(minutos.max()) if len(minutos) else 0
+        tabla = np.array([formato_minutos(m) for m in range(tope + 1)], dtype=object)
+        texto = tabla[minutos]
+
+        # "no marcó ..." en las filas incompletas
+        texto[sin_marca] = estado[sin_marca]
+        if col != "Horas trabajadas":
+            texto[estado == ESTADO_SIN_MARCAS] = "no marcó"
+
+        # Las filas TOTAL solo muestran las horas extras
+        if col != "Horas extras":
+            texto[es_total] = ""
+
+        salida[col] = texto
+
+    return salida
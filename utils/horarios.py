@@ -0,0 +1,190 @@
+# horarios.py
+import hashlib
+import json
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# -------------------------
+# HORARIOS (por sede y por día) - valores de fábrica; los que rigen se leen de
+# la base de datos (ver horarios_bd.py) y reemplazan a estos al sincronizar.
+# "almuerzo" (minutos a descontar) es opcional: si falta, ALMUERZO_MIN.
+# -------------------------
+HORARIOS_SEDES = {
+    "medellin": {
+        "Lunes": {"entrada": "08:00", "salida": "17:00"},
+        "Martes": {"entrada": "08:00", "salida": "17:00"},
+        "Miércoles": {"entrada": "08:00", "salida": "17:00"},
+        "Jueves": {"entrada": "08:00", "salida": "17:00"},
+        "Viernes": {"entrada": "08:00", "salida": "17:00"},
+        "Sábado": {"entrada": "08:00", "salida": "17:00"},
+    },
+    "barranquilla": {
+        "Lunes": {"entrada": "08:00", "salida": "17:00"},
+        "Martes": {"entrada": "08:00", "salida": "17:00"},
+        "Miércoles": {"entrada": "08:00", "salida": "17:00"},
+        "Jueves": {"entrada": "08:00", "salida": "17:00"},
+        "Viernes": {"entrada": "08:00", "salida": "16:00"},
+        "Sábado": {"entrada": "09:00", "salida": "14:00", "almuerzo": 0},
+    },
+    "cartagena": {
+        "Lunes": {"entrada": "09:00", "salida": "17:30"},
+        "Martes": {"entrada": "09:00", "salida": "17:30"},
+        "Miércoles": {"entrada": "09:00", "salida": "17:30"},
+        "Jueves": {"entrada": "09:00", "salida": "17:30"},
+        "Viernes": {"entrada": "09:00", "salida": "17:30"},
+        "Sábado": {"entrada": "09:00", "salida": "15:00"},
+    }
+}
+
+ALMUERZO_MIN = 60
+
+# -------------------------
+# VENTANAS PARA CLASIFICAR UNA MARCA ÚNICA
+# Si un día tiene una sola marca: dentro de "entrada" es una entrada, dentro
+# de "salida" es una salida y fuera de ambas gana la más cercana entre el
+# inicio de la entrada y el fin de la salida. Por sede; si no, las de defecto.
+# -------------------------
+VENTANAS_DEFECTO = {"entrada": ("08:00", "13:30"), "salida": ("13:31", "17:00")}
+VENTANAS_SEDES = {}
+
+# -------------------------
+# MAPA DIAS (EN -> ES)
+# -------------------------
+DIAS_MAP = {
+    "Monday": "Lunes",
+    "Tuesday": "Martes",
+    "Wednesday": "Miércoles",
+    "Thursday": "Jueves",
+    "Friday": "Viernes",
+    "Saturday": "Sábado",
+    "Sunday": "Domingo"
+}
+
+# Índice = número de día (0 = lunes ... 6 = domingo), como datetime.weekday()
+DIAS_SEMANA = [DIAS_MAP[d] for d in
+               ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")]
+DOMINGO = 6
+
+
+# -------------------------
+# HORARIOS COMPILADOS
+# El texto "HH:MM" de cada día se convierte una sola vez a arreglos de 7
+# posiciones indexados por número de día: el motor busca el horario de una
+# fila con horario.entrada[dia] en vez de parsear texto por cada día-empleado.
+# Se recompilan al llamar recargar_horarios() (p. ej. tras editar un horario).
+# -------------------------
+HorarioCompilado = namedtuple("HorarioCompilado", [
+    "activo",     # bool: se calcula ese día (hay horario y no es domingo)
+    "entrada",    # minutos desde medianoche de la entrada oficial
+    "salida",     # minutos desde medianoche de la salida oficial
+    "almuerzo",   # minutos de almuerzo que se descuentan
+    "ventana_entrada",   # (inicio, fin) en minutos: una marca única aquí es entrada
+    "ventana_salida",    # (inicio, fin) en minutos: una marca única aquí es salida
+    "version",    # huella del horario (ver version_horario)
+])
+
+_COMPILADOS = {}
+_lock = threading.Lock()
+
+
+def _a_minutos(hhmm):
+    t = datetime.strptime(hhmm, "%H:%M")
+    return t.hour * 60 + t.minute
+
+
+def _horario_de(sede_or_horario):
+    if isinstance(sede_or_horario, str):
+        return HORARIOS_SEDES[sede_or_horario]
+    return sede_or_horario
+
+
+def ventanas_de(sede_or_horario):
+    """Ventanas de marca única de la sede (las de defecto para un dict de horarios)."""
+    if isinstance(sede_or_horario, str):
+        return VENTANAS_SEDES.get(sede_or_horario, VENTANAS_DEFECTO)
+    return VENTANAS_DEFECTO
+
+
+def version_horario(sede_or_horario) -> str:
+    """Huella del horario que se aplica; cambia si se edita el horario o las ventanas de la sede."""
+    if isinstance(sede_or_horario, HorarioCompilado):
+        return sede_or_horario.version
+    sede = sede_or_horario if isinstance(sede_or_horario, str) else ""
+    texto = json.dumps({"sede": sede, "horario": _horario_de(sede_or_horario),
+                        "ventanas": ventanas_de(sede_or_horario)},
+                       sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def compilar_horario(sede_or_horario):
+    """Nombre de sede o dict {día: {"entrada", "salida"[, "almuerzo"]}} -> HorarioCompilado."""
+    horario_por_dia = _horario_de(sede_or_horario)
+    ventanas = ventanas_de(sede_or_horario)
+
+    activo = np.zeros(7, dtype=bool)
+    entrada = np.zeros(7, dtype=np.int64)
+    salida = np.zeros(7, dtype=np.int64)
+    almuerzo = np.full(7, ALMUERZO_MIN, dtype=np.int64)
+
+    for dia, nombre in enumerate(DIAS_SEMANA):
+        horario_dia = horario_por_dia.get(nombre)
+        if dia == DOMINGO or not horario_dia:
+            continue
+        activo[dia] = True
+        entrada[dia] = _a_minutos(horario_dia["entrada"])
+        salida[dia] = _a_minutos(horario_dia["salida"])
+        almuerzo[dia] = int(horario_dia.get("almuerzo", ALMUERZO_MIN))
+
+    return HorarioCompilado(
+        activo, entrada, salida, almuerzo,
+        tuple(_a_minutos(v) for v in ventanas["entrada"]),
+        tuple(_a_minutos(v) for v in ventanas["salida"]),
+        version_horario(sede_or_horario),
+    )
+
+
+def horario_compilado(sede_or_horario):
+    """
+    HorarioCompilado de una sede (compilado una vez) o de un dict de horarios.
+    Un HorarioCompilado se devuelve tal cual (así viaja a otros procesos).
+    """
+    if isinstance(sede_or_horario, HorarioCompilado):
+        return sede_or_horario
+    if not isinstance(sede_or_horario, str):
+        return compilar_horario(sede_or_horario)
+
+    horario = _COMPILADOS.get(sede_or_horario)
+    if horario is None:
+        # Bajo el lock: una recarga en curso no deja ver el horario nuevo con
+        # las ventanas viejas (o al revés)
+        with _lock:
+            horario = _COMPILADOS.get(sede_or_horario)
+            if horario is None:
+                horario = _COMPILADOS[sede_or_horario] = compilar_horario(sede_or_horario)
+    return horario
+
+
+def recargar_horarios(horarios=None, ventanas=None):
+    """
+    Descarta los horarios compilados para que se vuelvan a armar con los
+    horarios actuales. horarios (dict como HORARIOS_SEDES) y ventanas (como
+    VENTANAS_SEDES) reemplazan el contenido de esos dicts; se modifican en el
+    lugar para que quien los importó vea los cambios.
+    """
+    with _lock:
+        if horarios is not None:
+            _reemplazar(HORARIOS_SEDES, horarios)
+        if ventanas is not None:
+            _reemplazar(VENTANAS_SEDES, ventanas)
+        _COMPILADOS.clear()
+
+
+def _reemplazar(destino, nuevo):
+    # Sin clear(): quien lee sin el lock (un trabajo en otro hilo) nunca ve el
+    # dict vacío ni una sede que sigue existiendo desaparecer por un momento
+    destino.update(nuevo)
+    for clave in [c for c in destino if c not in nuevo]:
+        del destino[clave]
@@ -0,0 +1,176 @@
+# horarios_bd.py
+import threading
+import time
+
+from utils.horarios import (HORARIOS_SEDES, VENTANAS_SEDES, VENTANAS_DEFECTO, DIAS_SEMANA, DOMINGO,
+                            ALMUERZO_MIN, recargar_horarios)
+
+# -------------------------
+# HORARIOS EN LA BASE DE DATOS (Overtrack)
+# Horarios por día, almuerzo y ventanas de marca única de cada sede se guardan
+# en MySQL y se editan desde /horarios y /ajustes. El motor nunca consulta la
+# BD: usa los dicts de horarios.py, que se recargan cuando cambia el número de
+# horarios_version. Cada edición lo sube en la misma transacción; cada worker
+# lo revisa como mucho cada `cada` segundos (una consulta por clave primaria)
+# y, si cambió, vuelve a leer todo. El worker que edita recarga enseguida.
+# -------------------------
+TABLAS = (
+    """CREATE TABLE IF NOT EXISTS sedes (
+        nombre VARCHAR(50) NOT NULL PRIMARY KEY,
+        entrada_desde CHAR(5) NOT NULL,
+        entrada_hasta CHAR(5) NOT NULL,
+        salida_desde CHAR(5) NOT NULL,
+        salida_hasta CHAR(5) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS horarios_sede (
+        sede VARCHAR(50) NOT NULL,
+        dia TINYINT NOT NULL,
+        entrada CHAR(5) NOT NULL,
+        salida CHAR(5) NOT NULL,
+        almuerzo_min SMALLINT NOT NULL,
+        PRIMARY KEY (sede, dia),
+        FOREIGN KEY (sede) REFERENCES sedes (nombre) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS horarios_version (
+        id TINYINT NOT NULL PRIMARY KEY,
+        version INT NOT NULL
+    )""",
+)
+
+
+def _filas(cursor):
+    """Filas como dicts, sea el cursor de dicts (DictCursor) o de tuplas."""
+    filas = cursor.fetchall()
+    if filas and not isinstance(filas[0], dict):
+        columnas = [d[0] for d in cursor.description]
+        filas = [dict(zip(columnas, fila)) for fila in filas]
+    return list(filas)
+
+
+def _subir_version(cursor):
+    cursor.execute("UPDATE horarios_version SET version = version + 1 WHERE id = 1")
+
+
+def _escribir_sede(cursor, sede, horario_por_dia, ventanas):
+    cursor.execute("DELETE FROM horarios_sede WHERE sede = %s", (sede,))
+    cursor.execute("DELETE FROM sedes WHERE nombre = %s", (sede,))
+    cursor.execute(
+        "INSERT INTO sedes (nombre, entrada_desde, entrada_hasta, salida_desde, salida_hasta) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (sede, *ventanas["entrada"], *ventanas["salida"]))
+    for dia, nombre in enumerate(DIAS_SEMANA):
+        horario_dia = horario_por_dia.get(nombre)
+        if dia == DOMINGO or not horario_dia:
+            continue
+        cursor.execute(
+            "INSERT INTO horarios_sede (sede, dia, entrada, salida, almuerzo_min) VALUES (%s, %s, %s, %s, %s)",
+            (sede, dia, horario_dia["entrada"], horario_dia["salida"],
+             int(horario_dia.get("almuerzo", ALMUERZO_MIN))))
+
+
+def crear_tablas(conexion):
+    """Crea las tablas si faltan; si no hay sedes, carga los horarios de fábrica (horarios.py)."""
+    cursor = conexion.cursor()
+    for sql in TABLAS:
+        cursor.execute(sql)
+
+    cursor.execute("SELECT COUNT(*) AS n FROM sedes")
+    if _filas(cursor)[0]["n"] == 0:
+        for sede, horario_por_dia in HORARIOS_SEDES.items():
+            _escribir_sede(cursor, sede, horario_por_dia, VENTANAS_SEDES.get(sede, VENTANAS_DEFECTO))
+
+    cursor.execute("SELECT COUNT(*) AS n FROM horarios_version")
+    if _filas(cursor)[0]["n"] == 0:
+        cursor.execute("INSERT INTO horarios_version (id, version) VALUES (1, 1)")
+    conexion.commit()
+    cursor.close()
+
+
+def leer_version(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT version FROM horarios_version WHERE id = 1")
+    filas = _filas(cursor)
+    cursor.close()
+    return filas[0]["version"] if filas else None
+
+
+def leer_horarios(conexion):
+    """BD -> (horarios, ventanas) con la forma de HORARIOS_SEDES y VENTANAS_SEDES."""
+    cursor = conexion.cursor()
+    cursor.execute("SELECT nombre, entrada_desde, entrada_hasta, salida_desde, salida_hasta FROM sedes")
+    sedes = _filas(cursor)
+    cursor.execute("SELECT sede, dia, entrada, salida, almuerzo_min FROM horarios_sede ORDER BY sede, dia")
+    dias = _filas(cursor)
+    cursor.close()
+
+    horarios = {s["nombre"]: {} for s in sedes}
+    ventanas = {s["nombre"]: {"entrada": (s["entrada_desde"], s["entrada_hasta"]),
+                              "salida": (s["salida_desde"], s["salida_hasta"])} for s in sedes}
+    for d in dias:
+        horario_dia = {"entrada": d["entrada"], "salida": d["salida"]}
+        if d["almuerzo_min"] != ALMUERZO_MIN:
+            horario_dia["almuerzo"] = int(d["almuerzo_min"])
+        horarios[d["sede"]][DIAS_SEMANA[d["dia"]]] = horario_dia
+    return horarios, ventanas
+
+
+def guardar_sede(conexion, sede, horario_por_dia=None, ventanas=None):
+    """
+    Crea o reemplaza una sede: horario_por_dia como en HORARIOS_SEDES y
+    ventanas como VENTANAS_DEFECTO. Lo que no se pase queda como estaba
+    (o vacío / de defecto si la sede es nueva).
+    """
+    if horario_por_dia is None:
+        horario_por_dia = HORARIOS_SEDES.get(sede, {})
+    if ventanas is None:
+        ventanas = VENTANAS_SEDES.get(sede, VENTANAS_DEFECTO)
+
+    cursor = conexion.cursor()
+    try:
+        _escribir_sede(cursor, sede, horario_por_dia, ventanas)
+        _subir_version(cursor)
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# -------------------------
+# SINCRONIZACIÓN (caché en el proceso)
+# -------------------------
+_version_cargada = None
+_revisado = 0.0
+_lock = threading.Lock()
+
+
+def sincronizar(abrir, cada=30, forzar=False):
+    """
+    Recarga los horarios de la BD si cambió su versión. abrir() presta una
+    conexión (p. ej. PoolConexiones.conexion); solo se pide si toca revisar
+    (como mucho cada `cada` segundos, o siempre con forzar=True).
+    Devuelve True si recargó. Solo lee: las tablas las crea crear_tablas al
+    desplegar (flask preparar-bd); si faltan, el error sale de aquí y se
+    siguen usando los horarios que ya había.
+    """
+    global _version_cargada, _revisado
+    if not forzar and time.monotonic() - _revisado < cada:
+        return False
+    # Si otro hilo ya está revisando, este sigue con los horarios que hay
+    if not _lock.acquire(blocking=forzar):
+        return False
+    try:
+        _revisado = time.monotonic()
+        with abrir() as conexion:
+            version = leer_version(conexion)
+            if version is None:
+                raise LookupError("No hay horarios en la BD (falta correr preparar-bd)")
+            if version == _version_cargada:
+                return False
+            horarios, ventanas = leer_horarios(conexion)
+        recargar_horarios(horarios, ventanas)
+        _version_cargada = version
+        return True
+    finally:
+        _lock.release()
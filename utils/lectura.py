@@ -0,0 +1,306 @@
+# lectura.py
+import codecs
+import csv
+import io
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, time
+
+import pandas as pd
+
+from utils.procesamiento import detectar_columnas
+
+# -------------------------
+# LECTURA RÁPIDA DE CSV DEL HUELLERO
+# Se detecta codificación y separador con una muestra pequeña, se lee con el
+# motor C (o pyarrow si está instalado) y solo se cargan las columnas de
+# nombre y fecha/hora (B y D, ver detectar_columnas).
+# -------------------------
+TAM_MUESTRA = 64 * 1024
+LINEAS_SNIFFER = 20
+SEPARADORES = ",;\t|"
+
+try:
+    import pyarrow  # noqa: F401
+    MOTOR_CSV = "pyarrow"
+except ImportError:
+    MOTOR_CSV = "c"
+
+Dialecto = namedtuple("Dialecto", ["encoding", "separador", "comillas"])
+
+# Separador/comillas ya detectados por formato de exportación del huellero
+# (clave = línea de encabezado). La codificación se revisa siempre sobre la
+# muestra porque dos exportaciones con el mismo encabezado pueden diferir.
+_DIALECTOS = OrderedDict()
+_MAX_DIALECTOS = 64
+
+
+def _primera_linea(muestra: bytes) -> bytes:
+    return muestra.split(b"\n", 1)[0].rstrip(b"\r")
+
+
+def detectar_encoding(muestra: bytes) -> str:
+    """UTF-8 primero (con o sin BOM); si no decodifica, Latin-1 (muy común en Windows)."""
+    encoding = "utf-8-sig" if muestra.startswith(codecs.BOM_UTF8) else "utf-8"
+    try:
+        # final=False: la muestra puede cortar un carácter a la mitad
+        codecs.getincrementaldecoder(encoding)().decode(muestra, final=False)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    return encoding
+
+
+def detectar_dialecto(muestra: bytes) -> Dialecto:
+    """Codificación y separador a partir de los primeros bytes del archivo."""
+    encoding = detectar_encoding(muestra)
+
+    clave = _primera_linea(muestra)
+    if clave in _DIALECTOS:
+        _DIALECTOS.move_to_end(clave)
+        separador, comillas = _DIALECTOS[clave]
+        return Dialecto(encoding, separador, comillas)
+
+    # Basta con las primeras líneas completas para el sniffer
+    texto = muestra.decode(encoding, errors="replace")
+    texto = "\n".join(texto.split("\n", LINEAS_SNIFFER)[:LINEAS_SNIFFER - 1])
+
+    try:
+        sniff = csv.Sniffer().sniff(texto, delimiters=SEPARADORES)
+        separador, comillas = sniff.delimiter, sniff.quotechar or '"'
+    except csv.Error:
+        # Sin patrón claro: el separador que más aparece en el encabezado
+        encabezado = texto.split("\n", 1)[0]
+        separador, comillas = max(SEPARADORES, key=encabezado.count), '"'
+
+    _DIALECTOS[clave] = (separador, comillas)
+    if len(_DIALECTOS) > _MAX_DIALECTOS:
+        _DIALECTOS.popitem(last=False)
+    return Dialecto(encoding, separador, comillas)
+
+
+def _read_csv(origen, dialecto, **kwargs):
+    if hasattr(origen, "seek"):
+        origen.seek(0)
+    return pd.read_csv(
+        origen,
+        encoding=dialecto.encoding,
+        sep=dialecto.separador,
+        quotechar=dialecto.comillas,
+        on_bad_lines="skip",
+        **kwargs
+    )
+
+
+def _read_columnas(origen, muestra, dialecto, motor=None, **kwargs):
+    motor = motor or MOTOR_CSV
+
+    # Encabezado (sin filas) para ubicar las columnas B y D
+    encabezado = _read_csv(io.BytesIO(muestra), dialecto, nrows=0, engine="c")
+    col_nombre, col_fecha = detectar_columnas(encabezado)
+
+    # pyarrow solo acepta nombres en usecols; el motor C, posiciones
+    if motor == "pyarrow":
+        df = _read_csv(origen, dialecto, engine=motor, usecols=[col_nombre, col_fecha], dtype=str)
+        return df[[col_nombre, col_fecha]]
+
+    columnas = [encabezado.columns.get_loc(col_nombre), encabezado.columns.get_loc(col_fecha)]
+    return _read_csv(origen, dialecto, engine=motor, usecols=columnas, dtype=str, **kwargs)
+
+
+def _leer_muestra(origen):
+    if hasattr(origen, "read"):
+        return origen.read(TAM_MUESTRA)
+    with open(origen, "rb") as f:
+        return f.read(TAM_MUESTRA)
+
+
+def _es_utf8(origen, tam=1024 * 1024):
+    """Recorre el archivo en pedazos de 1 MB y confirma que todo sea UTF-8."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    f = origen if hasattr(origen, "read") else open(origen, "rb")
+    try:
+        f.seek(0)
+        while True:
+            pedazo = f.read(tam)
+            decoder.decode(pedazo, final=not pedazo)
+            if not pedazo:
+                return True
+    except UnicodeDecodeError:
+        return False
+    finally:
+        if f is not origen:
+            f.close()
+
+
+def leer_csv(origen):
+    """
+    Lee un CSV del huellero (ruta o archivo binario) y devuelve un DataFrame
+    con solo las columnas 'nombre' y 'fecha_hora' como texto.
+    """
+    muestra = _leer_muestra(origen)
+    dialecto = detectar_dialecto(muestra)
+
+    try:
+        df = _read_columnas(origen, muestra, dialecto)
+    except UnicodeDecodeError:
+        # La muestra era UTF-8 pero el resto del archivo no
+        dialecto = dialecto._replace(encoding="latin-1")
+        df = _read_columnas(origen, muestra, dialecto)
+
+    # usecols conserva el orden del archivo: B (nombre) y luego D (fecha/hora)
+    df.columns = ["nombre", "fecha_hora"]
+    return df
+
+
+# -------------------------
+# LECTURA POR BLOQUES (archivos muy grandes)
+# -------------------------
+TAM_BLOQUE = 200_000
+
+
+def leer_csv_por_bloques(origen, tam_bloque=TAM_BLOQUE):
+    """
+    Igual que leer_csv pero entrega DataFrames de a tam_bloque filas, para
+    procesamiento.procesar_por_bloques. Siempre usa el motor C (pyarrow no lee por bloques).
+    """
+    muestra = _leer_muestra(origen)
+    dialecto = detectar_dialecto(muestra)
+
+    # Un error de codificación a mitad de camino ya no se puede reintentar
+    # (los primeros bloques ya se entregaron), así que se revisa antes.
+    if dialecto.encoding != "latin-1" and not _es_utf8(origen):
+        dialecto = dialecto._replace(encoding="latin-1")
+
+    with _read_columnas(origen, muestra, dialecto, motor="c", chunksize=tam_bloque) as lector:
+        for bloque in lector:
+            bloque.columns = ["nombre", "fecha_hora"]
+            yield bloque
+
+
+# -------------------------
+# LECTURA RÁPIDA DE EXCEL
+# pd.read_excel carga todas las columnas con sus estilos. Aquí se recorren las
+# filas de la primera hoja sin cargar el libro entero, se toman solo las
+# columnas B y D (detectar_columnas) y se entregan de a tam_bloque filas, que
+# procesar_por_bloques va resumiendo. Motor: python-calamine (Rust) si está
+# instalado; si no, openpyxl en modo solo lectura.
+# -------------------------
+TAM_BLOQUE_EXCEL = 50_000
+
+try:
+    from python_calamine import CalamineWorkbook
+    MOTOR_EXCEL = "calamine"
+except ImportError:
+    MOTOR_EXCEL = "openpyxl"
+
+
+def _posiciones(encabezado):
+    if encabezado is None:
+        raise ValueError("El archivo Excel está vacío")
+    # Con columnas numeradas, detectar_columnas devuelve directamente las posiciones
+    return detectar_columnas(pd.DataFrame(columns=range(len(encabezado))))
+
+
+def _celdas(fila, i_nombre, i_fecha):
+    if len(fila) <= max(i_nombre, i_fecha):
+        fila = tuple(fila) + (None,) * (max(i_nombre, i_fecha) + 1 - len(fila))
+    return fila[i_nombre], fila[i_fecha]
+
+
+def _marcas_calamine(origen):
+    libro = CalamineWorkbook.from_filelike(origen) if hasattr(origen, "read") else \
+        CalamineWorkbook.from_path(str(origen))
+    hoja = libro.get_sheet_by_index(0)
+    # Versiones viejas no tienen iter_rows: to_python arma la hoja completa
+    filas = hoja.iter_rows() if hasattr(hoja, "iter_rows") else iter(hoja.to_python())
+    i_nombre, i_fecha = _posiciones(next(filas, None))
+    for fila in filas:
+        yield _celdas(fila, i_nombre, i_fecha)
+
+
+def _marcas_openpyxl(origen):
+    import openpyxl
+
+    libro = openpyxl.load_workbook(origen, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        i_nombre, i_fecha = _posiciones(next(hoja.iter_rows(max_row=1, values_only=True), None))
+        # Solo se piden las celdas entre B y D (las filas cortas vienen rellenas)
+        desde = min(i_nombre, i_fecha)
+        filas = hoja.iter_rows(min_row=2, min_col=desde + 1, max_col=max(i_nombre, i_fecha) + 1,
+                               values_only=True)
+        for fila in filas:
+            yield _celdas(fila, i_nombre - desde, i_fecha - desde)
+    finally:
+        libro.close()
+
+
+def _valor_fecha(valor):
+    # Celdas de fecha -> texto ISO, para que convivan con las fechas escritas
+    # como texto en la misma columna (convertir_fechas las lee todas juntas)
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=" ")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, time):
+        return None
+    if valor is None or valor == "":
+        return None
+    return str(valor)
+
+
+def leer_excel_por_bloques(origen, tam_bloque=TAM_BLOQUE_EXCEL, motor=None):
+    """
+    Excel del huellero (ruta o archivo binario) -> DataFrames de a tam_bloque
+    filas con las columnas 'nombre' y 'fecha_hora' (B y D de la primera hoja).
+    """
+    motor = motor or MOTOR_EXCEL
+    marcas = _marcas_calamine(origen) if motor == "calamine" else _marcas_openpyxl(origen)
+
+    nombres, fechas = [], []
+    for nombre, fecha in marcas:
+        if (nombre is None or nombre == "") and (fecha is None or fecha == ""):
+            # Fila en blanco (pd.read_excel también las salta)
+            continue
+        nombres.append(nombre if nombre is None or isinstance(nombre, str) else str(nombre))
+        fechas.append(_valor_fecha(fecha))
+        if len(nombres) >= tam_bloque:
+            yield pd.DataFrame({"nombre": nombres, "fecha_hora": fechas})
+            nombres, fechas = [], []
+
+    if nombres:
+        yield pd.DataFrame({"nombre": nombres, "fecha_hora": fechas})
+
+
+def leer_excel(origen, motor=None):
+    """Como leer_csv, para Excel: un DataFrame con solo 'nombre' y 'fecha_hora' (texto)."""
+    bloques = list(leer_excel_por_bloques(origen, motor=motor))
+    if not bloques:
+        return pd.DataFrame({"nombre": pd.Series(dtype=object), "fecha_hora": pd.Series(dtype=object)})
+    return pd.concat(bloques, ignore_index=True) if len(bloques) > 1 else bloques[0]
+
+
+# -------------------------
+# CUALQUIER ARCHIVO DEL HUELLERO (CSV o Excel)
+# -------------------------
+EXTENSIONES = ("csv", "xlsx", "xls")
+
+
+def extension_de(ruta) -> str:
+    return str(ruta).lower().rsplit(".", 1)[-1]
+
+
+def leer_archivo(origen, extension=None):
+    """
+    CSV -> leer_csv; xlsx -> leer_excel; xls -> pd.read_excel. origen es una
+    ruta o un binario abierto (con un binario hay que indicar la extensión).
+    ValueError si la extensión no es soportada.
+    """
+    extension = extension or extension_de(origen)
+    if extension == "xlsx" or (extension == "xls" and MOTOR_EXCEL == "calamine"):
+        return leer_excel(origen)
+    if extension == "xls":
+        # openpyxl no lee el formato viejo
+        return pd.read_excel(origen)
+    if extension == "csv":
+        return leer_csv(origen)
+    raise ValueError("Formato no soportado. Use CSV o Excel.")
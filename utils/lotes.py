@@ -0,0 +1,110 @@
+# lotes.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.lectura import leer_archivo
+from utils.horarios import horario_compilado
+from utils.metricas import medido_aparte, incorporar
+from utils.procesamiento import (procesar_registros, normalizar_columnas, totales_por_persona,
+                                  filas_descartadas, COLUMNAS_REPORTE, DESCARTADAS)
+
+# -------------------------
+# PROCESAMIENTO POR LOTES EN VARIOS NÚCLEOS
+# Cada empleado se calcula sin mirar a los demás, así que un lote se puede
+# partir en pedazos independientes y repartirlos en un pool de procesos:
+#   - varios pares (archivo, sede): un pedazo por archivo;
+#   - un solo archivo grande: pedazos por empleado.
+# Al final se unen los detalles y se suman los totales por persona.
+# A los procesos se les pasa el horario ya compilado, no el nombre de la sede:
+# así usan los horarios vigentes en este proceso (los de la BD), no los de fábrica.
+# Los procesos arrancan con "spawn", no con fork: /subir_lote llama desde un
+# hilo de la cola, y un fork con otros hilos andando puede copiar un lock
+# tomado (métricas, logging) y colgar al hijo. Lo que miden los procesos
+# vuelve con su resultado y se suma a la medición del lote.
+# -------------------------
+_CONTEXTO = multiprocessing.get_context("spawn")
+
+
+def _workers(workers):
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def _procesar_archivo(ruta, horario, motor):
+    # Corre en un proceso del pool: lee el archivo allí mismo (no se copia el DataFrame)
+    return procesar_registros(leer_archivo(ruta), horario, motor=motor)
+
+
+def _procesar_pedazo(df, horario, motor):
+    return procesar_registros(df, horario, motor=motor)
+
+
+def _en_pool(workers, funcion, *listas):
+    """[funcion(*args) ...] en un pool de procesos; sus métricas se suman a las de este proceso."""
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_CONTEXTO) as pool:
+        salidas = list(pool.map(medido_aparte, [funcion] * len(listas[0]), *listas))
+    partes = []
+    for resultado, fases, conteos in salidas:
+        incorporar(fases, conteos)
+        partes.append(resultado)
+    return partes
+
+
+def unir_resultados(partes):
+    """
+    [(detalle, totales), ...] -> (detalle, totales) de todo el lote.
+    El detalle queda ordenado por Nombre (orden estable, así cada persona
+    conserva el orden de su pedazo) y los totales se suman por persona.
+    """
+    descartadas = sum(filas_descartadas(d) for d, _ in partes)
+    partes = [(d, t) for d, t in partes if not d.empty]
+    if not partes:
+        detalle = pd.DataFrame(columns=COLUMNAS_REPORTE)
+        detalle.attrs[DESCARTADAS] = descartadas
+        return detalle, totales_por_persona(pd.DataFrame())
+
+    detalle = (pd.concat([d for d, _ in partes], ignore_index=True)
+                 .sort_values("Nombre", kind="stable")
+                 .reset_index(drop=True))
+    detalle.attrs[DESCARTADAS] = descartadas
+    totales = (pd.concat([t for _, t in partes], ignore_index=True)
+                 .groupby("Nombre", as_index=False)["Horas extras"].sum())
+    return detalle, totales
+
+
+def procesar_lote(pares, workers=None, motor="vectorizado"):
+    """
+    pares: [(ruta, sede), ...]. Cada archivo se lee y procesa en su propio
+    proceso; devuelve (detalle, totales) de todo el lote.
+    """
+    workers = min(_workers(workers), len(pares)) or 1
+    pares = [(ruta, horario_compilado(sede)) for ruta, sede in pares]
+    if workers == 1:
+        partes = [_procesar_archivo(ruta, horario, motor) for ruta, horario in pares]
+    else:
+        partes = _en_pool(workers, _procesar_archivo,
+                          [r for r, _ in pares], [h for _, h in pares], [motor] * len(pares))
+    return unir_resultados(partes)
+
+
+def procesar_particionado(df, sede_or_horario, workers=None, motor="vectorizado"):
+    """
+    Igual que procesar_registros, pero reparte los empleados del archivo en
+    `workers` pedazos que se procesan en paralelo.
+    """
+    workers = _workers(workers)
+    df = normalizar_columnas(df)
+    if workers == 1 or df.empty:
+        return procesar_registros(df, sede_or_horario, motor=motor)
+
+    # Cada empleado entero en un solo pedazo
+    codigos, _ = pd.factorize(df["nombre"])
+    pedazo = codigos % workers
+    pedazos = [df[pedazo == i] for i in range(workers) if np.any(pedazo == i)]
+
+    horario = horario_compilado(sede_or_horario)
+    partes = _en_pool(len(pedazos), _procesar_pedazo, pedazos, [horario] * len(pedazos), [motor] * len(pedazos))
+    return unir_resultados(partes)
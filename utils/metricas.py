@@ -0,0 +1,334 @@
+# metricas.py
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# -------------------------
+# MÉTRICAS (tiempo por fase y conteos)
+# Cada fase del camino caliente (guardar el archivo, leerlo, convertir fechas,
+# agrupar, calcular, totales, exportar) se envuelve en fase("nombre"). Su
+# tiempo va a un histograma y, si en el hilo hay una medición en curso (un
+# request o un trabajo de la cola), también a ella: al terminar se escribe una
+# línea de log con sus fases y conteos. /metrics expone el registro en el
+# formato de texto de Prometheus.
+#
+# Una fase dentro de otra se descuenta de la de afuera: cada segundo cuenta
+# en una sola fase. Lo de una medición pasa al registro recién al cerrarla,
+# con sus etiquetas finales: así la sede que se conoce a mitad del request
+# (etiquetar) acompaña a todas sus fases y conteos, también a los de antes. El registro es por proceso; los procesos del pool de
+# lotes.py devuelven lo que midieron (ver medido_aparte / incorporar).
+# -------------------------
+PREFIJO = "overtrack"
+LIMITES_SEG = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+AYUDA = {
+    "fase_segundos": ("histogram", "Segundos por fase (sin contar sus fases internas)"),
+    "operacion_segundos": ("histogram", "Segundos por request o trabajo completo"),
+    "operaciones_total": ("counter", "Requests y trabajos terminados"),
+    "marcaciones_total": ("counter", "Marcaciones leídas de los archivos"),
+    "descartadas_total": ("counter", "Marcaciones descartadas por fecha ilegible"),
+    "dias_empleado_total": ("counter", "Filas (días-empleado) de los reportes generados"),
+    "bytes_entrada_total": ("counter", "Bytes recibidos (archivos subidos)"),
+    "bytes_salida_total": ("counter", "Bytes enviados en las respuestas"),
+}
+
+logger = logging.getLogger("overtrack.metricas")
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas_texto(etiquetas):
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas) + "}"
+
+
+class RegistroMetricas:
+    """Contadores e histogramas por (nombre, etiquetas); seguro entre hilos."""
+
+    def __init__(self, prefijo=PREFIJO, limites=LIMITES_SEG):
+        self.prefijo = prefijo
+        self.limites = limites
+        self._lock = threading.Lock()
+        self._contadores = {}
+        # clave -> [observaciones por límite..., suma, cuenta]
+        self._histogramas = {}
+
+    def sumar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        i = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            h = self._histogramas.get(clave)
+            if h is None:
+                h = self._histogramas[clave] = [0] * len(self.limites) + [0.0, 0]
+            if i < len(self.limites):
+                h[i] += 1
+            h[-2] += valor
+            h[-1] += 1
+
+    def texto(self):
+        """Todo el registro en el formato de exposición de texto de Prometheus."""
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((k, list(v)) for k, v in self._histogramas.items())
+
+        lineas = []
+        vistos = set()
+
+        def encabezado(nombre):
+            if nombre not in vistos:
+                vistos.add(nombre)
+                tipo, ayuda = AYUDA.get(nombre, ("untyped", nombre))
+                lineas.append(f"# HELP {self.prefijo}_{nombre} {ayuda}")
+                lineas.append(f"# TYPE {self.prefijo}_{nombre} {tipo}")
+
+        for (nombre, etiquetas), valor in contadores:
+            encabezado(nombre)
+            lineas.append(f"{self.prefijo}_{nombre}{_etiquetas_texto(etiquetas)} {valor}")
+
+        for (nombre, etiquetas), h in histogramas:
+            encabezado(nombre)
+            base = f"{self.prefijo}_{nombre}"
+            acumulado = 0
+            for limite, n in zip(self.limites, h):
+                acumulado += n
+                lineas.append(f"{base}_bucket{_etiquetas_texto(etiquetas + (('le', limite),))} {acumulado}")
+            lineas.append(f"{base}_bucket{_etiquetas_texto(etiquetas + (('le', '+Inf'),))} {h[-1]}")
+            lineas.append(f"{base}_sum{_etiquetas_texto(etiquetas)} {h[-2]:.6f}")
+            lineas.append(f"{base}_count{_etiquetas_texto(etiquetas)} {h[-1]}")
+        return "\n".join(lineas) + "\n"
+
+
+METRICAS = RegistroMetricas()
+
+
+# -------------------------
+# MEDICIÓN EN CURSO (por hilo)
+# -------------------------
+class Medicion:
+    """Lo medido en un request o trabajo: segundos por fase y conteos."""
+
+    def __init__(self, operacion, **etiquetas):
+        # Las etiquetas (operación, sede...) acompañan a las métricas de sus fases
+        self.etiquetas = dict(operacion=operacion, **etiquetas)
+        self.fases = {}
+        self.conteos = {}
+        # (fase, segundos) de cada vez que terminó una fase, para el histograma
+        self.observaciones = []
+        self.inicio = time.perf_counter()
+        self.estado = "ok"
+        # El request y, si la hay, la descarga en streaming que sigue después
+        self.abiertas = 1
+
+    def linea(self, total):
+        partes = [f"{k}={v}" for k, v in self.etiquetas.items()]
+        partes.append(f"total={total:.3f}s")
+        partes += [f"{fase}={seg:.3f}s" for fase, seg in self.fases.items()]
+        partes += [f"{nombre}={valor}" for nombre, valor in self.conteos.items()]
+        return " ".join(partes)
+
+
+_local = threading.local()
+
+
+def medicion_actual():
+    return getattr(_local, "medicion", None)
+
+
+def iniciar_medicion(operacion, **etiquetas):
+    """Empieza a medir en este hilo (un request, un trabajo de la cola)."""
+    _local.medicion = Medicion(operacion, **etiquetas)
+    return _local.medicion
+
+
+def etiquetar(**etiquetas):
+    """Agrega etiquetas a la medición en curso (p. ej. el formato pedido)."""
+    medicion = medicion_actual()
+    if medicion is not None:
+        medicion.etiquetas.update(etiquetas)
+
+
+def _cerrar(medicion):
+    total = time.perf_counter() - medicion.inicio
+    for nombre, segundos in medicion.observaciones:
+        METRICAS.observar("fase_segundos", segundos, fase=nombre, **medicion.etiquetas)
+    for nombre, valor in medicion.conteos.items():
+        METRICAS.sumar(f"{nombre}_total", valor, **medicion.etiquetas)
+    METRICAS.observar("operacion_segundos", total, **medicion.etiquetas)
+    METRICAS.sumar("operaciones_total", 1, estado=medicion.estado, **medicion.etiquetas)
+    logger.info("%s estado=%s", medicion.linea(total), medicion.estado)
+
+
+def _soltar(medicion):
+    medicion.abiertas -= 1
+    if medicion.abiertas == 0:
+        _cerrar(medicion)
+
+
+def terminar_medicion(estado="ok"):
+    """
+    Cierra la medición del hilo: histograma de la operación y una línea de log.
+    Si hay una descarga en streaming pendiente (ver medir_stream), el cierre
+    espera a que termine de generarse.
+    """
+    medicion = medicion_actual()
+    if medicion is None:
+        return None
+    _local.medicion = None
+    medicion.estado = estado
+    _soltar(medicion)
+    return medicion
+
+
+def medir_stream(iterable):
+    """
+    Contenido de una respuesta en streaming que se sigue midiendo como parte
+    del request aunque Flask ya lo haya cerrado: sus fases y bytes entran en
+    la misma medición, que se cierra cuando termina la descarga.
+    """
+    medicion = medicion_actual()
+    if medicion is None:
+        return iterable
+    medicion.abiertas += 1
+    return _iterar_midiendo(medicion, iterable)
+
+
+def _iterar_midiendo(medicion, iterable):
+    iterador = iter(iterable)
+    try:
+        while True:
+            anterior = medicion_actual()
+            _local.medicion = medicion
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                _local.medicion = anterior
+            yield elemento
+    finally:
+        _soltar(medicion)
+
+
+@contextmanager
+def medir(operacion, **etiquetas):
+    """iniciar_medicion / terminar_medicion como bloque with."""
+    anterior = medicion_actual()
+    medicion = iniciar_medicion(operacion, **etiquetas)
+    estado = "ok"
+    try:
+        yield medicion
+    except Exception:
+        estado = "error"
+        raise
+    finally:
+        terminar_medicion(estado)
+        _local.medicion = anterior
+
+
+def _pila():
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    return pila
+
+
+def _registrar(nombre, segundos):
+    medicion = medicion_actual()
+    if medicion is None:
+        METRICAS.observar("fase_segundos", segundos, fase=nombre)
+        return
+    medicion.observaciones.append((nombre, segundos))
+    medicion.fases[nombre] = medicion.fases.get(nombre, 0.0) + segundos
+
+
+@contextmanager
+def fase(nombre):
+    """Mide el bloque como la fase `nombre` (descontando las fases que tenga adentro)."""
+    pila = _pila()
+    pila.append(0.0)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - inicio
+        internas = pila.pop()
+        if pila:
+            pila[-1] += total
+        _registrar(nombre, total - internas)
+
+
+def cronometrado(nombre):
+    """Decorador: cada llamada a la función cuenta como la fase `nombre`."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with fase(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def fase_iterable(nombre, iterable):
+    """
+    Recorre iterable sumando como fase `nombre` solo el tiempo de producir cada
+    elemento (leer un bloque, armar un pedazo de CSV), no el de consumirlo.
+    """
+    segundos = 0.0
+    iterador = iter(iterable)
+    try:
+        while True:
+            inicio = time.perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                segundos += time.perf_counter() - inicio
+            yield elemento
+    finally:
+        _registrar(nombre, segundos)
+
+
+def contar(nombre, valor):
+    """Suma a un contador (marcaciones, descartadas, bytes_entrada...) de la medición en curso."""
+    medicion = medicion_actual()
+    if medicion is None:
+        METRICAS.sumar(f"{nombre}_total", valor)
+        return
+    medicion.conteos[nombre] = medicion.conteos.get(nombre, 0) + valor
+
+
+# -------------------------
+# MEDICIONES EN OTROS PROCESOS (pool de lotes.py)
+# Lo que mide un proceso del pool se devuelve junto con su resultado y se
+# suma aquí a la medición en curso. Las fases de varios procesos corren a la
+# vez: su suma puede pasar del tiempo real de la fase que las contiene.
+# -------------------------
+def medido_aparte(funcion, *args, **kwargs):
+    """funcion(*args) medida por separado -> (resultado, fases, conteos), sin log ni cierre."""
+    anterior = medicion_actual()
+    medicion = iniciar_medicion("aparte")
+    try:
+        resultado = funcion(*args, **kwargs)
+    finally:
+        _local.medicion = anterior
+    return resultado, medicion.fases, medicion.conteos
+
+
+def incorporar(fases, conteos):
+    """Suma a este proceso (y a la medición en curso) lo medido con medido_aparte."""
+    for nombre, segundos in fases.items():
+        _registrar(nombre, segundos)
+    for nombre, valor in conteos.items():
+        contar(nombre, valor)
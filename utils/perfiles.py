@@ -0,0 +1,78 @@
+# perfiles.py
+import cProfile
+import io
+import pstats
+import threading
+from functools import wraps
+
+from utils.almacen import AlmacenDisco
+
+# -------------------------
+# PERFILES DE CARGAS LENTAS
+# Una carga se puede procesar bajo cProfile (ver perfilado) para ver si el
+# tiempo se va en read_excel, en las fechas o en el cálculo. El perfil se
+# guarda en disco con el id de la carga y se descarga después: crudo (.prof,
+# para snakeviz / pstats) o como texto. Sin perfil pedido la carga corre tal
+# cual: no se envuelve nada.
+# cProfile perfila un solo hilo a la vez de forma confiable (en Python 3.12+
+# solo admite un perfilador activo), así que si ya hay un perfil en curso la
+# carga siguiente corre sin perfilar.
+# -------------------------
+ORDENES = ("cumulative", "tottime", "calls")
+
+_en_curso = threading.Lock()
+
+
+class AlmacenPerfiles(AlmacenDisco):
+    """Perfiles de cProfile en disco (formato de pstats), con tope de bytes y expiración."""
+
+    EXTENSION = ".prof"
+
+    def __init__(self, carpeta, max_mb=200, ttl_dias=7):
+        super().__init__(carpeta, int(max_mb * 1024 * 1024), ttl_dias * 24 * 3600)
+
+    def _escribir(self, valor, ruta):
+        valor.dump_stats(ruta)
+
+    def _leer(self, ruta):
+        return pstats.Stats(ruta)
+
+    def ruta_archivo(self, clave):
+        """Ruta del .prof guardado; None si no existe (o ya expiró)."""
+        if self.obtener(clave) is None:
+            return None
+        return self._ruta(clave)
+
+    def texto(self, clave, orden="cumulative", limite=60):
+        """Las `limite` funciones más caras según `orden`; None si no hay perfil."""
+        stats = self.obtener(clave)
+        if stats is None:
+            return None
+        salida = io.StringIO()
+        stats.stream = salida
+        stats.strip_dirs().sort_stats(orden).print_stats(limite)
+        return salida.getvalue()
+
+
+def perfilado(funcion, almacen, clave):
+    """funcion envuelta: su llamada corre bajo cProfile y el perfil se guarda bajo `clave`."""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not _en_curso.acquire(blocking=False):
+            return funcion(*args, **kwargs)
+        try:
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                perfil.disable()
+                almacen.guardar(clave, perfil)
+        finally:
+            _en_curso.release()
+    return envoltura
+
+
+def supera_tamano(tamano, desde_mb):
+    """¿Un archivo de `tamano` bytes pesa al menos desde_mb? desde_mb=None: nunca."""
+    return desde_mb is not None and tamano >= desde_mb * 1024 * 1024
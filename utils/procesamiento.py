@@ -1,49 +1,13 @@
 # procesamiento.py
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 
-# -------------------------
-# HORARIOS (por sede y por día) - aquí defines las sedes y sus horarios por día
-# -------------------------
-HORARIOS_SEDES = {
-    "medellin": {
-        "Lunes": {"entrada": "08:00", "salida": "17:00"},
-        "Martes": {"entrada": "08:00", "salida": "17:00"},
-        "Miércoles": {"entrada": "08:00", "salida": "17:00"},
-        "Jueves": {"entrada": "08:00", "salida": "17:00"},
-        "Viernes": {"entrada": "08:00", "salida": "17:00"},
-        "Sábado": {"entrada": "08:00", "salida": "17:00"},
-    },
-    "barranquilla": {
-        "Lunes": {"entrada": "08:00", "salida": "17:00"},
-        "Martes": {"entrada": "08:00", "salida": "17:00"},
-        "Miércoles": {"entrada": "08:00", "salida": "17:00"},
-        "Jueves": {"entrada": "08:00", "salida": "17:00"},
-        "Viernes": {"entrada": "08:00", "salida": "16:00"},
-        "Sábado": {"entrada": "09:00", "salida": "14:00"},
-    },
-    "cartagena": {
-        "Lunes": {"entrada": "09:00", "salida": "17:30"},
-        "Martes": {"entrada": "09:00", "salida": "17:30"},
-        "Miércoles": {"entrada": "09:00", "salida": "17:30"},
-        "Jueves": {"entrada": "09:00", "salida": "17:30"},
-        "Viernes": {"entrada": "09:00", "salida": "17:30"},
-        "Sábado": {"entrada": "09:00", "salida": "15:00"},
-    }
-}
-
-# -------------------------
-# MAPA DIAS (EN -> ES)
-# -------------------------
-DIAS_MAP = {
-    "Monday": "Lunes",
-    "Tuesday": "Martes",
-    "Wednesday": "Miércoles",
-    "Thursday": "Jueves",
-    "Friday": "Viernes",
-    "Saturday": "Sábado",
-    "Sunday": "Domingo"
-}
+from utils.fechas import convertir_fechas, detectar_formato
+# Los horarios viven en horarios.py; HORARIOS_SEDES, DIAS_MAP y
+# version_horario se siguen importando desde aquí en el resto de la app
+from utils.horarios import HORARIOS_SEDES, DIAS_MAP, DIAS_SEMANA, horario_compilado, version_horario
+from utils.metricas import contar, cronometrado, fase
 
 
 # -------------------------
@@ -77,8 +41,29 @@ def detectar_columnas(df):
 
 
 # -------------------------
-# Formateador de timedeltas -> "H:MM" (00:00 si es 0)
+# Estado de cada fila del reporte. Las duraciones (Horas trabajadas, Tardanza,
+# Horas extras) se guardan como minutos enteros; cuando falta una marcación
+# valen 0 y el Estado dice por qué. El texto "01h 32m" se arma solo al mostrar
+# o exportar (utils/formato.py).
 # -------------------------
+ESTADO_OK = "ok"
+ESTADO_SIN_SALIDA = "no marcó salida"
+ESTADO_SIN_ENTRADA = "no marcó entrada"
+ESTADO_SIN_MARCAS = "no marcó entrada ni salida"
+ESTADO_TOTAL = "total"
+
+# Súbala cuando cambie el cálculo o las columnas del reporte: invalida los
+# reportes guardados en caché (utils/cache.py)
+VERSION_REPORTE = 3
+
+# Marcaciones que no se pudieron leer (fecha ilegible o vacía); va en
+# detalle.attrs para que viaje con el reporte hasta la vista y el caché
+DESCARTADAS = "filas_descartadas"
+
+COLUMNAS_REPORTE = [
+    "Nombre", "Fecha", "Día", "Entrada", "Salida",
+    "Horas trabajadas", "Tardanza", "Horas extras", "Estado",
+]
 
 
 
@@ -121,31 +106,215 @@ def calcular_extras(entrada_dt, salida_dt, entrada_oficial_dt, salida_oficial_dt
 
 
 
-def formato_hhmm(td: timedelta) -> str:
+def a_minutos(td: timedelta) -> int:
+    """Timedelta -> minutos enteros redondeados (0 si es negativo o no es timedelta)."""
     if not isinstance(td, timedelta):
-        return "00h 00m"
+        return 0
 
     total_min = round(td.total_seconds() / 60)  # redondea minutos
-    if total_min <= 0:
-        return "00h 00m"
-
-    h = total_min // 60
-    m = total_min % 60
-    return f"{h:02d}h {m:02d}m"
+    return max(total_min, 0)
 
 
 
 # -------------------------
 # PROCESAR REGISTROS (función pública)
-# recibe DataFrame original y el nombre de la sede o el dict de horarios
+# recibe DataFrame original y el nombre de la sede, el dict de horarios
+# o un HorarioCompilado (ver horarios.py)
+# -------------------------
+MOTORES = ("clasico", "vectorizado")
+
+
+def _sin_avance(fase):
+    pass
+
+
+def procesar_registros(df, sede_or_horario, motor="vectorizado", avance=None):
+    """
+    Procesa marcaciones y devuelve (detalle, totales):
+    detalle: Nombre, Fecha, Día, Entrada, Salida, Horas trabajadas, Tardanza, Horas extras, Estado
+    totales: Nombre, Horas extras (suma por persona)
+
+    motor="vectorizado" calcula todo por columnas (NumPy/pandas);
+    motor="clasico" usa el recorrido fila por fila original. Ambos dan el mismo reporte.
+
+    avance(fase), si se pasa, se llama al empezar cada fase ("fechas",
+    "agrupar", "calcular", "totales"); lo usa la cola de trabajos.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor}. Use uno de {MOTORES}")
+    avance = avance or _sin_avance
+
+    df = normalizar_columnas(df)
+    horario = horario_compilado(sede_or_horario)
+
+    if motor == "clasico":
+        avance("calcular")
+        df_resultado, descartadas = _procesar_clasico(df, horario)
+    else:
+        resumen = resumir_marcaciones(df, avance=avance)
+        descartadas = filas_descartadas(resumen)
+        avance("calcular")
+        df_resultado = _calcular_desde_resumen(resumen, horario)
+
+    avance("totales")
+    return _detalle_y_totales(df_resultado, descartadas)
+
+
+# -------------------------
+# PROCESAR POR BLOQUES (archivos muy grandes)
+# Cada bloque se reduce enseguida a su resumen por (nombre, fecha); la memoria
+# queda acotada por la cantidad de días-empleado, no por la de marcaciones.
+# -------------------------
+FILAS_COMPACTAR = 100_000
+
+
+def procesar_por_bloques(bloques, sede_or_horario, avance=None):
+    """
+    Igual que procesar_registros (motor vectorizado) pero recibe un iterable de
+    DataFrames, p. ej. lectura.leer_csv_por_bloques(...).
+    """
+    avance = avance or _sin_avance
+    resumen = resumir_por_bloques(bloques, avance)
+    avance("calcular")
+    df_resultado = _calcular_desde_resumen(resumen, horario_compilado(sede_or_horario))
+    avance("totales")
+    return _detalle_y_totales(df_resultado, filas_descartadas(resumen))
+
+
+def resumir_por_bloques(bloques, avance=None):
+    """
+    Iterable de DataFrames de marcaciones -> un solo resumen por (nombre, fecha).
+    Leer, convertir fechas y agrupar van intercalados bloque a bloque; avance
+    se avisa una vez al empezar ("fechas") y otra al unir todo ("agrupar").
+    """
+    avance = avance or _sin_avance
+    avance("fechas")
+    acumulado = combinar_resumenes([])
+    pendientes = []
+    filas_pendientes = 0
+    formato = None
+
+    for i, bloque in enumerate(bloques):
+        bloque = normalizar_columnas(bloque)
+
+        # El formato de fecha se detecta con el primer bloque y se usa en todos:
+        # un bloque con solo días <= 12 no alcanza para distinguir día/mes
+        if i == 0:
+            formato = detectar_formato(bloque["fecha_hora"])
+
+        parcial = resumir_marcaciones(bloque, formato)
+        pendientes.append(parcial)
+        filas_pendientes += len(parcial)
+
+        # Compactar de vez en cuando para no guardar un resumen por bloque
+        if filas_pendientes >= max(len(acumulado), FILAS_COMPACTAR):
+            with fase("agrupar"):
+                acumulado = combinar_resumenes([acumulado] + pendientes)
+            pendientes, filas_pendientes = [], 0
+
+    avance("agrupar")
+    with fase("agrupar"):
+        return combinar_resumenes([acumulado] + pendientes)
+
+
 # -------------------------
-def procesar_registros(df, sede_or_horario):
+# PROCESAMIENTO INCREMENTAL
+# Cada semana llega un archivo que repite casi todo el anterior. Se guarda el
+# resumen por (nombre, fecha) y el detalle ya calculado; al llegar un archivo
+# nuevo solo se recalculan los días-empleado cuya primera/última marca o
+# cantidad de marcas cambió.
+# -------------------------
+def fusionar_resumenes(anterior, nuevo):
+    """
+    Une el resumen guardado con el de un archivo nuevo que puede repetir las
+    mismas marcaciones. Devuelve (resumen, cambiados): cambiados marca las
+    filas nuevas o cuya primera/última marca o cantidad cambió.
+
+    Como los archivos se solapan, las marcas no se suman: si ambos tienen el
+    mismo día con la misma primera y última marca se toma la cantidad mayor;
+    si difieren, el día tiene al menos 2 marcas distintas.
+
+    Límite: una marca repetida (misma hora) cuya copia llega solo en el otro
+    archivo no se distingue de la misma marca vista dos veces, y cuenta una
+    vez. Si era la única del día, el día queda con una sola marca (sin
+    salida), aunque el archivo completo procesado de una vez dé "ok". Con el
+    uso previsto (cada archivo repite todo lo anterior) no pasa.
+    """
+    if anterior.empty:
+        return nuevo.reset_index(drop=True), np.ones(len(nuevo), dtype=bool)
+
+    claves = ["nombre", "fecha"]
+    m = anterior.merge(nuevo, on=claves, how="outer", suffixes=("_a", "_n"), sort=True)
+
+    entrada = m[["min_a", "min_n"]].min(axis=1)
+    salida = m[["max_a", "max_n"]].max(axis=1)
+
+    count_a = m["count_a"].fillna(0).astype(np.int64)
+    count_n = m["count_n"].fillna(0).astype(np.int64)
+    count = np.maximum(count_a, count_n)
+    en_ambos = m["min_a"].notna() & m["min_n"].notna()
+    mismo_rango = (m["min_a"] == m["min_n"]) & (m["max_a"] == m["max_n"])
+    count = count.where(~en_ambos | mismo_rango, np.maximum(count, 2))
+
+    resumen = pd.DataFrame({"nombre": m["nombre"], "fecha": m["fecha"],
+                            "min": entrada, "max": salida, "count": count})
+    cambiados = ~((entrada == m["min_a"]) & (salida == m["max_a"]) & (count == count_a))
+    return resumen, cambiados.to_numpy()
+
+
+def procesar_incremental(resumen_nuevo, sede_or_horario, estado=None, avance=None):
     """
-    Procesa marcaciones y genera reporte con:
-    Nombre, Fecha, Día, Entrada, Salida, Horas trabajadas, Tardanza, Horas extras(Horas y minutos)
+    Agrega un resumen nuevo (ver resumir_por_bloques) al estado guardado de la
+    sede y devuelve (detalle, totales, estado_nuevo, dias_recalculados).
+    estado=None (primera carga) equivale a procesar todo.
     """
-    
+    avance = avance or _sin_avance
+    avance("calcular")
+    horario = horario_compilado(sede_or_horario)
+    version = f"{horario.version}-{VERSION_REPORTE}"
+
+    if estado is None:
+        estado = {"version": version,
+                  "resumen": combinar_resumenes([]),
+                  "detalle": pd.DataFrame()}
+
+    with fase("agrupar"):
+        resumen, cambiados = fusionar_resumenes(estado["resumen"], resumen_nuevo)
+
+    # Si cambió el horario o el cálculo, todo el detalle viejo queda inválido
+    if estado["version"] != version:
+        cambiados = np.ones(len(resumen), dtype=bool)
+
+    nuevas = _calcular_desde_resumen(resumen[cambiados].reset_index(drop=True), horario)
+
+    detalle = estado["detalle"]
+    if not detalle.empty:
+        recalculadas = pd.MultiIndex.from_arrays([
+            resumen.loc[cambiados, "nombre"],
+            resumen.loc[cambiados, "fecha"].dt.strftime("%d/%m/%Y"),
+        ])
+        vigentes = ~pd.MultiIndex.from_frame(detalle[["Nombre", "Fecha"]]).isin(recalculadas)
+        detalle = pd.concat([detalle[vigentes], nuevas], ignore_index=True)
+    else:
+        detalle = nuevas
+
+    if not detalle.empty:
+        # Mismo orden que procesar_registros: por nombre y luego por fecha
+        # (coerce: fechas basura del huellero como "01/01/1" no rompen el orden)
+        orden = pd.to_datetime(detalle["Fecha"], format="%d/%m/%Y", errors="coerce")
+        detalle = (detalle.assign(_orden=orden)
+                          .sort_values(["Nombre", "_orden"], kind="stable")
+                          .drop(columns="_orden")
+                          .reset_index(drop=True))
+
+    estado = {"version": version, "resumen": resumen, "detalle": detalle}
+    avance("totales")
+    detalle, totales = _detalle_y_totales(detalle, filas_descartadas(resumen_nuevo))
+    return detalle, totales, estado, int(cambiados.sum())
 
+
+def normalizar_columnas(df):
+    """Copia el DataFrame y deja las columnas 'nombre' y 'fecha_hora'."""
     df = df.copy()
     df.columns = [c.strip() for c in df.columns]
 
@@ -170,29 +339,44 @@ def procesar_registros(df, sede_or_horario):
     if "nombre" not in df.columns or "fecha_hora" not in df.columns:
         raise ValueError(f"Faltan columnas requeridas. Columnas actuales: {df.columns.tolist()}")
 
+    return df
+
+
+# -------------------------
+# MOTOR CLÁSICO (fila por fila)
+# -------------------------
+def _hora(minutos):
+    return time(minutos // 60, minutos % 60)
+
+
+@cronometrado("calcular")
+def _procesar_clasico(df, horario):
+    contar("marcaciones", len(df))
+    with fase("fechas"):
+        fechas, descartadas = convertir_fechas(df["fecha_hora"])
+    contar("descartadas", descartadas)
+    df["__fecha_dt"] = fechas
+
+    # Ventanas de marca única de la sede (ver VENTANAS_DEFECTO en horarios.py)
+    entrada_ini, entrada_fin = (_hora(m) for m in horario.ventana_entrada)
+    salida_ini, salida_fin = (_hora(m) for m in horario.ventana_salida)
 
-    df["__fecha_dt"] = pd.to_datetime(df["fecha_hora"], errors="coerce")
-    
     df = df.dropna(subset=["__fecha_dt"])
     df["fecha"] = df["__fecha_dt"].dt.date
     df["hora"] = df["__fecha_dt"].dt.time
 
 
-    resumen = (
-        df.groupby(["nombre", "fecha"])
-          .agg(hora_entrada=("hora", "min"),
-               hora_salida=("hora", "max"),
-               marcas_count=("hora", "count"))
-          .reset_index()
-    )
+    with fase("agrupar"):
+        resumen = (
+            df.groupby(["nombre", "fecha"])
+              .agg(hora_entrada=("hora", "min"),
+                   hora_salida=("hora", "max"),
+                   marcas_count=("hora", "count"))
+              .reset_index()
+        )
 
     filas_result = []
 
-    if isinstance(sede_or_horario, str):
-        horario_por_dia = HORARIOS_SEDES[sede_or_horario]
-    else:
-        horario_por_dia = sede_or_horario
-
     for _, row in resumen.iterrows():
         nombre = row["nombre"]
         fecha = row["fecha"]
@@ -200,15 +384,11 @@ def procesar_registros(df, sede_or_horario):
         salida = row["hora_salida"]
         marcas = row["marcas_count"]
 
-        dia_ing = datetime.strptime(str(fecha), "%Y-%m-%d").strftime("%A")
-        dia_es = DIAS_MAP.get(dia_ing, dia_ing)
-
-        if dia_es == "Domingo":
-            continue
-
-        horario_dia = horario_por_dia.get(dia_es)
-        if not horario_dia:
+        # Domingos y días sin horario no se calculan
+        dia = fecha.weekday()
+        if not horario.activo[dia]:
             continue
+        dia_es = DIAS_SEMANA[dia]
 
         # ============================
         # 🚨 CASO 1: NO MARCÓ NADA
@@ -220,9 +400,10 @@ def procesar_registros(df, sede_or_horario):
                 "Día": dia_es,
                 "Entrada": "-:--",
                 "Salida": "-:--",
-                "Horas trabajadas": "no marcó entrada ni salida",
-                "Tardanza": "no marcó",
-                "Horas extras": "no marcó"
+                "Horas trabajadas": 0,
+                "Tardanza": 0,
+                "Horas extras": 0,
+                "Estado": ESTADO_SIN_MARCAS
             })
             continue
 
@@ -232,24 +413,18 @@ def procesar_registros(df, sede_or_horario):
         if marcas == 1:
             hora_unica = entrada  # (entrada == salida cuando marcas=1)
 
-            # Rango oficial
-            entrada_ini = datetime.strptime("08:00", "%H:%M").time()
-            entrada_fin = datetime.strptime("13:30", "%H:%M").time()
-            salida_ini  = datetime.strptime("13:31", "%H:%M").time()
-            salida_fin  = datetime.strptime("17:00", "%H:%M").time()
-
             # --- Clasificación por rango ---
             if entrada_ini <= hora_unica <= entrada_fin:
                 # Es ENTRADA
                 entrada_str = hora_unica.strftime("%H:%M")
                 salida_str = "--:--"
-                msg = "no marcó salida"
+                msg = ESTADO_SIN_SALIDA
 
             elif salida_ini <= hora_unica <= salida_fin:
                 # Es SALIDA
                 entrada_str = "--:--"
                 salida_str = hora_unica.strftime("%H:%M")
-                msg = "no marcó entrada"
+                msg = ESTADO_SIN_ENTRADA
 
             else:
                 # --- Hora fuera de rango → se decide por cercanía ---
@@ -261,12 +436,12 @@ def procesar_registros(df, sede_or_horario):
                     # Más cerca de entrada
                     entrada_str = hora_unica.strftime("%H:%M")
                     salida_str = "--:--"
-                    msg = "no marcó salida"
+                    msg = ESTADO_SIN_SALIDA
                 else:
                     # Más cerca de salida
                     entrada_str = "--:--"
                     salida_str = hora_unica.strftime("%H:%M")
-                    msg = "no marcó entrada"
+                    msg = ESTADO_SIN_ENTRADA
 
             filas_result.append({
                 "Nombre": nombre,
@@ -274,9 +449,10 @@ def procesar_registros(df, sede_or_horario):
                 "Día": dia_es,
                 "Entrada": entrada_str,
                 "Salida": salida_str,
-                "Horas trabajadas": msg,
-                "Tardanza": msg,
-                "Horas extras": msg
+                "Horas trabajadas": 0,
+                "Tardanza": 0,
+                "Horas extras": 0,
+                "Estado": msg
             })
             continue
 
@@ -292,9 +468,10 @@ def procesar_registros(df, sede_or_horario):
                 "Día": dia_es,
                 "Entrada": "-:--",
                 "Salida": salida.strftime("%H:%M"),
-                "Horas trabajadas": "no marcó entrada",
-                "Tardanza": "no marcó entrada",
-                "Horas extras": "no marcó entrada"
+                "Horas trabajadas": 0,
+                "Tardanza": 0,
+                "Horas extras": 0,
+                "Estado": ESTADO_SIN_ENTRADA
             })
             continue
 
@@ -305,9 +482,10 @@ def procesar_registros(df, sede_or_horario):
                 "Día": dia_es,
                 "Entrada": entrada.strftime("%H:%M"),
                 "Salida": "-:--",
-                "Horas trabajadas": "no marcó salida",
-                "Tardanza": "no marcó salida",
-                "Horas extras": "no marcó salida"
+                "Horas trabajadas": 0,
+                "Tardanza": 0,
+                "Horas extras": 0,
+                "Estado": ESTADO_SIN_SALIDA
             })
             continue
 
@@ -315,36 +493,23 @@ def procesar_registros(df, sede_or_horario):
         entrada_dt = datetime.combine(fecha, entrada)
         salida_dt = datetime.combine(fecha, salida)
 
-        entrada_oficial = datetime.combine(fecha, datetime.strptime(horario_dia["entrada"], "%H:%M").time())
-        salida_oficial = datetime.combine(fecha, datetime.strptime(horario_dia["salida"], "%H:%M").time())
+        medianoche = datetime.combine(fecha, datetime.min.time())
+        entrada_oficial = medianoche + timedelta(minutes=int(horario.entrada[dia]))
+        salida_oficial = medianoche + timedelta(minutes=int(horario.salida[dia]))
 
         tardanza = entrada_dt - entrada_oficial
         if tardanza < timedelta(0):
             tardanza = timedelta(0)
 
         # ================================
-# ⚡ CORRECCIÓN: Descuento de almuerzo
-# ================================
-        SEDE_NO_ALMUERZO = "barranquilla"   # 👉 cambia por el nombre exacto de esa sede
-
-        horas_trab = salida_dt - entrada_dt
-
-        # Si **NO es** la sede especial -> descontar almuerzo normal
-        if sede_or_horario != SEDE_NO_ALMUERZO:
-            horas_trab -= timedelta(hours=1)
-
-        # Si sí es la sede especial -> SOLO descontar si NO es sábado
-        else:
-            if dia_es != "Sábado":   # sábado NO descuenta
-                horas_trab -= timedelta(hours=1)
+        # ⚡ Descuento de almuerzo (por día, ver "almuerzo" en horarios.py)
+        # ================================
+        horas_trab = salida_dt - entrada_dt - timedelta(minutes=int(horario.almuerzo[dia]))
 
         # Evitar negativos
         if horas_trab < timedelta(0):
             horas_trab = timedelta(0)
 
-        if horas_trab < timedelta(0):
-            horas_trab = timedelta(0)
-
         # 🔥 Aquí aplicas tu nueva función de cálculo de extras
         extras_effect = calcular_extras(
         entrada_dt=entrada_dt,
@@ -361,82 +526,207 @@ def procesar_registros(df, sede_or_horario):
             "Día": dia_es,
             "Entrada": entrada.strftime("%H:%M"),
             "Salida": salida.strftime("%H:%M"),
-            "Horas trabajadas": formato_hhmm(horas_trab),
-            "Tardanza": formato_hhmm(tardanza),
-            "Horas extras": formato_hhmm(extras_effect)
+            "Horas trabajadas": a_minutos(horas_trab),
+            "Tardanza": a_minutos(tardanza),
+            "Horas extras": a_minutos(extras_effect),
+            "Estado": ESTADO_OK
         })
-            # ==========================================================
-    # 🔥 CALCULAR HORAS EXTRAS TOTALES POR PERSONA
-    # ==========================================================
-    
 
-    df_resultado = pd.DataFrame(filas_result)
+    return pd.DataFrame(filas_result), descartadas
+
 
-    print("COLUMNAS DF_RESULTADO:", df_resultado.columns.tolist())
+# -------------------------
+# MOTOR VECTORIZADO (por columnas)
+# Misma lógica que el clásico, pero cada regla se aplica a la columna completa.
+# Los tiempos se manejan en microsegundos desde la medianoche, igual que
+# datetime.time, para que el redondeo a minutos sea idéntico.
+# -------------------------
+_US_MIN = 60 * 1_000_000
+_DIAS_SEMANA = np.array(DIAS_SEMANA, dtype=object)
 
 
-# =======================================
-# CALCULAR TOTAL DE HORAS EXTRAS POR PERSONA
-# =======================================
+def _minutos_redondeados(us):
+    """Microsegundos -> minutos redondeados (mismo round() de a_minutos/calcular_extras)."""
+    return np.rint(us / 1_000_000 / 60).astype(np.int64)
 
-    def extras_to_minutes(x):
-        if isinstance(x, str) and "h" in x:
-            partes = x.replace("h", "").replace("m", "").split()
-            h = int(partes[0])
-            m = int(partes[1])
-            return h * 60 + m
-        return 0
 
-    # Convertir texto → minutos
-    
-
-    df_resultado["extras_min"] = df_resultado["Horas extras"].apply(extras_to_minutes)
-
-    # Sumar minutos por persona
-    totales = (
-        df_resultado.groupby("Nombre")["extras_min"]
-        .sum()
-        .reset_index()
-    )
-
-    # Convertir de vuelta a formato "Hh Mm"
-    totales["total_extras_hhmm"] = totales["extras_min"].apply(
-        lambda m: f"{m//60:02d}h {m%60:02d}m"
-    )
-
-    # =======================================
-    # INSERTAR FILA TOTAL DESPUÉS DE CADA PERSONA
-    # =======================================
-
-    filas_finales = []
-    for nombre, grupo in df_resultado.groupby("Nombre"):
-        # Agregar todas las filas de esa persona
-        filas_finales.extend(grupo.drop(columns=["extras_min"]).to_dict("records"))
-
-        # Buscar su total
-        total_str = totales.loc[totales["Nombre"] == nombre, "total_extras_hhmm"].iloc[0]
-
-        # Insertar fila total
-        filas_finales.append({
-            "Nombre": f"TOTAL HORAS EXTRAS ({nombre})",
-            "Fecha": "",
-            "Día": "",
-            "Entrada": "",
-            "Salida": "",
-            "Horas trabajadas": "",
-            "Tardanza": "",
-            "Horas extras": total_str
-        })
+def resumir_marcaciones(df, formato=None, avance=None):
+    """
+    Marcaciones (columnas nombre, fecha_hora) -> una fila por (nombre, fecha)
+    con la primera marca, la última y cuántas hubo.
+    """
+    avance = avance or _sin_avance
+    avance("fechas")
+    contar("marcaciones", len(df))
+    with fase("fechas"):
+        fecha_dt, descartadas = convertir_fechas(df["fecha_hora"], formato)
+        marcas = pd.DataFrame({"nombre": df["nombre"], "ts": fecha_dt}).dropna(subset=["ts"])
+        # datetime.time solo guarda microsegundos
+        marcas["ts"] = marcas["ts"].dt.floor("us")
+        marcas["fecha"] = marcas["ts"].dt.normalize()
+    contar("descartadas", descartadas)
+
+    avance("agrupar")
+    with fase("agrupar"):
+        resumen = (
+            marcas.groupby(["nombre", "fecha"])["ts"]
+                  .agg(["min", "max", "count"])
+                  .reset_index()
+        )
+    resumen.attrs[DESCARTADAS] = descartadas
+    return resumen
+
+
+def combinar_resumenes(resumenes):
+    """Une resúmenes parciales (de varios bloques o archivos) en uno solo."""
+    descartadas = sum(filas_descartadas(r) for r in resumenes)
+    resumenes = [r for r in resumenes if not r.empty]
+    if not resumenes:
+        resumen = pd.DataFrame(columns=["nombre", "fecha", "min", "max", "count"])
+    elif len(resumenes) == 1:
+        resumen = resumenes[0].copy(deep=False)
+    else:
+        resumen = (
+            pd.concat(resumenes, ignore_index=True)
+              .groupby(["nombre", "fecha"])
+              .agg(min=("min", "min"), max=("max", "max"), count=("count", "sum"))
+              .reset_index()
+        )
+    resumen.attrs[DESCARTADAS] = descartadas
+    return resumen
+
+
+@cronometrado("calcular")
+def _calcular_desde_resumen(resumen, horario):
+    if resumen.empty:
+        return pd.DataFrame()
+
+    # Se descartan domingos y días sin horario
+    dia = resumen["fecha"].dt.dayofweek.to_numpy()
+    mantener = horario.activo[dia]
+    resumen = resumen[mantener].reset_index(drop=True)
+    dia = dia[mantener]
+
+    if resumen.empty:
+        return pd.DataFrame()
+
+    # Horario oficial de cada fila (en microsegundos desde medianoche)
+    dia_es = _DIAS_SEMANA[dia]
+    entrada_oficial = horario.entrada[dia] * _US_MIN
+    salida_oficial = horario.salida[dia] * _US_MIN
+
+    entrada = (resumen["min"] - resumen["fecha"]).to_numpy().astype("timedelta64[us]").astype(np.int64)
+    salida = (resumen["max"] - resumen["fecha"]).to_numpy().astype("timedelta64[us]").astype(np.int64)
+    unica = resumen["count"].to_numpy() == 1
+
+    entrada_str = resumen["min"].dt.strftime("%H:%M").to_numpy(dtype=object)
+    salida_str = resumen["max"].dt.strftime("%H:%M").to_numpy(dtype=object)
+
+    # ============================
+    # CASO NORMAL: ENTRADA Y SALIDA
+    # ============================
+    tardanza = np.clip(entrada - entrada_oficial, 0, None)
+
+    horas_trab = np.clip(salida - entrada - horario.almuerzo[dia] * _US_MIN, 0, None)
+
+    # calcular_extras: antes de la entrada + después de la salida - tardanza, mínimo 50 min
+    antes = np.clip(entrada_oficial - entrada, 0, None)
+    despues = np.clip(salida - salida_oficial, 0, None)
+    extras_min = _minutos_redondeados(np.clip(antes + despues - tardanza, 0, None))
+    extras_min[extras_min < 50] = 0
+
+    horas_trab_min = _minutos_redondeados(horas_trab)
+    tardanza_min = _minutos_redondeados(tardanza)
+
+    # ============================
+    # CASO: SOLO UNA MARCACIÓN
+    # ============================
+    # Ventanas de la sede (por defecto entrada 08:00–13:30, salida 13:31–17:00);
+    # fuera de ellas decide la cercanía al inicio de la entrada o al fin de la salida
+    entrada_ini, entrada_fin = horario.ventana_entrada
+    salida_ini, salida_fin = horario.ventana_salida
+    es_entrada_rango = (entrada >= entrada_ini * _US_MIN) & (entrada <= entrada_fin * _US_MIN)
+    es_salida_rango = (entrada >= salida_ini * _US_MIN) & (entrada <= salida_fin * _US_MIN)
+    minuto_unico = entrada // _US_MIN
+    mas_cerca_entrada = np.abs(minuto_unico - entrada_ini) <= np.abs(minuto_unico - salida_fin)
+    marca_es_entrada = es_entrada_rango | (~es_salida_rango & mas_cerca_entrada)
+
+    unica_entrada = unica & marca_es_entrada
+    unica_salida = unica & ~marca_es_entrada
+
+    entrada_str[unica_salida] = "--:--"
+    salida_str[unica_entrada] = "--:--"
+    for col in (horas_trab_min, tardanza_min, extras_min):
+        col[unica] = 0
+
+    estado = np.full(len(resumen), ESTADO_OK, dtype=object)
+    estado[unica_entrada] = ESTADO_SIN_SALIDA
+    estado[unica_salida] = ESTADO_SIN_ENTRADA
+
+    return pd.DataFrame({
+        "Nombre": resumen["nombre"].to_numpy(dtype=object),
+        "Fecha": resumen["fecha"].dt.strftime("%d/%m/%Y").to_numpy(dtype=object),
+        "Día": dia_es,
+        "Entrada": entrada_str,
+        "Salida": salida_str,
+        "Horas trabajadas": horas_trab_min,
+        "Tardanza": tardanza_min,
+        "Horas extras": extras_min,
+        "Estado": estado,
+    })
+
 
-    # Convertir a DataFrame final ordenado
-    df_final = pd.DataFrame(filas_finales)
+# =======================================
+# CALCULAR TOTAL DE HORAS EXTRAS POR PERSONA
+# Los totales van en su propia tabla (Nombre, Horas extras), no como filas
+# "TOTAL HORAS EXTRAS (...)" metidas en el detalle.
+# =======================================
+def totales_por_persona(detalle):
+    """Suma de horas extras (minutos) por persona, ordenada por Nombre."""
+    if detalle.empty:
+        return pd.DataFrame({"Nombre": pd.Series(dtype=str), "Horas extras": pd.Series(dtype=np.int64)})
+    return detalle.groupby("Nombre")["Horas extras"].sum().reset_index()
 
-    
 
-   
-    return df_final
+def filas_descartadas(df):
+    """Marcaciones descartadas por fecha ilegible (de un resumen o de un detalle)."""
+    return int(df.attrs.get(DESCARTADAS, 0))
 
 
-        
+@cronometrado("totales")
+def _detalle_y_totales(df_resultado, descartadas=0):
+    """Detalle ordenado por persona (sus filas seguidas, en el orden que traían) + totales."""
+    if df_resultado.empty:
+        detalle = pd.DataFrame(columns=COLUMNAS_REPORTE)
+    else:
+        detalle = df_resultado.sort_values("Nombre", kind="stable").reset_index(drop=True)
+    detalle.attrs[DESCARTADAS] = descartadas
+    contar("dias_empleado", len(detalle))
+    return detalle, totales_por_persona(detalle)
 
 
+def unir_totales(detalle, totales):
+    """
+    Detalle con una fila "TOTAL HORAS EXTRAS (nombre)" después de las filas de
+    cada persona (formato del Excel de horas extras). Se arma concatenando y
+    ordenando una sola vez, sin buscar el total de cada persona por separado.
+    """
+    filas_total = pd.DataFrame({
+        "Nombre": "TOTAL HORAS EXTRAS (" + totales["Nombre"].astype(str) + ")",
+        "Fecha": "",
+        "Día": "",
+        "Entrada": "",
+        "Salida": "",
+        "Horas trabajadas": 0,
+        "Tardanza": 0,
+        "Horas extras": totales["Horas extras"].to_numpy(dtype=np.int64),
+        "Estado": ESTADO_TOTAL,
+    })
+
+    # Cada fila (detalle o total) va a la posición de su persona; el total, al final
+    persona = np.r_[pd.Index(totales["Nombre"]).get_indexer(detalle["Nombre"]), np.arange(len(totales))]
+    es_total = np.r_[np.zeros(len(detalle), dtype=np.int8), np.ones(len(totales), dtype=np.int8)]
+    orden = np.lexsort((es_total, persona))
+
+    unido = pd.concat([detalle[COLUMNAS_REPORTE], filas_total], ignore_index=True)
+    return unido.take(orden).reset_index(drop=True)
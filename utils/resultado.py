@@ -0,0 +1,67 @@
+# resultado.py
+import numpy as np
+import pandas as pd
+
+from utils.procesamiento import filas_descartadas, totales_por_persona, unir_totales
+
+# -------------------------
+# RESULTADO GUARDADO POR SESIÓN
+# El detalle procesado más lo que se consulta en cada petición, calculado una
+# sola vez al guardar: en qué filas está cada empleado y su total de extras.
+# El detalle viene ordenado por Nombre, así que cada empleado es un rango
+# contiguo de filas.
+# -------------------------
+
+
+class Resultado:
+    """Detalle del reporte + índice de filas por empleado + totales de horas extras + filas descartadas."""
+
+    def __init__(self, detalle, totales=None):
+        if totales is None:
+            totales = totales_por_persona(detalle)
+        self.detalle = detalle.reset_index(drop=True)
+        # Marcaciones con fecha ilegible que no entraron al reporte
+        self.descartadas = filas_descartadas(detalle)
+        self.totales = pd.Series(totales["Horas extras"].to_numpy(dtype=np.int64),
+                                 index=pd.Index(totales["Nombre"], name="Nombre"),
+                                 name="Horas extras")
+
+        # Dónde empieza cada empleado: donde cambia el nombre
+        nombres = self.detalle["Nombre"].to_numpy(dtype=object)
+        cortes = np.flatnonzero(nombres[1:] != nombres[:-1]) + 1
+        inicios = np.r_[0, cortes] if len(nombres) else np.array([], dtype=np.int64)
+        fines = np.r_[cortes, len(nombres)] if len(nombres) else inicios
+
+        # nombre -> (primera fila, última fila + 1)
+        self.rangos = {nombre: (int(i), int(f)) for nombre, i, f in zip(nombres[inicios], inicios, fines)}
+
+    @property
+    def nbytes(self):
+        """Tamaño aproximado (para el tope de bytes del almacén)."""
+        return (int(self.detalle.memory_usage(deep=True).sum())
+                + int(self.totales.memory_usage(deep=True)))
+
+    @property
+    def empty(self):
+        return self.detalle.empty
+
+    @property
+    def nombres(self):
+        return list(self.rangos)
+
+    def filas(self, nombre=None):
+        """Filas de un empleado o todo el detalle si nombre es None."""
+        if nombre is None:
+            return self.detalle
+        inicio, fin = self.rangos.get(nombre, (0, 0))
+        return self.detalle.iloc[inicio:fin]
+
+    def total_extras(self, nombre=None):
+        """Minutos de horas extras de un empleado, o de todos si nombre es None."""
+        if nombre is None:
+            return int(self.totales.sum())
+        return int(self.totales.get(nombre, 0))
+
+    def con_totales(self):
+        """Detalle con la fila TOTAL de cada persona después de sus filas (para exportar)."""
+        return unir_totales(self.detalle, self.totales.reset_index())
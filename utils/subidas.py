@@ -0,0 +1,142 @@
+# subidas.py
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from flask import Request
+
+from utils.almacen import AlmacenDisco
+
+# -------------------------
+# ARCHIVOS SUBIDOS
+# /subir ya no guarda cada archivo con su nombre en uploads/ para volver a
+# leerlo después. Los chicos (hasta en_memoria_hasta) llegan a memoria y el
+# trabajo los lee de ahí. Los grandes, werkzeug los escribe mientras recibe el
+# request en un temporal con nombre (PeticionSubidas) que no se borra al
+# cerrar el request: el trabajo lo lee por su ruta y lo borra al terminar.
+# Así cada archivo se escribe en disco una sola vez antes de procesarlo.
+# La copia que se conserva va a ArchivoSubidas: comprimida (gzip) y con el
+# hash como nombre, así el mismo archivo subido diez veces ocupa un solo lugar.
+# La carpeta tiene tope de bytes y expiración, como los demás AlmacenDisco.
+# -------------------------
+TAM_PEDAZO = 1024 * 1024
+
+
+class PeticionSubidas(Request):
+    """
+    Request de Flask cuyos archivos grandes van a un temporal con nombre.
+    El temporal que recibir() no adoptó se borra al cerrar el request.
+    """
+
+    en_memoria_hasta = 32 * 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= self.en_memoria_hasta:
+            return io.BytesIO()
+        sufijo = "." + filename.lower().rsplit(".", 1)[-1] if filename and "." in filename else ""
+        temporal = tempfile.NamedTemporaryFile("wb+", prefix="subida_", suffix=sufijo, delete=False)
+        temporal.adoptado = False
+        self.__dict__.setdefault("_temporales", []).append(temporal)
+        return temporal
+
+    def close(self):
+        super().close()
+        for temporal in self.__dict__.get("_temporales", ()):
+            if not temporal.adoptado:
+                AlmacenDisco._borrar_archivo(temporal.name)
+
+
+class Subida:
+    """Un archivo recibido: sus bytes (o la ruta del temporal), extensión, hash y tamaño."""
+
+    def __init__(self, nombre, extension, huella, tamano, datos=None, ruta=None):
+        self.nombre = nombre
+        self.extension = extension
+        self.huella = huella
+        self.tamano = tamano
+        self.datos = datos
+        self.ruta = ruta
+
+    @property
+    def clave(self):
+        # La extensión va en la clave: sin ella no se sabría cómo leer la copia
+        return f"{self.huella}_{self.extension}"
+
+    def origen(self):
+        """Lo que reciben los lectores: un binario en memoria o la ruta del temporal."""
+        return io.BytesIO(self.datos) if self.datos is not None else self.ruta
+
+    def descartar(self):
+        """Borra el temporal (si lo hay) y suelta los bytes."""
+        if self.ruta:
+            AlmacenDisco._borrar_archivo(self.ruta)
+        self.datos = self.ruta = None
+
+
+def recibir(archivo, extension, en_disco=False):
+    """
+    FileStorage del request -> Subida (con su hash). Si werkzeug lo dejó en
+    un temporal de PeticionSubidas, la Subida se queda con ese archivo; si
+    está en memoria, se queda con los bytes (o, con en_disco=True, los
+    escribe a un temporal, p. ej. para que lo lean otros procesos).
+    """
+    stream = archivo.stream
+    h = hashlib.sha256()
+    tamano = 0
+
+    if hasattr(stream, "adoptado"):
+        stream.seek(0)
+        for pedazo in iter(lambda: stream.read(TAM_PEDAZO), b""):
+            h.update(pedazo)
+            tamano += len(pedazo)
+        stream.adoptado = True
+        return Subida(archivo.filename, extension, h.hexdigest(), tamano, ruta=stream.name)
+
+    stream.seek(0)
+    datos = stream.read()
+    h.update(datos)
+    if not en_disco:
+        return Subida(archivo.filename, extension, h.hexdigest(), len(datos), datos=datos)
+
+    fd, ruta = tempfile.mkstemp(prefix="subida_", suffix="." + extension)
+    with os.fdopen(fd, "wb") as destino:
+        destino.write(datos)
+    return Subida(archivo.filename, extension, h.hexdigest(), len(datos), ruta=ruta)
+
+
+class ArchivoSubidas(AlmacenDisco):
+    """
+    Copia gzip de cada archivo subido, una por contenido (clave: hash y
+    extensión). Volver a subir un archivo solo renueva su fecha de uso.
+    """
+
+    EXTENSION = ".gz"
+
+    def __init__(self, carpeta, max_mb=2048, ttl_dias=90, nivel=6):
+        super().__init__(carpeta, int(max_mb * 1024 * 1024), ttl_dias * 24 * 3600)
+        self.nivel = nivel
+
+    def archivar(self, subida):
+        """Guarda la subida si su contenido no estaba. Devuelve True si la escribió."""
+        try:
+            os.utime(self._ruta(subida.clave))
+            return False
+        except FileNotFoundError:
+            pass
+        self.guardar(subida.clave, subida)
+        return True
+
+    def _escribir(self, subida, ruta):
+        with gzip.open(ruta, "wb", compresslevel=self.nivel) as destino:
+            if subida.datos is not None:
+                destino.write(subida.datos)
+            else:
+                with open(subida.ruta, "rb") as f:
+                    shutil.copyfileobj(f, destino, TAM_PEDAZO)
+
+    def _leer(self, ruta):
+        with gzip.open(ruta, "rb") as f:
+            return f.read()
@@ -0,0 +1,76 @@
+# trabajos.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.almacen import nuevo_id
+
+# -------------------------
+# COLA DE TRABAJOS (cargas en segundo plano)
+# /subir deja el archivo y responde enseguida con un id de trabajo; el
+# procesamiento corre en un pool de hilos del mismo proceso. El estado de cada
+# trabajo (fase actual, error, resultado) se guarda en un almacén (memoria o
+# disco, ver almacen.py) para que cualquier worker pueda contestar el sondeo.
+# -------------------------
+FASES = ("leer", "fechas", "agrupar", "calcular", "totales")
+
+EN_COLA = "en_cola"
+PROCESANDO = "procesando"
+LISTO = "listo"
+ERROR = "error"
+
+
+class ColaTrabajos:
+    """Pool de hilos local + estado de cada trabajo en un almacén."""
+
+    def __init__(self, almacen_estados, workers=2):
+        self.estados = almacen_estados
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trabajo")
+        self._lock = threading.Lock()
+
+    def enviar(self, funcion, *args, **kwargs):
+        """
+        Encola funcion(*args, avance=..., **kwargs) y devuelve el id del trabajo.
+        Lo que devuelva la función queda en el estado como "resultado".
+        """
+        trabajo_id = nuevo_id()
+        self.estados.guardar(trabajo_id, {
+            "estado": EN_COLA,
+            "fase": None,
+            "completadas": [],
+            "resultado": None,
+            "error": None,
+            "creado": time.time(),
+        })
+        self._pool.submit(self._correr, trabajo_id, funcion, args, kwargs)
+        return trabajo_id
+
+    def estado(self, trabajo_id):
+        """Estado del trabajo (dict) con "progreso" de 0 a 1; None si no existe o expiró."""
+        estado = self.estados.obtener(trabajo_id)
+        if estado is None:
+            return None
+        return dict(estado, fases=list(FASES), progreso=len(estado["completadas"]) / len(FASES))
+
+    def _actualizar(self, trabajo_id, **cambios):
+        with self._lock:
+            estado = self.estados.obtener(trabajo_id)
+            if estado is None:
+                return
+            estado.update(cambios)
+            self.estados.guardar(trabajo_id, estado)
+
+    def _avanzar(self, trabajo_id, fase):
+        # Las fases van en orden: empezar una da por terminadas las anteriores
+        hechas = list(FASES[:FASES.index(fase)]) if fase in FASES else []
+        self._actualizar(trabajo_id, fase=fase, completadas=hechas)
+
+    def _correr(self, trabajo_id, funcion, args, kwargs):
+        self._actualizar(trabajo_id, estado=PROCESANDO)
+        try:
+            resultado = funcion(*args, avance=lambda fase: self._avanzar(trabajo_id, fase), **kwargs)
+        except Exception as e:
+            self._actualizar(trabajo_id, estado=ERROR, error=str(e))
+        else:
+            self._actualizar(trabajo_id, estado=LISTO, fase=None, completadas=list(FASES),
+                             resultado=resultado)
@@ -0,0 +1,90 @@
+# usuarios.py
+import hmac
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# -------------------------
+# USUARIOS Y CONTRASEÑAS
+# El login busca por email (columna indexada) con una consulta fija que trae
+# solo lo necesario, y verifica la contraseña contra su hash (werkzeug). El
+# costo se ajusta con el método: "scrypt:32768:8:1", "pbkdf2:sha256:600000"...
+# Las contraseñas que aún están en texto plano, o con un método/costo distinto
+# del configurado, se aceptan y se vuelven a guardar con el método actual en
+# ese mismo login.
+# Los cambios de esquema (tabla, índice, largo de password) no van en el login:
+# se aplican una vez al desplegar con `flask --app app preparar-bd`.
+# -------------------------
+BUSCAR_POR_EMAIL = "SELECT id, name, password FROM usuarios WHERE email = %s LIMIT 1"
+ACTUALIZAR_PASSWORD = "UPDATE usuarios SET password = %s WHERE id = %s"
+
+INDICE_EMAIL = "CREATE INDEX idx_usuarios_email ON usuarios (email)"
+# Solo para el motor sqlite: en MySQL la tabla ya existe
+TABLA_SQLITE = """CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    password VARCHAR(255) NOT NULL
+)"""
+# Los hash no caben en una columna corta
+LARGO_PASSWORD = 255
+
+def preparar_usuarios(conexion, motor):
+    """Índice por email y columna password con espacio para el hash (migración, no por request)."""
+    cursor = conexion.cursor()
+    if motor == "sqlite":
+        cursor.execute(TABLA_SQLITE)
+    else:
+        cursor.execute(
+            "SELECT CHARACTER_MAXIMUM_LENGTH AS largo FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'usuarios' AND COLUMN_NAME = 'password'")
+        fila = cursor.fetchone()
+        if fila and (fila["largo"] or 0) < LARGO_PASSWORD:
+            cursor.execute(f"ALTER TABLE usuarios MODIFY password VARCHAR({LARGO_PASSWORD}) NOT NULL")
+    try:
+        cursor.execute(INDICE_EMAIL)
+    except Exception:
+        # Ya existe
+        pass
+    conexion.commit()
+    cursor.close()
+
+
+def es_hash(valor):
+    return valor.startswith(("scrypt:", "pbkdf2:")) and "$" in valor
+
+
+@lru_cache(maxsize=4)
+def _hash_ficticio(metodo):
+    return generate_password_hash("-", method=metodo)
+
+
+def verificar_usuario(conexion, email, password, metodo):
+    """
+    Usuario (dict con id y name) si el email existe y la contraseña coincide;
+    si no, None. Rehace el hash si estaba en texto plano o con otro método.
+    """
+    cursor = conexion.cursor()
+    cursor.execute(BUSCAR_POR_EMAIL, (email,))
+    usuario = cursor.fetchone()
+
+    if usuario is None:
+        # Se calcula un hash igual: el tiempo de respuesta no delata qué correos existen
+        check_password_hash(_hash_ficticio(metodo), password)
+        cursor.close()
+        return None
+
+    guardado = usuario["password"] or ""
+    if es_hash(guardado):
+        valido = check_password_hash(guardado, password)
+        rehacer = not guardado.startswith(metodo + "$")
+    else:
+        valido = hmac.compare_digest(guardado.encode("utf-8"), password.encode("utf-8"))
+        rehacer = True
+
+    if valido and rehacer:
+        cursor.execute(ACTUALIZAR_PASSWORD, (generate_password_hash(password, method=metodo), usuario["id"]))
+        conexion.commit()
+    cursor.close()
+    return {"id": usuario["id"], "name": usuario["name"]} if valido else None
+